@@ -1,27 +1,30 @@
-import os
-import cloudinary
-import cloudinary.uploader
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Body
+import asyncio
+import json
+from datetime import date
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Body, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import Optional, List
-from datetime import date
 from pydantic import BaseModel 
 
-from ...services.adjudicator import adjudicate_claim
-from ...services.extraction_llm import extract_claim_data
-from ...models.sql_models import ClaimRecord
-from ...core.database import get_db
+from ...models.sql_models import ClaimJob
+from ...core.config import JOB_POLL_SECONDS, MAX_BULK_REQUEST_BYTES
+from ...core.database import get_db, run_in_session, run_sync
 from ...utils.logging_utils import setup_logging
-from ...services.narrator_llm import generate_narrative
-from ...services.fraud_detection import calculate_phash, check_duplicate_images
-
-cloudinary.config( 
-  cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME"), 
-  api_key = os.getenv("CLOUDINARY_API_KEY"), 
-  api_secret = os.getenv("CLOUDINARY_API_SECRET"),
-  secure = True
+from ...utils.exception_handlers import ServiceError
+from ...services.bulk_submission import claims_from_documents, stream_bulk_results, unpack_archive
+from ...services.claim_pipeline import process_claim
+from ...services.ingestion import ByteBudget, IngestedFile, check_declared_sizes, ingest_upload, close_all
+from ...services.job_queue import FINAL_STATUSES, enqueue_job, job_status
+from ...services.policy_registry import check_policy_id
+from ...services.claim_overrides import override_claim, override_claims
+from ...services.claim_stats import DEFAULT_TOP, MAX_TOP, claim_stats, stats_range
+from ...services.review_queue import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, changed_since, claim_detail, encode_cursor, list_pending, parse_since,
+    queue_etag, sync_token,
 )
+from ...utils.metrics import UPLOADS_IN_FLIGHT, track_stage
 
 router = APIRouter(prefix="/v1/claims", tags=["claims"])
 logger = setup_logging()
@@ -30,178 +33,229 @@ class ClaimUpdate(BaseModel):
     status: str
     approved_amount: float
     decision_reasons: List[str]
+    version: int # Version the reviewer saw (required); a newer stored version is a conflict
+
+class ClaimOverride(ClaimUpdate):
+    id: int
+
+def _override_fields(update: ClaimUpdate) -> dict:
+    return {"status": update.status, "approved_amount": update.approved_amount,
+            "decision_reasons": update.decision_reasons, "version": update.version}
+
+# Handlers that only talk to the database are plain functions: FastAPI runs them in its threadpool.
+# Async handlers hand blocking DB work to core.database.run_sync.
 
 @router.get("/pending", summary="Get claims requiring manual review")
-async def get_pending_claims(db: Session = Depends(get_db)):
-    claims = db.query(ClaimRecord).filter(
-        ClaimRecord.status == "MANUAL_REVIEW"
-    ).order_by(ClaimRecord.created_at.desc()).all()
-    return claims
+def get_pending_claims(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    since: Optional[str] = Query(None, description="X-Sync-Token of an earlier response: only claims changed since"),
+    db: Session = Depends(get_db)
+):
+    """
+    Summary rows only (no extracted_data / full reasons; use GET /v1/claims/{claim_id}).
+    Pages via `after`; pollers send If-None-Match for a 304, or `since` for a delta.
+    """
+    etag = queue_etag(db, limit, after, since)
+    token = sync_token(db)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if token:
+        headers["X-Sync-Token"] = token
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    if since:
+        items = changed_since(db, parse_since(since), limit)
+        if len(items) == limit:
+            # Truncated delta: continue from the last change returned
+            headers["X-Sync-Token"] = encode_cursor(items[-1]["updated_at"], items[-1]["id"])
+    else:
+        items, next_cursor = list_pending(db, after, limit)
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+            headers["Link"] = f'<{request.url.path}?limit={limit}&after={next_cursor}>; rel="next"'
+    response.headers.update(headers)
+    return items
+
+@router.get("/stats", summary="Daily claim analytics from pre-aggregated rollups")
+def get_claim_stats(
+    start: Optional[date] = Query(None, alias="from", description="First day (YYYY-MM-DD, UTC); default 30 days before 'to'"),
+    end: Optional[date] = Query(None, alias="to", description="Last day, inclusive; default today"),
+    top: int = Query(DEFAULT_TOP, ge=1, le=MAX_TOP, description="Reason codes and hospitals listed per day"),
+    db: Session = Depends(get_db)
+):
+    """Approval rate, claimed vs approved totals, reason codes and top hospitals per day and for the range."""
+    start, end = stats_range(start, end)
+    return {"status": "ok", **claim_stats(db, start, end, top)}
+
+@router.get("/jobs/{job_id}", summary="Status of an asynchronous claim upload")
+def get_claim_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.get(ClaimJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
+
+# Seconds between keep-alive comments on an idle event stream
+SSE_HEARTBEAT_SECONDS = 15.0
+
+def _load_job_status(db: Session, job_id: str):
+    job = db.get(ClaimJob, job_id)
+    return job_status(job) if job else None
+
+@router.get("/jobs/{job_id}/events", summary="Server-sent events for an asynchronous claim upload")
+async def stream_claim_job(job_id: str):
+    if await run_in_session(_load_job_status, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last_seen, idle = None, 0.0
+        while True:
+            state = await run_in_session(_load_job_status, job_id)
+            if state is None:
+                return
+            if (state["status"], state["stage"]) != last_seen:
+                last_seen, idle = (state["status"], state["stage"]), 0.0
+                yield f"event: {state['status'].lower()}\ndata: {json.dumps(jsonable_encoder(state))}\n\n"
+                if state["status"] in FINAL_STATUSES:
+                    return
+            elif idle >= SSE_HEARTBEAT_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            idle += JOB_POLL_SECONDS
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/{claim_id}", summary="Full claim record, including extracted data and reasons")
+def get_claim(claim_id: int, db: Session = Depends(get_db)):
+    claim = claim_detail(db, claim_id)
+    if not claim:
+        raise HTTPException(status_code=404, detail="Claim not found")
+    return claim
+
+@router.patch("", summary="Bulk Admin Override of Claim Decisions")
+def override_claims_bulk(overrides: List[ClaimOverride], db: Session = Depends(get_db)):
+    """
+    Applies every override in one transaction (one bulk UPDATE). Returns an outcome per row:
+    updated, conflict (stale `version`), not_found or duplicate.
+    """
+    results = override_claims(db, [{**_override_fields(o), "id": o.id} for o in overrides])
+    counts = {}
+    for result in results:
+        counts[result["outcome"]] = counts.get(result["outcome"], 0) + 1
+    return {"status": "ok", "counts": counts, "results": results}
 
 @router.put("/{claim_id}", summary="Admin Override Claim Decision")
-async def update_claim_status(
+def update_claim_status(
     claim_id: int,
     update_data: ClaimUpdate,
     db: Session = Depends(get_db)
 ):
-    claim = db.query(ClaimRecord).filter(ClaimRecord.id == claim_id).first()
-    if not claim:
-        raise HTTPException(status_code=404, detail="Claim not found")
-    
     logger.info(f"Admin overriding claim {claim_id} to {update_data.status}")
-    
-    claim.status = update_data.status
-    claim.approved_amount = update_data.approved_amount
-    claim.decision_reasons = update_data.decision_reasons
-    
-    db.commit()
-    db.refresh(claim)
-    return {"status": "ok", "claim_id": claim.id, "new_status": claim.status}
+    result = override_claim(db, claim_id, _override_fields(update_data))
+    if result["outcome"] == "not_found":
+        raise HTTPException(status_code=404, detail="Claim not found")
+    if result["outcome"] == "conflict":
+        raise HTTPException(status_code=409, detail=f"Claim was changed by someone else (now version {result['version']}); reload it")
+    return {"status": "ok", "claim_id": claim_id, "new_status": result["status"], "version": result["version"]}
 
 @router.post("/upload", summary="Upload Multiple Documents for AI Adjudication")
 async def upload_claim_document(
     files: List[UploadFile] = File(...),
     member_id: Optional[str] = Form(None),
+    policy_id: Optional[str] = Form(None),
+    family_id: Optional[str] = Form(None),
+    async_mode: bool = Query(False, alias="async", description="Queue the claim and return 202 with a job id"),
     db: Session = Depends(get_db)
 ):
-    try:
-        original_filenames = [f.filename for f in files]
-        logger.info(f"Received {len(files)} files for upload: {original_filenames}")
+    check_policy_id(policy_id)
+    if async_mode:
+        return await _queue_upload(files, member_id, policy_id, family_id, db)
+    with UPLOADS_IN_FLIGHT.track_in_progress(), track_stage("total"):
+        return await _process_upload(files, member_id, policy_id, family_id, db)
 
-        file_contents = []
-        computed_hashes = []
-        uploaded_urls = [] 
-        is_duplicate_image = False
+@router.post("/bulk", summary="Submit many claims at once; results stream back as NDJSON")
+async def bulk_submit_claims(
+    archive: Optional[UploadFile] = File(None, description="zip or tar: one folder per claim, or a manifest.json"),
+    files: Optional[List[UploadFile]] = File(None, description="Documents referenced by `manifest`"),
+    manifest: Optional[str] = Form(None, description="JSON list of {ref, files, member_id, policy_id, family_id}"),
+    member_id: Optional[str] = Form(None),
+    policy_id: Optional[str] = Form(None),
+    family_id: Optional[str] = Form(None),
+):
+    if (archive is None) == (not files):
+        raise HTTPException(status_code=400, detail="Send either an archive or files with a manifest")
+    check_policy_id(policy_id)
 
-        for file in files:
-            # 1. Read file into memory
-            content = await file.read()
-            file_contents.append(content)
-            
-            # 2. Upload to Cloudinary
+    budget = ByteBudget(MAX_BULK_REQUEST_BYTES)
+    if archive is not None:
+        with track_stage("read_file"):
+            # The archive itself is only capped by the bulk budget; its members get the per-file cap
+            check_declared_sizes([archive], budget, MAX_BULK_REQUEST_BYTES)
+            packed = await ingest_upload(archive, ByteBudget(MAX_BULK_REQUEST_BYTES), MAX_BULK_REQUEST_BYTES)
             try:
-                # We upload the bytes ('content') directly
-                # resource_type="auto" handles PDFs and Images automatically
-                upload_result = cloudinary.uploader.upload(content, resource_type="auto")
-                secure_url = upload_result.get("secure_url")
-                uploaded_urls.append(secure_url)
-                logger.info(f"Uploaded to Cloudinary: {secure_url}")
-            except Exception as cloud_err:
-                logger.error(f"Cloudinary upload failed for {file.filename}: {cloud_err}")
-                raise HTTPException(status_code=500, detail="Failed to upload image to cloud storage")
-
-            # 3. Calculate Hash for Fraud Detection
-            phash = calculate_phash(content)
-            if phash:
-                computed_hashes.append(phash)
-                if check_duplicate_images(phash, db):
-                    is_duplicate_image = True
-
-        # Combine URLs for storage (comma separated)
-        combined_file_urls = ", ".join(uploaded_urls)
-
-        # --- DUPLICATE HANDLING ---
-        if is_duplicate_image:
-            logger.warning("Duplicate detected. Flagging for review.")
-            extracted_data = {"total_amount": 0.0, "diagnosis": "Potential Duplicate Upload"}
-            decision_result = {
-                "decision": "MANUAL_REVIEW",
-                "approved_amount": 0.0,
-                "reasons": ["DUPLICATE_IMAGE_DETECTED"],
-                "confidence": 0.0,
-                "summary_text": "This document appears identical to a previously submitted claim. Flagged for manual verification.",
-                "medical_context": "Analysis paused due to duplicate detection."
-            }
-            
-            db_record = ClaimRecord(
-                file_name=combined_file_urls, 
-                status="MANUAL_REVIEW",
-                total_amount=0.0,
-                approved_amount=0.0,
-                confidence_score=0.0,
-                extracted_data=extracted_data,
-                decision_reasons=["DUPLICATE_IMAGE_DETECTED"],
-                image_hash=computed_hashes[0] if computed_hashes else None
-            )
-            db.add(db_record)
-            db.commit()
-            db.refresh(db_record)
-            
-            return {
-                "status": "ok",
-                "claim_id": db_record.id,
-                "files_processed": uploaded_urls,
-                "extracted_data": extracted_data,
-                "decision": decision_result
-            }
-
-        # --- AI EXTRACTION ---
-        extracted_data = await extract_claim_data(file_contents, original_filenames)
-        if not extracted_data:
-            raise HTTPException(status_code=422, detail="AI Extraction Failed.")
-
-        # --- MEMBER RESOLUTION ---
-        final_member_id = None
-        if member_id: final_member_id = member_id
-        elif extracted_data.get("member", {}).get("member_id"): final_member_id = extracted_data.get("member", {}).get("member_id")
-        elif extracted_data.get("member", {}).get("name"): final_member_id = extracted_data.get("member", {}).get("name")
-        else: final_member_id = "Unknown_Guest"
-
-        if not extracted_data.get("member"): extracted_data["member"] = {}
-        extracted_data["member"]["member_id"] = final_member_id
-
-        # --- VELOCITY CHECK ---
-        todays_claim_count = 0
-        if final_member_id != "Unknown_Guest":
-            today = date.today()
-            todays_claim_count = db.query(ClaimRecord).filter(
-                ClaimRecord.member_id == final_member_id,
-                func.date(ClaimRecord.created_at) == today
-            ).count()
-            logger.info(f"VELOCITY CHECK: Member '{final_member_id}' has {todays_claim_count} previous claims today.")
-        
-        extracted_data["prev_claims_same_day"] = todays_claim_count
-
-        # --- ADJUDICATION ---
-        decision_result = adjudicate_claim(extracted_data)
-        
-        # --- NARRATOR ---
-        narrative_data = generate_narrative(extracted_data, decision_result)
-        decision_result["summary_text"] = narrative_data.get("summary")
-        decision_result["medical_context"] = narrative_data.get("medical_context")
-
-        # --- SAVE TO DATABASE ---
-        db_reasons = decision_result.get("reasons", [])[:]
-        if decision_result.get("summary_text"):
-            db_reasons.insert(0, f"Summary: {decision_result['summary_text']}")
-
-        db_record = ClaimRecord(
-            file_name=combined_file_urls, # STORE URL NOT FILENAME
-            member_id=final_member_id,
-            status=decision_result["decision"],
-            total_amount=extracted_data.get("total_amount", 0.0),
-            approved_amount=decision_result.get("approved_amount", 0.0),
-            confidence_score=decision_result.get("confidence", 0.0),
-            extracted_data=extracted_data,
-            decision_reasons=db_reasons,
-            image_hash=computed_hashes[0] if computed_hashes else None
-        )
-        db.add(db_record)
-        db.commit()
-        db.refresh(db_record)
-        
-        logger.info(f"Claim saved to DB with ID: {db_record.id}")
-
-        return {
-            "status": "ok",
-            "claim_id": db_record.id, 
-            "files_processed": uploaded_urls, # Return URLs
-            "extracted_data": extracted_data,
-            "decision": decision_result
-        }
+                with packed.open() as source:
+                    unpacked = await asyncio.to_thread(unpack_archive, source, budget)
+            finally:
+                packed.close()
+        documents, manifest = unpacked["documents"], unpacked["manifest"] or manifest
+    else:
+        ingested = await _ingest_files(files, budget)
+        documents = {d.filename: d for d in ingested}
+        if len(documents) != len(ingested):
+            close_all(ingested)
+            raise HTTPException(status_code=400, detail="Uploaded file names must be unique")
+
+    claims = claims_from_documents(manifest, documents, member_id, policy_id, family_id)
+    return StreamingResponse(stream_bulk_results(claims), media_type="application/x-ndjson")
+
+async def _queue_upload(files: List[UploadFile], member_id: Optional[str], policy_id: Optional[str],
+                        family_id: Optional[str], db: Session):
+    documents = await _ingest_files(files)
+    try:
+        job = await run_sync(enqueue_job, db, documents, member_id, policy_id, family_id)
+    finally:
+        close_all(documents)
+    status_url = f"{router.prefix}/jobs/{job.id}"
+    return JSONResponse(status_code=202, headers={"Location": status_url}, content={
+        "status": "accepted",
+        "job_id": job.id,
+        "status_url": status_url,
+        "events_url": f"{status_url}/events",
+    })
 
+async def _process_upload(files: List[UploadFile], member_id: Optional[str], policy_id: Optional[str],
+                          family_id: Optional[str], db: Session):
+    documents: List[IngestedFile] = []
+    try:
+        documents = await _ingest_files(files)
+        return await process_claim(documents, member_id, policy_id, family_id, db)
     except HTTPException as he:
         raise he
+    except ServiceError:
+        raise
     except Exception as e:
         logger.exception("Upload flow failed")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        close_all(documents)
+
+async def _ingest_files(files: List[UploadFile], budget: Optional[ByteBudget] = None) -> List[IngestedFile]:
+    """
+    Streams the files in chunks; the SHA-256 (fraud fingerprint and storage address) is computed
+    as bytes arrive and large files are spooled to disk.
+    """
+    logger.info(f"Received {len(files)} files for upload: {[f.filename for f in files]}")
+    budget = budget or ByteBudget()
+    check_declared_sizes(files, budget)
+    documents: List[IngestedFile] = []
+    try:
+        for file in files:
+            with track_stage("read_file"):
+                documents.append(await ingest_upload(file, budget))
+    except BaseException:
+        close_all(documents)
+        raise
+    return documents
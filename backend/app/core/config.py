@@ -9,6 +9,91 @@ DATA_DIR = os.environ.get("PLUM_DATA_DIR", ROOT/"backend" /"data")
 POLICY_FILE = os.environ.get("PLUM_POLICY_FILE", str(Path(DATA_DIR) / "policy_terms.json"))
 TEST_CASES_FILE = os.environ.get("PLUM_TEST_CASES_FILE", str(Path(DATA_DIR) / "test_cases.json"))
 
+# Additional employer policies (one JSON document per file, keyed by "policy_id")
+POLICY_DIR = os.environ.get("PLUM_POLICY_DIR", str(Path(DATA_DIR) / "policies"))
+POLICY_CACHE_SIZE = int(os.environ.get("PLUM_POLICY_CACHE_SIZE", "32"))
+POLICY_RELOAD_SECONDS = float(os.environ.get("PLUM_POLICY_RELOAD_SECONDS", "5"))
+
+# Database: any SQLAlchemy URL (e.g. postgresql://...); SQLite files get WAL and the pragmas below
+DATABASE_URL = os.environ.get("PLUM_DATABASE_URL", "sqlite:///./plum_claims.db")
+# Connections kept open per process, extra ones allowed under load, and seconds to wait for one.
+# Blocking DB work from async code runs on DB_POOL_SIZE threads (core.database.run_sync)
+DB_POOL_SIZE = int(os.environ.get("PLUM_DB_POOL_SIZE", "8"))
+DB_MAX_OVERFLOW = int(os.environ.get("PLUM_DB_MAX_OVERFLOW", "8"))
+DB_POOL_TIMEOUT = float(os.environ.get("PLUM_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.environ.get("PLUM_DB_POOL_RECYCLE_SECONDS", "1800"))
+# SQLite: how long a writer waits for the write lock, and bytes of the file read through mmap
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("PLUM_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_BYTES = int(os.environ.get("PLUM_SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+# Group commit: new claims are inserted in shared transactions of up to CLAIM_WRITE_BATCH_SIZE claims,
+# waiting at most CLAIM_WRITE_BATCH_MS after the first one for others to join
+CLAIM_WRITE_BATCH_SIZE = int(os.environ.get("PLUM_CLAIM_WRITE_BATCH_SIZE", "64"))
+CLAIM_WRITE_BATCH_MS = float(os.environ.get("PLUM_CLAIM_WRITE_BATCH_MS", "5"))
+
+# Claim document storage: "cloudinary", "local", or "write_behind" (local first, pushed to Cloudinary later)
+STORAGE_BACKEND = os.environ.get("PLUM_STORAGE_BACKEND", "cloudinary").lower()
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "uploads")
+# Max concurrent remote storage uploads per worker process (shared across requests)
+STORAGE_UPLOAD_CONCURRENCY = int(os.environ.get("PLUM_STORAGE_UPLOAD_CONCURRENCY", "4"))
+# Write-behind queue: poll interval, attempts before giving up, and exponential backoff base
+STORAGE_FLUSH_SECONDS = float(os.environ.get("PLUM_STORAGE_FLUSH_SECONDS", "2"))
+STORAGE_MAX_ATTEMPTS = int(os.environ.get("PLUM_STORAGE_MAX_ATTEMPTS", "6"))
+STORAGE_RETRY_BASE_SECONDS = float(os.environ.get("PLUM_STORAGE_RETRY_BASE_SECONDS", "5"))
+
+# Upload ingestion: files are streamed in chunks; anything above the spool size goes to a temp file
+INGEST_CHUNK_BYTES = int(os.environ.get("PLUM_INGEST_CHUNK_BYTES", str(256 * 1024)))
+INGEST_SPOOL_BYTES = int(os.environ.get("PLUM_INGEST_SPOOL_BYTES", str(1024 * 1024)))
+MAX_UPLOAD_FILE_BYTES = int(os.environ.get("PLUM_MAX_UPLOAD_FILE_BYTES", str(20 * 1024 * 1024)))
+MAX_UPLOAD_REQUEST_BYTES = int(os.environ.get("PLUM_MAX_UPLOAD_REQUEST_BYTES", str(50 * 1024 * 1024)))
+
+# Duplicate detection: how stale the in-process file hash index may get before a miss re-syncs it
+# with files recorded by other worker processes
+HASH_INDEX_REFRESH_SECONDS = float(os.environ.get("PLUM_HASH_INDEX_REFRESH_SECONDS", "1"))
+# Bloom filter sizing: digests it is sized for per layer, and the false positive rate (a false
+# positive only costs one confirming query). About 1.2 MB per million digests at 1%; it grows past this
+HASH_INDEX_CAPACITY = int(os.environ.get("PLUM_HASH_INDEX_CAPACITY", "1000000"))
+HASH_INDEX_ERROR_RATE = float(os.environ.get("PLUM_HASH_INDEX_ERROR_RATE", "0.01"))
+# Near-duplicates: 64-bit difference hash per image page; pages within this many differing bits match.
+# Off by default: perceptual hashes of text documents can match distinct bills sharing a layout
+NEAR_DUPLICATE_DETECTION = os.environ.get("PLUM_NEAR_DUPLICATE_DETECTION", "0").lower() in ("1", "true", "yes")
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.environ.get("PLUM_NEAR_DUPLICATE_MAX_DISTANCE", "6"))
+# Beyond a quarter of the bits two pages are no longer "the same document", and the index chunks
+# (64 / (distance + 1) bits each) get too narrow to narrow down candidates
+MAX_NEAR_DUPLICATE_DISTANCE = 16
+if not 0 <= NEAR_DUPLICATE_MAX_DISTANCE <= MAX_NEAR_DUPLICATE_DISTANCE:
+    raise ValueError(f"PLUM_NEAR_DUPLICATE_MAX_DISTANCE must be between 0 and {MAX_NEAR_DUPLICATE_DISTANCE}, "
+                     f"got {NEAR_DUPLICATE_MAX_DISTANCE}")
+
+# Claim velocity: sliding windows in days ("same_day" counts since midnight UTC) and the number of
+# prior claims in a window that sends a claim to review; policies can override the limits under
+# claim_requirements.velocity_limits
+VELOCITY_WINDOWS = {name: int(days) for name, days in (
+    part.split("=") for part in os.environ.get("PLUM_VELOCITY_WINDOWS", "same_day=1,7d=7,30d=30").split(","))}
+VELOCITY_LIMITS = {name: int(count) for name, count in (
+    part.split("=") for part in os.environ.get("PLUM_VELOCITY_LIMITS", "7d=5,30d=12").split(",") if part)}
+# In-process per-member counters: members kept, and how stale they may get versus other workers
+VELOCITY_CACHE_MEMBERS = int(os.environ.get("PLUM_VELOCITY_CACHE_MEMBERS", "10000"))
+VELOCITY_REFRESH_SECONDS = float(os.environ.get("PLUM_VELOCITY_REFRESH_SECONDS", "2"))
+
+# Bulk submission (POST /v1/claims/bulk): claims processed at once per process, archive size and claim count caps
+BULK_CLAIM_CONCURRENCY = int(os.environ.get("PLUM_BULK_CLAIM_CONCURRENCY", "4"))
+MAX_BULK_REQUEST_BYTES = int(os.environ.get("PLUM_MAX_BULK_REQUEST_BYTES", str(500 * 1024 * 1024)))
+BULK_MAX_CLAIMS = int(os.environ.get("PLUM_BULK_MAX_CLAIMS", "500"))
+# Manifest size cap: generous for BULK_MAX_CLAIMS entries, and counted against the request budget
+BULK_MANIFEST_MAX_BYTES = int(os.environ.get("PLUM_BULK_MANIFEST_MAX_BYTES", str(1024 * 1024)))
+
+# Bulk admin override (PATCH /v1/claims): rows accepted per request, all applied in one transaction
+BULK_OVERRIDE_MAX_ROWS = int(os.environ.get("PLUM_BULK_OVERRIDE_MAX_ROWS", "5000"))
+
+# Asynchronous uploads (?async=true): documents wait in the spool dir (not served publicly) for the job workers
+JOB_SPOOL_DIR = os.environ.get("PLUM_JOB_SPOOL_DIR", "job_spool")
+JOB_WORKERS = int(os.environ.get("PLUM_JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.environ.get("PLUM_JOB_POLL_SECONDS", "0.5"))
+# A RUNNING job whose lease lapses (worker crashed) is retried, up to JOB_MAX_ATTEMPTS runs
+JOB_LEASE_SECONDS = float(os.environ.get("PLUM_JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("PLUM_JOB_MAX_ATTEMPTS", "3"))
+
 LOG_DIR = Path(os.environ.get("PLUM_LOG_DIR", str(ROOT / "logs")))
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -1,19 +1,108 @@
-from sqlalchemy import create_engine
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./plum_claims.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+from .config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE_SECONDS,
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_BYTES,
 )
+
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+
+T = TypeVar("T")
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT,
+                "pool_recycle": DB_POOL_RECYCLE_SECONDS, "pool_pre_ping": True}
+    options: Dict[str, Any] = {
+        "connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    }
+    if parsed.database not in (None, "", ":memory:"):
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, _connection_record):
+        """
+        WAL lets readers run alongside the single writer; synchronous=NORMAL only syncs at
+        checkpoints (still safe against corruption, a power cut may lose the last commits).
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+# --- ASYNC ACCESS ---
+# One thread per pooled connection: DB work from the event loop queues here instead of blocking it,
+# and never holds more connections than the pool keeps open
+_db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="db")
+
+async def run_sync(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Awaits a blocking DB call on the DB threads, e.g. `await run_sync(find_duplicate_files, digests, db)`.
+    A session may be passed along as long as it is not used by two calls at once.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(fn, *args, **kwargs))
+
+async def run_in_session(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Like run_sync, with a fresh session passed as the first argument and closed afterwards."""
+    def call() -> T:
+        db = SessionLocal()
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+    return await run_sync(call)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def ensure_columns():
+    """
+    Adds nullable columns that were added to existing tables (SQLite ALTER TABLE ADD COLUMN).
+    A column with info={"backfill": "<sql expression>"} is filled from it once added.
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                if column.info.get("backfill"):
+                    conn.execute(text(f'UPDATE {table.name} SET {column.name} = {column.info["backfill"]}'))
+
+def ensure_indexes():
+    """create_all skips tables that already exist, so indexes added to existing tables are created here."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
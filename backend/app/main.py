@@ -1,25 +1,41 @@
 import os
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles 
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from .api.v1.routes_claims import router as claims_router
 from .utils.logging_utils import setup_logging
 from .utils import exception_handlers
-from .core.database import engine, Base
+from .utils.metrics import render_metrics
+from .core.config import UPLOAD_DIR, MAX_UPLOAD_REQUEST_BYTES, MAX_BULK_REQUEST_BYTES, JOB_SPOOL_DIR, JOB_WORKERS
+from .core.database import engine, Base, ensure_columns, ensure_indexes, run_in_session
 from .models import sql_models
+from .services.storage import WriteBehindStorage, storage, run_write_behind_worker
+from .services.job_queue import run_job_worker
+from .services.claim_writer import claim_writer
+from .services.claim_details import legacy_columns
+from .services.fraud_detection import hash_index
 
 logger = setup_logging()
 
 # --- SETUP UPLOADS FOLDER ---
-UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
 
 # --- DATABASE INITIALIZATION ---
 # This ensures tables are created every time the container starts (since DB is ephemeral)
 Base.metadata.create_all(bind=engine)
+ensure_columns()
+ensure_indexes()
+# Older databases kept extracted_data / decision_reasons on the claims row. Moving them is a one-shot
+# step run before the server starts (Dockerfile CMD), never per worker at import time
+_legacy = legacy_columns()
+if _legacy:
+    logger.warning(f"claims still has legacy columns {_legacy}; their claims show no details until "
+                   f"`python -m app.tools.split_claim_details` is run")
 
 app = FastAPI(title="Plum Claims Adjudicator - Backend", version="0.1")
 
@@ -34,10 +50,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paging and sync headers of /v1/claims/pending, readable by the dashboard
+    expose_headers=["ETag", "X-Next-Cursor", "X-Sync-Token", "Link"],
 )
 
+# --- UPLOAD SIZE GUARD ---
+# Rejects oversized claim uploads from Content-Length before the multipart body is parsed;
+# chunked bodies without a length are capped during ingestion instead
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_LIMITS = {"/upload": MAX_UPLOAD_REQUEST_BYTES, "/bulk": MAX_BULK_REQUEST_BYTES}
+
+@app.middleware("http")
+async def reject_oversized_uploads(request, call_next):
+    length = request.headers.get("content-length")
+    limit = UPLOAD_LIMITS.get(request.url.path[request.url.path.rfind("/"):])
+    if request.method == "POST" and limit and length and length.isdigit() \
+            and int(length) > limit + MULTIPART_OVERHEAD_BYTES:
+        return JSONResponse(status_code=413, content={"status": "error", "error": {
+            "code": "PAYLOAD_TOO_LARGE", "message": f"Upload exceeds the {limit} byte limit per request"}})
+    return await call_next(request)
+
 app.include_router(claims_router)
 
+# --- BACKGROUND WORKERS ---
+# Write-behind: documents land in UPLOAD_DIR first and are pushed to Cloudinary off the request path.
+# Claim jobs: uploads sent with ?async=true are processed by JOB_WORKERS queue consumers.
+# Claim writer: new claims are inserted in group commits shared by concurrent uploads.
+_background_tasks = set()
+
+@app.on_event("startup")
+async def warm_duplicate_index():
+    # Loads every recorded file digest so most duplicate checks never reach the database
+    await run_in_session(hash_index.warm)
+
+@app.on_event("startup")
+async def start_background_workers():
+    claim_writer.start()
+    if isinstance(storage, WriteBehindStorage):
+        _background_tasks.add(asyncio.create_task(run_write_behind_worker()))
+    for _ in range(JOB_WORKERS):
+        _background_tasks.add(asyncio.create_task(run_job_worker()))
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    for task in _background_tasks:
+        task.cancel()
+    # Claims already handed to the writer are still committed
+    await claim_writer.close()
+
 app.add_exception_handler(exception_handlers.ServiceError, exception_handlers.http_exception_handler)
 app.add_exception_handler(Exception, exception_handlers.unhandled_exception_handler)
 
@@ -48,4 +108,9 @@ async def validation_exception_handler(request, exc):
 
 @app.get("/")
 def health_check():
-    return {"status": "ok", "message": "Plum Claims Backend is running!"}
\ No newline at end of file
+    return {"status": "ok", "message": "Plum Claims Backend is running!"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus text format; counters are per worker process
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,92 @@
+from typing import Any, Dict, Optional, Tuple, Union
+from datetime import datetime
+from pydantic import BaseModel
+
+from ..utils.date_parsing import parse_date
+
+def money(x):
+    try: return round(float(x or 0.0), 2)
+    except: return 0.0
+
+def _optional_money(x) -> Optional[float]:
+    return None if x is None else money(x)
+
+def _lower(value: Any) -> str:
+    return str(value).lower() if value else ""
+
+
+class NormalizedClaim:
+    """
+    Compact, normalize-once representation consumed by the rule engine.
+    Strings are pre-lowered, dates pre-parsed and line items stored as parallel tuples,
+    so the individual checks never touch the raw nested dict again.
+    """
+    __slots__ = (
+        "raw", "policy_id", "total_amount", "treatment_date", "join_date", "member_id", "family_id",
+        "diagnosis", "diagnosis_lc", "hospital_name", "doc_types", "doctor_reg", "has_documents",
+        "item_names", "item_names_lc", "item_categories_lc", "item_amounts", "has_items",
+        "prev_claims_same_day", "velocity", "extraction_conf", "annual_used", "family_used",
+    )
+
+    def __init__(self, claim: Dict[str, Any]):
+        self.raw = claim
+        self.policy_id: Optional[str] = claim.get("policy_id")
+        self.total_amount: float = money(claim.get("total_amount", 0.0))
+        self.treatment_date: Optional[datetime] = parse_date(claim.get("treatment_date"))
+
+        member = claim.get("member") or {}
+        self.join_date: Optional[datetime] = parse_date(member.get("join_date"))
+        self.member_id: Optional[str] = member.get("member_id")
+        self.family_id: Optional[str] = member.get("family_id") or self.member_id
+
+        self.diagnosis: Optional[str] = claim.get("diagnosis")
+        self.diagnosis_lc: str = _lower(self.diagnosis)
+        self.hospital_name: Optional[str] = (claim.get("hospital") or {}).get("name")
+
+        docs = claim.get("documents") or []
+        self.has_documents: bool = bool(docs)
+        self.doc_types: Tuple[str, ...] = tuple(_lower(d.get("type")) for d in docs)
+        doctor_reg = claim.get("doctor_reg")
+        if not doctor_reg:
+            doctor_reg = next((d.get("doctor_reg") for d in docs if d.get("doctor_reg")), None)
+        self.doctor_reg: Optional[str] = doctor_reg
+
+        items = claim.get("items") or []
+        self.has_items: bool = bool(items)
+        if not items and self.total_amount > 0:
+            items = [{"name": "Medical Charges", "amount": self.total_amount, "category": "General"}]
+        names, names_lc, categories_lc, amounts = [], [], [], []
+        for item in items:
+            name = item.get("name")
+            names.append(name)
+            names_lc.append(name.lower() if isinstance(name, str) else _lower(name))
+            categories_lc.append(_lower(item.get("category")))
+            amounts.append(money(item.get("amount", 0.0)))
+        self.item_names: Tuple[Any, ...] = tuple(names)
+        self.item_names_lc: Tuple[str, ...] = tuple(names_lc)
+        self.item_categories_lc: Tuple[str, ...] = tuple(categories_lc)
+        self.item_amounts: Tuple[float, ...] = tuple(amounts)
+
+        self.prev_claims_same_day: int = int(claim.get("prev_claims_same_day") or 0)
+        # Prior claims per velocity window (e.g. {"7d": 2, "30d": 5}), attached before adjudication
+        self.velocity: Dict[str, int] = {k: int(v or 0) for k, v in (claim.get("velocity") or {}).items()}
+        self.extraction_conf: float = float(claim.get("_extraction_conf", 0.85))
+        # Amounts already approved this policy year, attached from the member ledger (None = unknown)
+        self.annual_used: Optional[float] = _optional_money(claim.get("annual_used"))
+        self.family_used: Optional[float] = _optional_money(claim.get("family_used"))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style access to the original payload for fields the checks do not normalize."""
+        return self.raw.get(key, default)
+
+
+def normalize_claim(claim: Union[Dict[str, Any], BaseModel, NormalizedClaim]) -> NormalizedClaim:
+    """Accepts a raw claim dict, a ClaimModel, or an already normalized claim."""
+    if isinstance(claim, NormalizedClaim):
+        return claim
+    if isinstance(claim, BaseModel):
+        dump = getattr(claim, "model_dump", None) or claim.dict
+        data = dump()
+        data.setdefault("_extraction_conf", getattr(claim, "_extraction_conf", None) or 0.85)
+        claim = data
+    return NormalizedClaim(claim)
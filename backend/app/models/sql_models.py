@@ -1,9 +1,47 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, DateTime
+import json
+import zlib
+from sqlalchemy import Column, Integer, String, Float, JSON, Date, DateTime, ForeignKey, Index, LargeBinary, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
 from ..core.database import Base
 
+# Characters of the first decision reason kept on the claim row for list views
+PRIMARY_REASON_CHARS = 200
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON stored as a zlib-compressed blob; LLM extractions shrink several times over."""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return json.loads(zlib.decompress(value))
+
+
 class ClaimRecord(Base):
+    """
+    Hot half of a claim: the columns list, filter, velocity and duplicate queries read, so table
+    pages stay small. The full extraction and decision reasons live in ClaimDetail and load on first
+    access of `extracted_data` / `decision_reasons`.
+    """
     __tablename__ = "claims"
+    __table_args__ = (
+        # Velocity checks: one member's claims in a created_at range
+        Index("ix_claims_member_created", "member_id", "created_at"),
+        # Review queue: keyset pages of one status, newest first
+        Index("ix_claims_status_created", "status", "created_at", "id"),
+        # One claim per background job: a job re-run after its lease expired must not insert another.
+        # A unique index rather than a UNIQUE column, so ensure_columns can add job_id to old tables
+        Index("ux_claims_job_id", "job_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -15,8 +53,157 @@ class ClaimRecord(Base):
     approved_amount = Column(Float)
     confidence_score = Column(Float)
     
-    extracted_data = Column(JSON)
-    decision_reasons = Column(JSON)
-    image_hash = Column(String, nullable=True) # Stores the pHash fingerprint
+    primary_reason = Column(String, nullable=True) # First decision reason (truncated), for list views
+    image_hash = Column(String, nullable=True) # SHA-256 of the first file; every file is in claim_files
+    policy_id = Column(String, nullable=True)
+    policy_version = Column(String, nullable=True) # Version of the policy that produced the decision
+    job_id = Column(String, nullable=True) # Idempotency key of the claim job that created the claim
     
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped on every change; drives review-queue ETags and `since` deltas
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True,
+                        info={"backfill": "created_at"})
+    # Bumped by every admin override; clients send it back for optimistic concurrency checks
+    version = Column(Integer, default=1, info={"backfill": "1"})
+
+    detail = relationship("ClaimDetail", uselist=False, lazy="select", cascade="all, delete-orphan")
+
+    def _detail(self) -> "ClaimDetail":
+        if self.detail is None:
+            self.detail = ClaimDetail()
+        return self.detail
+
+    @property
+    def extracted_data(self):
+        return self.detail.extracted_data if self.detail is not None else None
+
+    @extracted_data.setter
+    def extracted_data(self, value):
+        self._detail().extracted_data = value
+
+    @property
+    def decision_reasons(self):
+        return self.detail.decision_reasons if self.detail is not None else None
+
+    @decision_reasons.setter
+    def decision_reasons(self, value):
+        self._detail().decision_reasons = value
+        self.primary_reason = primary_reason(value)
+
+
+def primary_reason(reasons):
+    return str(reasons[0])[:PRIMARY_REASON_CHARS] if reasons else None
+
+
+class ClaimDetail(Base):
+    """Cold half of a claim (one row per claim): large JSON, compressed, read only when a claim is opened."""
+    __tablename__ = "claim_details"
+
+    claim_id = Column(Integer, ForeignKey("claims.id", ondelete="CASCADE"), primary_key=True)
+    extracted_data = Column(CompressedJSON) # Full LLM output: items, lab results, raw text
+    decision_reasons = Column(CompressedJSON)
+
+
+class ClaimFile(Base):
+    """One row per uploaded document, so every page of a claim takes part in duplicate detection."""
+    __tablename__ = "claim_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    claim_id = Column(Integer, index=True, nullable=False)
+    digest = Column(String, index=True, nullable=False) # SHA-256 of the content
+    phash = Column(String, nullable=True) # 64-bit difference hash (hex) of image pages, for near-duplicates
+    position = Column(Integer, default=0) # Order of the file within the upload
+    file_name = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class MemberLedger(Base):
+    """
+    Running approved totals per member / family, policy year and category.
+    Maintained incrementally whenever a claim is persisted or overridden (see services/member_ledger.py).
+    """
+    __tablename__ = "member_ledger"
+    __table_args__ = (
+        UniqueConstraint("scope", "scope_key", "policy_id", "policy_year", "category", name="uq_member_ledger_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    scope = Column(String, nullable=False) # "member" or "family"
+    scope_key = Column(String, nullable=False)
+    policy_id = Column(String, nullable=False)
+    policy_year = Column(Integer, nullable=False)
+    category = Column(String, nullable=False) # "_all" holds the total across categories
+
+    approved_total = Column(Float, default=0.0)
+    claim_count = Column(Integer, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ClaimStat(Base):
+    """
+    Daily claim rollups for the analytics endpoint, by status and one dimension: "_all" (every claim),
+    "reason" (one row per reason code) or "hospital". Maintained incrementally with the claims
+    (see services/claim_stats.py), so dashboards read O(days) rows rather than every claim.
+    """
+    __tablename__ = "claim_stats"
+    __table_args__ = (
+        UniqueConstraint("day", "status", "dimension", "key", name="uq_claim_stats_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    day = Column(Date, nullable=False, index=True) # Submission day (claims.created_at, UTC)
+    status = Column(String, nullable=False)
+    dimension = Column(String, nullable=False)
+    key = Column(String, nullable=False) # Reason code or hospital name; "" for "_all"
+
+    claim_count = Column(Integer, default=0)
+    claimed_total = Column(Float, default=0.0)
+    approved_total = Column(Float, default=0.0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class StorageUpload(Base):
+    """Write-behind queue: documents saved locally that still have to be pushed to remote storage."""
+    __tablename__ = "storage_uploads"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    digest = Column(String, index=True) # SHA-256 of the content
+    local_key = Column(String) # Path under UPLOAD_DIR, as stored in ClaimRecord.file_name until pushed
+    file_name = Column(String, nullable=True)
+
+    status = Column(String, index=True, default="PENDING") # PENDING -> DONE | FAILED
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    remote_url = Column(String, nullable=True)
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ClaimJob(Base):
+    """Asynchronous upload: the claim pipeline run by a background worker (see services/job_queue.py)."""
+    __tablename__ = "claim_jobs"
+
+    id = Column(String, primary_key=True) # uuid4 hex, returned to the client
+    status = Column(String, index=True, default="QUEUED") # QUEUED -> RUNNING -> DONE | FAILED
+    stage = Column(String, nullable=True) # Pipeline stage currently running
+
+    params = Column(JSON) # member_id / policy_id / family_id and the spooled documents
+    claim_id = Column(Integer, nullable=True)
+    result = Column(JSON, nullable=True) # Same body the synchronous upload returns
+    error = Column(JSON, nullable=True) # {"status_code", "detail"}
+
+    attempts = Column(Integer, default=0)
+    worker = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True) # A RUNNING job past its lease is picked up again
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
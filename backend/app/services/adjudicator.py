@@ -1,106 +1,17 @@
 import re
 import time
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Optional, Union
 from datetime import datetime, timedelta, timezone
 from ..utils.logging_utils import setup_logging
 from ..utils.exception_handlers import ServiceError
-from ..utils.security import redact_phi
+from ..models.claim_model import ClaimModel
+from ..models.normalized_claim import NormalizedClaim, normalize_claim, money
+from .policy_engine import CompiledPolicy, compile_policy
+from .policy_registry import registry
+from .rule_engine import Rule, RuleEngine
 
 logger = setup_logging()
 
-POLICY = {
-  "policy_id": "PLUM_OPD_2024",
-  "policy_name": "Plum OPD Advantage",
-  "effective_date": "2024-01-01",
-  "policy_holder": {
-    "company": "TechCorp Solutions Pvt Ltd",
-    "employees_covered": 500,
-    "dependents_covered": True
-  },
-  "coverage_details": {
-    "annual_limit": 50000,
-    "per_claim_limit": 5000,
-    "family_floater_limit": 150000,
-    "consultation_fees": {
-      "covered": True,
-      "sub_limit": 2000,
-      "copay_percentage": 10,
-      "network_discount": 20
-    },
-    "diagnostic_tests": {
-      "covered": True,
-      "sub_limit": 10000,
-      "pre_authorization_required": False,
-      "covered_tests": [
-        "Blood tests", "Urine tests", "X-rays", "ECG",
-        "Ultrasound", "MRI (with pre-auth)", "CT Scan (with pre-auth)"
-      ]
-    },
-    "pharmacy": {
-      "covered": True,
-      "sub_limit": 15000,
-      "generic_drugs_mandatory": True,
-      "branded_drugs_copay": 30
-    },
-    "dental": {
-      "covered": True,
-      "sub_limit": 10000,
-      "routine_checkup_limit": 2000,
-      "procedures_covered": ["Filling", "Extraction", "Root canal", "Cleaning"],
-      "cosmetic_procedures": False
-    },
-    "vision": {
-      "covered": True,
-      "sub_limit": 5000,
-      "eye_test_covered": True,
-      "glasses_contact_lenses": True,
-      "lasik_surgery": False
-    },
-    "alternative_medicine": {
-      "covered": True,
-      "sub_limit": 8000,
-      "covered_treatments": ["Ayurveda", "Homeopathy", "Unani"],
-      "therapy_sessions_limit": 20
-    }
-  },
-  "waiting_periods": {
-    "initial_waiting": 30,
-    "pre_existing_diseases": 365,
-    "maternity": 270,
-    "specific_ailments": {
-      "diabetes": 90,
-      "hypertension": 90,
-      "joint_replacement": 730
-    }
-  },
-  "exclusions": [
-    "Cosmetic procedures", "Weight loss treatments", "Infertility treatments",
-    "Experimental treatments", "Self-inflicted injuries", "Adventure sports injuries",
-    "War and nuclear risks", "HIV/AIDS treatment", "Alcoholism/drug abuse treatment",
-    "Non-allopathic treatments (except listed)",
-    "Vitamins and supplements (unless prescribed for deficiency)"
-  ],
-  "claim_requirements": {
-    "documents_required": [
-      "Original bills and receipts", "Prescription from registered doctor",
-      "Diagnostic test reports (if applicable)", "Pharmacy bills with prescription",
-      "Doctor's registration number must be visible", "Patient details must match policy records"
-    ],
-    "submission_timeline_days": 30,
-    "minimum_claim_amount": 500
-  },
-  "network_hospitals": [
-    "Apollo Hospitals", "Fortis Healthcare", "Max Healthcare",
-    "Manipal Hospitals", "Narayana Health"
-  ],
-  "cashless_facilities": {
-    "available": True,
-    "network_only": True,
-    "pre_approval_required": False,
-    "instant_approval_limit": 5000
-  }
-}
-
 # --- CONFIGURATION ---
 ADJUDICATION_CONFIG = {
     "weights": {
@@ -108,27 +19,19 @@ ADJUDICATION_CONFIG = {
         "policy_alignment": 0.3,
         "document_integrity": 0.3
     },
-    "doctor_reg_regex": r"^[A-Z]{2,10}[-\/\s]?([A-Z]{2,3}[-\/\s]?)?\d{1,6}[-\/\s]?\d{4}$"
+    "doctor_reg_regex": r"^[A-Z]{2,10}[-\/\s]?([A-Z]{2,3}[-\/\s]?)?\d{1,6}[-\/\s]?\d{4}$",
+    # Stop evaluating rules once a terminal rule (eligibility, documents, fraud) has fixed the decision.
+    # A short-circuited rejection has no coverage breakdown and only the terminal rules' reasons, so
+    # this default (the online path) is off; batch, backfill and simulation pass short_circuit=True
+    "short_circuit": False
 }
 
-# --- HELPER FUNCTIONS ---
+BALANCE_LABELS = {
+    "ANNUAL_LIMIT_EXCEEDED": "Annual Limit Exceeded",
+    "FAMILY_LIMIT_EXCEEDED": "Family Floater Limit Exceeded",
+}
 
-def parse_date(d):
-    if not d: return None
-    if isinstance(d, (int, float)):
-        try: return datetime.fromtimestamp(d, tz=timezone.utc)
-        except: return None
-    d = str(d).strip()
-    try: return datetime.fromisoformat(d).replace(tzinfo=timezone.utc)
-    except: pass
-    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d", "%d-%b-%Y"):
-        try: return datetime.strptime(d, fmt).replace(tzinfo=timezone.utc)
-        except: continue
-    return None
-
-def money(x):
-    try: return round(float(x or 0.0), 2)
-    except: return 0.0
+# --- HELPER FUNCTIONS ---
 
 def validate_doctor_reg(reg_no: str) -> bool:
     if not reg_no: return False
@@ -136,30 +39,48 @@ def validate_doctor_reg(reg_no: str) -> bool:
     pattern = ADJUDICATION_CONFIG["doctor_reg_regex"]
     return bool(re.match(pattern, clean_reg))
 
+def resolve_policy(policy=None) -> CompiledPolicy:
+    """Accepts a CompiledPolicy, a raw policy dict, a policy_id, or None (the default policy)."""
+    if isinstance(policy, CompiledPolicy): return policy
+    if isinstance(policy, dict): return compile_policy(policy)
+    return registry.get(policy)
+
+def remaining_balance(claim: NormalizedClaim, policy: CompiledPolicy) -> Tuple[float, str]:
+    """
+    Policy-year balance left for this claim as (amount, flag raised when it is exceeded).
+    Usage comes from the member ledger; limits the policy does not declare are ignored.
+    """
+    balance, flag = float("inf"), None
+    for limit, used, limit_flag in (
+        (policy.annual_limit, claim.annual_used, "ANNUAL_LIMIT_EXCEEDED"),
+        (policy.family_floater_limit, claim.family_used, "FAMILY_LIMIT_EXCEEDED"),
+    ):
+        if limit > 0 and used is not None and max(0.0, limit - used) < balance:
+            balance, flag = max(0.0, round(limit - used, 2)), limit_flag
+    return balance, flag
+
 # --- CHECK FUNCTIONS ---
 
-def check_eligibility(claim: Dict[str, Any]) -> Tuple[bool, List[str], Dict]:
+def check_eligibility(claim: NormalizedClaim, policy: CompiledPolicy = None) -> Tuple[bool, List[str], Dict]:
+    claim = normalize_claim(claim)
+    policy = resolve_policy(policy)
     flags = []
     notes = {}
     try:
-        eff = POLICY.get("effective_date")
-        td = parse_date(claim.get("treatment_date"))
-        if eff:
-            eff_d = parse_date(eff)
-            if td and eff_d and td < eff_d:
-                flags.append("POLICY_INACTIVE")
-                notes["policy_active_from"] = eff_d.strftime("%Y-%m-%d")
+        eff_d = policy.effective_from
+        td = claim.treatment_date
+        if td and eff_d and td < eff_d:
+            flags.append("POLICY_INACTIVE")
+            notes["policy_active_from"] = eff_d.strftime("%Y-%m-%d")
         
-        member = claim.get("member") or {}
-        join_date = parse_date(member.get("join_date"))
+        join_date = claim.join_date
         if not join_date: join_date = datetime(2024, 1, 1, tzinfo=timezone.utc)
 
         if join_date and td:
-            waiting = POLICY.get("waiting_periods", {}).get("specific_ailments", {})
-            diag = (claim.get("diagnosis") or "").lower()
-            for cond, days in waiting.items():
-                if cond.lower() in diag:
-                    eligible_on = join_date + timedelta(days=int(days))
+            hits = policy.waiting_matcher.labels(claim.diagnosis_lc)
+            for cond, days in policy.waiting_periods.items():
+                if cond in hits:
+                    eligible_on = join_date + timedelta(days=days)
                     if td < eligible_on:
                         flags.append("WAITING_PERIOD")
                         notes["waiting_period_until"] = eligible_on.strftime("%Y-%m-%d")
@@ -168,32 +89,23 @@ def check_eligibility(claim: Dict[str, Any]) -> Tuple[bool, List[str], Dict]:
         flags.append("ELIGIBILITY_CHECK_ERROR")
     return (len(flags) == 0, flags, notes)
 
-def check_documents(claim: Dict[str, Any]) -> Tuple[bool, List[str]]:
+def check_documents(claim: NormalizedClaim, policy: CompiledPolicy = None) -> Tuple[bool, List[str]]:
+    claim = normalize_claim(claim)
+    policy = resolve_policy(policy)
     flags = []
     try:
-        docs = claim.get("documents", [])
-        doc_types = [d.get("type", "").lower() for d in docs]
-        items = claim.get("items", [])
-        
-        if not docs and not items: 
+        if not claim.has_documents and not claim.has_items: 
              flags.append("MISSING_DOCUMENTS")
              
-        has_medicines = any("pharmacy" in i.get("category","").lower() or "medicine" in i.get("category","").lower() for i in items)
-        has_prescription = any("prescription" in dt for dt in doc_types)
+        has_medicines = claim.has_items and any("pharmacy" in policy.item_matcher.labels(c) for c in claim.item_categories_lc)
+        has_prescription = any("prescription" in dt for dt in claim.doc_types)
         
         if has_medicines and not has_prescription:
-            if not claim.get("diagnosis"):
+            if not claim.diagnosis:
                 flags.append("MISSING_DOCUMENTS")
 
-        doc_reg = claim.get("doctor_reg")
-        if not doc_reg:
-            for d in docs:
-                if d.get("doctor_reg"):
-                    doc_reg = d.get("doctor_reg")
-                    break
-        
-        if doc_reg:
-            if not validate_doctor_reg(doc_reg):
+        if claim.doctor_reg:
+            if not validate_doctor_reg(claim.doctor_reg):
                 flags.append("DOCTOR_REG_INVALID")
 
     except Exception as e:
@@ -201,55 +113,54 @@ def check_documents(claim: Dict[str, Any]) -> Tuple[bool, List[str]]:
         
     return (len(flags) == 0, list(set(flags)))
 
-def check_coverage_and_limits(claim: Dict[str, Any]) -> Tuple[bool, List[str], float, List[Dict]]:
+def scan_coverage_items(claim: NormalizedClaim, policy: CompiledPolicy) -> Tuple[float, float, List[str], List[Dict], Tuple[bool, bool, bool, bool]]:
+    """
+    Item-level pass shared by the scalar and batch paths.
+    Returns (total_claim, covered_total, flags, breakdown, (dental, in_network, has_consultation, is_alternative)).
+    """
     flags = []
-    breakdown = [] 
+    breakdown = []
+
+    total_claim = claim.total_amount
+    breakdown.append({"label": "Total Claimed Amount", "amount": total_claim, "type": "info"})
     
-    try:
-        total_claim = money(claim.get("total_amount", 0.0))
-        breakdown.append({"label": "Total Claimed Amount", "amount": total_claim, "type": "info"})
-        
-        approved_running_total = 0.0
-        
-        # --- 1. Item Level Validation ---
-        policy_exclusions = POLICY.get("exclusions", [])
-        extended_exclusions = policy_exclusions + ["Whitening", "Aesthetic", "Beautification", "Cosmetic"]
+    covered_total = 0.0
+    has_consultation = False
+    is_alternative = False
+    labels = policy.item_matcher.labels
+
+    for raw_name, name, category, amt in zip(claim.item_names, claim.item_names_lc, claim.item_categories_lc, claim.item_amounts):
+        name_labels = labels(name)
+        category_labels = labels(category)
         
-        items = claim.get("items", [])
-        if not items and total_claim > 0:
-            items = [{"name": "Medical Charges", "amount": total_claim, "category": "General"}]
+        if "alternative" in category_labels:
+            is_alternative = True
 
-        specific_limit_applied = False
-        has_consultation = False
-        is_alternative = False
+        if "exclusion" in name_labels or "exclusion" in category_labels:
+            flags.append("SERVICE_NOT_COVERED")
+            breakdown.append({"label": f"Excluded: {raw_name}", "amount": -amt, "type": "deduction"})
+        else:
+            covered_total += amt
+            if "consultation" in category_labels or "consultation" in name_labels:
+                has_consultation = True
 
-        for item in items:
-            name = (item.get("name") or "").lower()
-            category = (item.get("category") or "").lower()
-            amt = money(item.get("amount", 0.0))
-            
-            if "alternative" in category or "ayurveda" in category or "homeopathy" in category:
-                is_alternative = True
-
-            is_excluded = False
-            for ex in extended_exclusions:
-                if ex.lower() in name or ex.lower() in category:
-                    is_excluded = True
-                    break
-            
-            if is_excluded:
-                flags.append("SERVICE_NOT_COVERED")
-                breakdown.append({"label": f"Excluded: {item.get('name')}", "amount": -amt, "type": "deduction"})
-            else:
-                approved_running_total += amt
-                if "consultation" in category or "consultation" in name:
-                    has_consultation = True
+    is_dental = policy.dental_matcher.matches(claim.diagnosis_lc)
+    in_network = policy.is_network_hospital(claim.hospital_name)
+
+    return total_claim, covered_total, flags, breakdown, (is_dental, in_network, has_consultation, is_alternative)
+
+def check_coverage_and_limits(claim: NormalizedClaim, policy: CompiledPolicy = None) -> Tuple[bool, List[str], float, List[Dict]]:
+    claim = normalize_claim(claim)
+    policy = resolve_policy(policy)
+    try:
+        # --- 1. Item Level Validation ---
+        total_claim, approved_running_total, flags, breakdown, traits = scan_coverage_items(claim, policy)
+        is_dental, in_network, has_consultation, is_alternative = traits
+        specific_limit_applied = False
 
         # --- 2. Sub-limits ---
-        diagnosis = (claim.get("diagnosis") or "").lower()
-        
-        if "root canal" in diagnosis or "tooth" in diagnosis or "dental" in diagnosis:
-            dental_limit = money(POLICY["coverage_details"]["dental"]["sub_limit"])
+        if is_dental:
+            dental_limit = policy.dental_sub_limit
             specific_limit_applied = True
             if approved_running_total > dental_limit:
                 diff = approved_running_total - dental_limit
@@ -259,7 +170,7 @@ def check_coverage_and_limits(claim: Dict[str, Any]) -> Tuple[bool, List[str], f
 
         # --- 3. Global Per Claim Limit ---
         if not specific_limit_applied:
-            per_claim_limit = money(POLICY["coverage_details"]["per_claim_limit"])
+            per_claim_limit = policy.per_claim_limit
             if approved_running_total > per_claim_limit:
                 diff = approved_running_total - per_claim_limit
                 flags.append("PER_CLAIM_EXCEEDED")
@@ -267,17 +178,9 @@ def check_coverage_and_limits(claim: Dict[str, Any]) -> Tuple[bool, List[str], f
                 approved_running_total = per_claim_limit
 
         # --- 4. Network Discount ---
-        hospital = claim.get("hospital") or {}
-        in_network = False
-        if hospital.get("name"):
-            for net_hosp in POLICY.get("network_hospitals", []):
-                if net_hosp.lower() in hospital["name"].lower():
-                    in_network = True
-                    break
-        
         network_discount_applied = False
         if in_network:
-            disc_pct = money(POLICY["coverage_details"]["consultation_fees"]["network_discount"])
+            disc_pct = policy.network_discount_pct
             discount = (approved_running_total * disc_pct) / 100
             if discount > 0:
                 breakdown.append({"label": f"Network Discount ({disc_pct}%)", "amount": -discount, "type": "deduction"})
@@ -288,12 +191,20 @@ def check_coverage_and_limits(claim: Dict[str, Any]) -> Tuple[bool, List[str], f
         should_apply_copay = has_consultation and not network_discount_applied and not specific_limit_applied and not is_alternative
         
         if should_apply_copay:
-            copay_pct = money(POLICY["coverage_details"]["consultation_fees"]["copay_percentage"])
+            copay_pct = policy.copay_pct
             copay = (approved_running_total * copay_pct) / 100
             if copay > 0:
                 breakdown.append({"label": f"Co-pay ({copay_pct}%)", "amount": -copay, "type": "deduction"})
                 approved_running_total -= copay
 
+        # --- 6. Annual / Family-Floater Balance ---
+        balance, balance_flag = remaining_balance(claim, policy)
+        if approved_running_total > balance:
+            diff = approved_running_total - balance
+            flags.append(balance_flag)
+            breakdown.append({"label": BALANCE_LABELS[balance_flag], "amount": -diff, "type": "deduction"})
+            approved_running_total = balance
+
         # Final
         approved_running_total = max(0.0, approved_running_total)
         breakdown.append({"label": "Final Approved Amount", "amount": approved_running_total, "type": "final"})
@@ -304,17 +215,53 @@ def check_coverage_and_limits(claim: Dict[str, Any]) -> Tuple[bool, List[str], f
     
     return (len(flags) == 0, flags, round(approved_running_total, 2), breakdown)
 
-def fraud_checks(claim: Dict[str, Any]) -> Tuple[bool, List[str]]:
+def fraud_checks(claim: NormalizedClaim, policy: CompiledPolicy = None) -> Tuple[bool, List[str]]:
+    claim = normalize_claim(claim)
     flags = []
-    if money(claim.get("total_amount")) > 50000:
+    if claim.total_amount > 50000:
         flags.append("HIGH_VALUE_CLAIM_MANUAL_REVIEW")
-    if int(claim.get("prev_claims_same_day", 0)) > 1:
+    if claim.prev_claims_same_day > 1:
         flags.append("MULTIPLE_CLAIMS_SAME_DAY")
+    if policy is not None:
+        for window, limit in policy.velocity_limits.items():
+            if claim.velocity.get(window, 0) >= limit:
+                flags.append(f"HIGH_CLAIM_VELOCITY_{window.upper()}")
     return (len(flags) == 0, flags)
 
-def compute_granular_confidence(claim: Dict[str, Any], rule_flags: List[str]) -> Tuple[float, Dict]:
+# --- RULE GRAPH ---
+
+def _eligibility_rule(claim: NormalizedClaim, policy: CompiledPolicy):
+    ok, flags, notes = check_eligibility(claim, policy)
+    return ok, flags, {"notes": notes}
+
+def _documents_rule(claim: NormalizedClaim, policy: CompiledPolicy):
+    ok, flags = check_documents(claim, policy)
+    return ok, flags, {}
+
+def _fraud_rule(claim: NormalizedClaim, policy: CompiledPolicy):
+    ok, flags = fraud_checks(claim, policy)
+    return ok, flags, {}
+
+def _coverage_rule(claim: NormalizedClaim, policy: CompiledPolicy):
+    ok, flags, approved_amount, breakdown = check_coverage_and_limits(claim, policy)
+    return ok, flags, {"approved_amount": approved_amount, "breakdown": breakdown}
+
+# Order of precedence: an earlier terminal rule that fires decides the claim
+ADJUDICATION_RULES = [
+    Rule("eligibility", _eligibility_rule, terminal_decision="REJECTED"),
+    Rule("documents", _documents_rule, depends_on=("eligibility",), terminal_decision="REJECTED"),
+    Rule("fraud", _fraud_rule, depends_on=("documents",), terminal_decision="MANUAL_REVIEW"),
+    Rule("coverage", _coverage_rule, depends_on=("fraud",)),
+]
+RULE_ENGINE = RuleEngine(ADJUDICATION_RULES)
+
+def collect_reasons(outcomes: Dict[str, Tuple]) -> List[str]:
+    return list(set(flag for outcome in outcomes.values() for flag in outcome[1]))
+
+def compute_granular_confidence(claim: NormalizedClaim, rule_flags: List[str]) -> Tuple[float, Dict]:
+    claim = normalize_claim(claim)
     breakdown = {
-        "extraction_conf": float(claim.get("_extraction_conf", 0.85)),
+        "extraction_conf": claim.extraction_conf,
         "doc_conf": 1.0,
         "policy_conf": 1.0
     }
@@ -324,32 +271,34 @@ def compute_granular_confidence(claim: Dict[str, Any], rule_flags: List[str]) ->
     score = (breakdown["extraction_conf"] * 0.4) + (breakdown["policy_conf"] * 0.6)
     return round(min(1.0, score), 2), breakdown
 
-def adjudicate_claim(claim: Dict[str, Any]) -> Dict[str, Any]:
+def adjudicate_claim(claim: Union[Dict[str, Any], ClaimModel], policy: CompiledPolicy = None,
+                     short_circuit: Optional[bool] = None) -> Dict[str, Any]:
     start_time = time.perf_counter()
-    safe_log = redact_phi(claim)
-    logger.info(f"Adjudicating claim: Amount={safe_log.get('total_amount')}")
+    try:
+        claim = normalize_claim(claim)
+    except Exception as e:
+        logger.error(f"Claim normalization failed: {e}")
+        raise ServiceError("Malformed claim payload")
+    policy = resolve_policy(policy if policy is not None else claim.policy_id)
+    logger.info("Adjudicating claim: Amount=%s", claim.total_amount)
 
     result = {"decision": None, "approved_amount": 0.0, "reasons": [], "confidence": 0.0}
     
     try:
-        elig_ok, elig_flags, elig_notes = check_eligibility(claim)
-        doc_ok, doc_flags = check_documents(claim)
-        fraud_ok, fraud_flags = fraud_checks(claim)
-        cov_ok, cov_flags, approved_amount, breakdown = check_coverage_and_limits(claim)
+        if short_circuit is None:
+            short_circuit = ADJUDICATION_CONFIG["short_circuit"]
+        outcomes, trace, terminal = RULE_ENGINE.run(claim, policy, short_circuit=short_circuit)
+        coverage = outcomes["coverage"][2] if "coverage" in outcomes else {"approved_amount": 0.0, "breakdown": []}
+        approved_amount = coverage["approved_amount"]
+        breakdown = coverage["breakdown"]
         
-        reasons = list(set(elig_flags + doc_flags + cov_flags + fraud_flags))
-        result["notes"] = elig_notes
+        reasons = collect_reasons(outcomes)
+        result["notes"] = outcomes["eligibility"][2]["notes"]
         
-        total_claimed = money(claim.get("total_amount"))
+        total_claimed = claim.total_amount
         
-        if not elig_ok:
-            result["decision"] = "REJECTED"
-            approved_amount = 0.0
-        elif not doc_ok:
-            result["decision"] = "REJECTED"
-            approved_amount = 0.0
-        elif not fraud_ok:
-            result["decision"] = "MANUAL_REVIEW"
+        if terminal:
+            result["decision"] = terminal[1]
             approved_amount = 0.0
         elif "PER_CLAIM_EXCEEDED" in reasons:
             result["decision"] = "REJECTED"
@@ -384,6 +333,9 @@ def adjudicate_claim(claim: Dict[str, Any]) -> Dict[str, Any]:
             "confidence_breakdown": conf_breakdown,
             "reasons": reasons,
             "breakdown": breakdown,
+            "policy_id": policy.policy_id,
+            "policy_version": policy.version,
+            "trace": trace,
             "processing_time_ms": round((time.perf_counter() - start_time) * 1000, 2)
         })
         
@@ -0,0 +1,415 @@
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import chain, repeat
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+from ..utils.date_parsing import parse_date
+from ..utils.logging_utils import setup_logging
+from ..utils.exception_handlers import ServiceError
+from ..models.normalized_claim import money, normalize_claim
+from .policy_engine import CompiledPolicy
+from .adjudicator import BALANCE_LABELS, resolve_policy, validate_doctor_reg
+
+logger = setup_logging()
+
+# Decision codes used inside the columnar pass
+APPROVED, PARTIAL, REJECTED, MANUAL_REVIEW = 0, 1, 2, 3
+DECISION_LABELS = ("APPROVED", "PARTIAL", "REJECTED", "MANUAL_REVIEW")
+DECISION_ARRAY = np.array(DECISION_LABELS, dtype=object)
+
+# check_documents returns list(set(flags)); a claim with both flags gets them in this order
+BOTH_DOCUMENT_FLAGS = list(set(["MISSING_DOCUMENTS", "DOCTOR_REG_INVALID"]))
+
+SIMPLE_DEDUCTION_MARKERS = ("Co-pay", "Discount")
+
+# Dates are compared as integer microseconds since the epoch (parse_date always returns UTC)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+DAY_US = 86_400_000_000
+NO_DATE = np.iinfo(np.int64).min
+# Join date assumed by check_eligibility when the claim has none
+DEFAULT_JOIN_US = (datetime(2024, 1, 1, tzinfo=timezone.utc) - EPOCH) // MICROSECOND
+
+HIGH_VALUE_THRESHOLD = 50000
+
+
+def _column(rows: List[Dict[str, Any]], key: str, default: Any = None) -> List[Any]:
+    """One field of every claim (dict.get at C speed)."""
+    return list(map(dict.get, rows, repeat(key), repeat(default)))
+
+
+def _encode(values: List[Any]) -> Tuple[List[Any], np.ndarray]:
+    """Dictionary-encodes a column: (distinct values in first-seen order, code of each value)."""
+    index = {value: code for code, value in enumerate(dict.fromkeys(values))}
+    return list(index), np.fromiter(map(index.__getitem__, values), dtype=np.intp, count=len(values))
+
+
+def _lookup(values: List[Any], predicate) -> np.ndarray:
+    """Evaluates `predicate` once per distinct value; index the result with the value codes."""
+    return np.fromiter((predicate(value) for value in values), dtype=bool, count=len(values))
+
+
+def _lower(value: Any) -> str:
+    return str(value).lower() if value else ""
+
+
+def _money_column(values: List[Any], optional: bool = False) -> np.ndarray:
+    """
+    `money` over a column (`_optional_money` with optional=True: None stays NaN).
+    Converts in one NumPy call and keeps values that are already whole paise; only the rest go
+    through Python's correctly rounded round(), since np.round can differ from it.
+    """
+    try:
+        column = np.array(values, dtype=float)
+        if column.shape != (len(values),):
+            raise ValueError("nested values")
+    except (TypeError, ValueError):
+        return np.array([np.nan if optional and v is None else money(v) for v in values], dtype=float)
+    redo = ~(np.round(column, 2) == column)
+    if optional:
+        # NaN already means unknown (None) or money(nan)
+        redo &= ~np.isnan(column)
+    for j in np.flatnonzero(redo).tolist():
+        column[j] = money(values[j])
+    return column
+
+
+def _count_column(values: List[Any]) -> np.ndarray:
+    """int(value or 0) over a column, converted in one NumPy call when every value is numeric."""
+    try:
+        column = np.array(values, dtype=float)
+        if column.shape != (len(values),) or np.isinf(column).any():
+            raise ValueError("not plain counts")
+    except (TypeError, ValueError):
+        return np.array([int(v or 0) for v in values], dtype=np.int64)
+    # None converts to NaN; int() truncates like astype
+    return np.nan_to_num(column).astype(np.int64)
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """
+    Python's round(x, 2) over an array. np.round scales by 100 and rounds, which can land on the
+    other side of a half-paisa than the correctly rounded round(); values that close to a half
+    (and NaN/inf) go through round() instead.
+    """
+    scaled = values * 100
+    result = np.round(values, 2)
+    near_half = ~(np.abs(scaled - np.floor(scaled) - 0.5) > 1e-7 + 1e-12 * np.abs(scaled))
+    rows = np.flatnonzero(near_half)
+    result[rows] = [round(x, 2) for x in values[rows].tolist()]
+    return result
+
+
+def _date_column(values: List[Any]) -> np.ndarray:
+    """parse_date over a column as microseconds since the epoch (NO_DATE when missing), parsed once per distinct value."""
+    distinct, codes = _encode(values)
+    parsed = [parse_date(value) for value in distinct]
+    lookup = np.array([NO_DATE if d is None else (d - EPOCH) // MICROSECOND for d in parsed], dtype=np.int64)
+    return lookup[codes]
+
+
+class ClaimColumns:
+    """
+    Columnar counterpart of NormalizedClaim for a whole batch, read straight from the raw dicts.
+    Strings (diagnoses, hospitals, item names and categories, document types, registrations) are
+    dictionary-encoded, so each distinct value is matched once and predicates become array lookups.
+    Line items and documents are flattened into tables keyed by claim row.
+    """
+
+    def __init__(self, claims: List[Dict[str, Any]], velocity_windows: List[str]):
+        claims = [c if type(c) is dict else normalize_claim(c).raw for c in claims]
+        n = self.n = len(claims)
+        rows = np.arange(n)
+
+        self.total = _money_column(_column(claims, "total_amount"))
+        self.extraction_conf = list(map(float, _column(claims, "_extraction_conf", 0.85)))
+        self.extraction_conf_arr = np.array(self.extraction_conf, dtype=float)
+        self.prev_same_day = _count_column(_column(claims, "prev_claims_same_day", 0))
+        velocity = [v or {} for v in _column(claims, "velocity")]
+        self.velocity = [_count_column(_column(velocity, window, 0)) for window in velocity_windows]
+        self.annual_used = _money_column(_column(claims, "annual_used"), optional=True)
+        self.family_used = _money_column(_column(claims, "family_used"), optional=True)
+
+        self.treatment_us = _date_column(_column(claims, "treatment_date"))
+        members = _column(claims, "member")
+        self.join_us = _date_column([m.get("join_date") if m else None for m in members])
+
+        diagnoses = _column(claims, "diagnosis")
+        self.diagnosis_present = np.fromiter(map(bool, diagnoses), dtype=bool, count=n)
+        distinct, self.diagnosis_codes = _encode(diagnoses)
+        self.diagnoses = [_lower(d) for d in distinct]
+        hospitals = _column(claims, "hospital")
+        self.hospitals, self.hospital_codes = _encode([h.get("name") if h else None for h in hospitals])
+
+        # Documents: one row per document
+        docs = [d or () for d in _column(claims, "documents")]
+        doc_counts = np.fromiter(map(len, docs), dtype=np.intp, count=n)
+        self.has_documents = doc_counts > 0
+        flat_docs = list(chain.from_iterable(docs))
+        self.doc_rows = np.repeat(rows, doc_counts)
+        distinct, self.doc_type_codes = _encode(_column(flat_docs, "type"))
+        self.doc_types = [_lower(t) for t in distinct]
+        registrations = _column(claims, "doctor_reg")
+        for i in np.flatnonzero(self.has_documents).tolist():
+            if not registrations[i]:
+                registrations[i] = next((d.get("doctor_reg") for d in docs[i] if d.get("doctor_reg")), None)
+        self.registrations, self.registration_codes = _encode([r or None for r in registrations])
+
+        # Line items: one row per item; claims without items but with an amount get one generic line
+        items = _column(claims, "items")
+        self.has_items = np.fromiter(map(bool, items), dtype=bool, count=n)
+        totals = self.total.tolist()
+        items = [i or ([{"name": "Medical Charges", "amount": t, "category": "General"}] if t > 0 else ())
+                 for i, t in zip(items, totals)]
+        item_counts = np.fromiter(map(len, items), dtype=np.intp, count=n)
+        self.item_start = [0] + np.cumsum(item_counts).tolist()
+        self.item_rows = np.repeat(rows, item_counts)
+        flat_items = list(chain.from_iterable(items))
+        self.raw_item_names = _column(flat_items, "name")
+        self.item_names, self.name_codes = _encode(self.raw_item_names)
+        distinct, self.category_codes = _encode(_column(flat_items, "category"))
+        self.item_categories = [_lower(c) for c in distinct]
+        self.amounts_arr = _money_column(_column(flat_items, "amount", 0.0))
+        self.amounts = self.amounts_arr.tolist()
+
+    def per_claim_any(self, rows: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """True for claims with at least one row (item or document) where `mask` holds."""
+        return np.bincount(rows[mask], minlength=self.n) > 0
+
+
+def adjudicate_claims_batch(claims: List[Dict[str, Any]], policy: CompiledPolicy = None,
+                            short_circuit: bool = True) -> List[Dict[str, Any]]:
+    """
+    Columnar equivalent of `adjudicate_claim` for bulk feeds and re-runs.
+    Claims are read once into ClaimColumns; eligibility, documents, fraud, item exclusions, limits,
+    co-pay, network discount, decisions and confidence are then array operations over the batch.
+    Results match the scalar path field for field, except that the per-rule `trace` is omitted
+    and `processing_time_ms` is the amortized cost.
+    All claims are evaluated against one policy (the default policy when none is given).
+    On the parity corpus it runs about 6-9x faster than a loop over adjudicate_claim on one core
+    (backend/tests/bench_batch_adjudicator.py); building the results still costs Python per claim.
+    Short-circuits by default: callers only need decision, amount and reasons, so claims fixed by a
+    terminal rule skip coverage and carry an empty breakdown (pass short_circuit=False for the full one).
+    """
+    start_time = time.perf_counter()
+    policy = resolve_policy(policy)
+    n = len(claims)
+    if n == 0:
+        return []
+    logger.info(f"Batch adjudicating {n} claims with policy {policy.policy_id}@{policy.version}")
+
+    windows = list(policy.velocity_limits)
+    try:
+        cols = ClaimColumns(claims, windows)
+    except Exception as e:
+        logger.error(f"Batch adjudication failed reading the claims: {e}")
+        raise ServiceError("Adjudication logic failed: malformed claim in batch")
+    item_labels = policy.item_matcher.labels
+    has_treatment = cols.treatment_us != NO_DATE
+
+    # --- 1. Eligibility ---
+    effective_from = policy.effective_from
+    inactive = np.zeros(n, dtype=bool)
+    if effective_from is not None:
+        inactive = has_treatment & (cols.treatment_us < (effective_from - EPOCH) // MICROSECOND)
+    join_us = np.where(cols.join_us != NO_DATE, cols.join_us, DEFAULT_JOIN_US)
+    diagnosis_hits = [policy.waiting_matcher.labels(d) for d in cols.diagnoses]
+    waiting = np.zeros(n, dtype=bool)
+    # Index into waiting_periods of the last period not yet served (its date goes into the notes)
+    waiting_last = np.full(n, -1)
+    waiting_days = list(policy.waiting_periods.items())
+    for k, (condition, days) in enumerate(waiting_days):
+        hit = np.fromiter((condition in hits for hits in diagnosis_hits), dtype=bool, count=len(diagnosis_hits))
+        waits = hit[cols.diagnosis_codes] & has_treatment & (cols.treatment_us < join_us + days * DAY_US)
+        waiting |= waits
+        waiting_last[waits] = k
+    eligibility_fired = inactive | waiting
+
+    # --- 2. Documents ---
+    pharmacy = _lookup(cols.item_categories, lambda c: "pharmacy" in item_labels(c))
+    has_medicines = cols.has_items & cols.per_claim_any(cols.item_rows, pharmacy[cols.category_codes])
+    prescription = _lookup(cols.doc_types, lambda t: "prescription" in t)
+    has_prescription = cols.per_claim_any(cols.doc_rows, prescription[cols.doc_type_codes])
+    missing_documents = (~cols.has_documents & ~cols.has_items) | (has_medicines & ~has_prescription & ~cols.diagnosis_present)
+    valid_registration = _lookup(cols.registrations, lambda r: r is None or validate_doctor_reg(r))
+    registration_invalid = ~valid_registration[cols.registration_codes]
+    documents_fired = missing_documents | registration_invalid
+
+    # --- 3. Fraud ---
+    high_value = cols.total > HIGH_VALUE_THRESHOLD
+    same_day = cols.prev_same_day > 1
+    velocity_hits = [counts >= policy.velocity_limits[window] for window, counts in zip(windows, cols.velocity)]
+    fraud_fired = high_value | same_day
+    for hits in velocity_hits:
+        fraud_fired = fraud_fired | hits
+
+    # --- 4. Terminal rules (earlier rules take precedence) ---
+    terminal_code = np.select([eligibility_fired, documents_fired, fraud_fired], [REJECTED, REJECTED, MANUAL_REVIEW],
+                              default=-1)
+    if short_circuit:
+        # Rules after the first terminal hit are not evaluated
+        documents_ran = ~eligibility_fired
+        fraud_ran = documents_ran & ~documents_fired
+        coverage_ran = terminal_code < 0
+    else:
+        documents_ran = fraud_ran = coverage_ran = np.ones(n, dtype=bool)
+
+    # --- 5. Item scan ---
+    name_labels = [item_labels(_lower(name)) for name in cols.item_names]
+    name_excluded = np.fromiter(("exclusion" in l for l in name_labels), dtype=bool, count=len(name_labels))
+    category_labels = [item_labels(c) for c in cols.item_categories]
+    category_excluded = np.fromiter(("exclusion" in l for l in category_labels), dtype=bool, count=len(category_labels))
+    excluded = name_excluded[cols.name_codes] | category_excluded[cols.category_codes]
+    alternative = np.fromiter(("alternative" in l for l in category_labels), dtype=bool, count=len(category_labels))
+    name_consultation = np.fromiter(("consultation" in l for l in name_labels), dtype=bool, count=len(name_labels))
+    category_consultation = np.fromiter(("consultation" in l for l in category_labels), dtype=bool, count=len(category_labels))
+    consultation = ~excluded & (name_consultation[cols.name_codes] | category_consultation[cols.category_codes])
+    # An excluded item's "Excluded: <name>" line only counts as a simple deduction if its label has a marker
+    simple_name = _lookup(cols.item_names, lambda name: any(m in f"Excluded: {name}" for m in SIMPLE_DEDUCTION_MARKERS))
+
+    # bincount adds each claim's items in order, starting from 0.0, exactly like the scalar loop
+    covered = np.bincount(cols.item_rows, weights=np.where(excluded, 0.0, cols.amounts_arr), minlength=n)
+    not_covered = cols.per_claim_any(cols.item_rows, excluded)
+    simple_excl = ~cols.per_claim_any(cols.item_rows, excluded & ~simple_name[cols.name_codes])
+    is_alternative = cols.per_claim_any(cols.item_rows, alternative[cols.category_codes])
+    has_consultation = cols.per_claim_any(cols.item_rows, consultation)
+    is_dental = _lookup(cols.diagnoses, policy.dental_matcher.matches)[cols.diagnosis_codes]
+    in_network = _lookup(cols.hospitals, policy.is_network_hospital)[cols.hospital_codes]
+
+    # --- 6. Sub-limit and per-claim cap ---
+    approved = covered
+    sub_exceeded = is_dental & (approved > policy.dental_sub_limit)
+    sub_diff = approved - policy.dental_sub_limit
+    approved = np.where(sub_exceeded, policy.dental_sub_limit, approved)
+
+    per_claim_exceeded = ~is_dental & (approved > policy.per_claim_limit)
+    per_claim_diff = approved - policy.per_claim_limit
+    approved = np.where(per_claim_exceeded, policy.per_claim_limit, approved)
+
+    # --- 7. Network discount ---
+    discount = (approved * policy.network_discount_pct) / 100
+    discount_applied = in_network & (discount > 0)
+    approved = np.where(discount_applied, approved - discount, approved)
+
+    # --- 8. Co-pay ---
+    copay_eligible = has_consultation & ~discount_applied & ~is_dental & ~is_alternative
+    copay = (approved * policy.copay_pct) / 100
+    copay_applied = copay_eligible & (copay > 0)
+    approved = np.where(copay_applied, approved - copay, approved)
+
+    # --- 9. Annual / family-floater balance (see remaining_balance) ---
+    balance = np.full(n, np.inf)
+    balance_flag = np.full(n, -1)
+    balance_flags = list(BALANCE_LABELS)
+    for k, (limit, used) in enumerate(((policy.annual_limit, cols.annual_used),
+                                       (policy.family_floater_limit, cols.family_used))):
+        if limit <= 0:
+            continue
+        known = ~np.isnan(used)
+        tighter = known & (np.maximum(0.0, limit - np.where(known, used, 0.0)) < balance)
+        balance = np.where(tighter, np.maximum(0.0, _round2(limit - np.where(known, used, 0.0))), balance)
+        balance_flag = np.where(tighter, k, balance_flag)
+    balance_exceeded = approved > balance
+    balance_diff = approved - balance
+    approved = np.where(balance_exceeded, balance, approved)
+
+    approved = np.maximum(approved, 0.0)
+    rounded = np.where(coverage_ran, _round2(approved), 0.0)
+
+    # --- 10. Decisions and confidence ---
+    simple_deductions = simple_excl & ~sub_exceeded & ~per_claim_exceeded & ~balance_exceeded
+    decision = np.select(
+        [
+            terminal_code >= 0, per_claim_exceeded,
+            not_covered & (rounded == 0), rounded == cols.total,
+            (rounded > 0) & simple_deductions, rounded > 0,
+        ],
+        [terminal_code, REJECTED, REJECTED, APPROVED, APPROVED, PARTIAL],
+        default=REJECTED,
+    )
+    zeroed = (decision == REJECTED) | (decision == MANUAL_REVIEW)
+    policy_conf = np.where(missing_documents & documents_ran, 0.0, 1.0)
+    confidence = _round2(np.minimum(1.0, cols.extraction_conf_arr * 0.4 + policy_conf * 0.6))
+
+    # --- 11. Reasons and notes, appended rule by rule so each claim's flags keep the rule order ---
+    flags: List[List[str]] = [[] for _ in range(n)]
+    notes: List[Dict[str, str]] = [{} for _ in range(n)]
+
+    def add_flag(mask: np.ndarray, flag: str) -> None:
+        for i in np.flatnonzero(mask).tolist():
+            flags[i].append(flag)
+
+    add_flag(inactive, "POLICY_INACTIVE")
+    if effective_from is not None:
+        for i in np.flatnonzero(inactive).tolist():
+            notes[i]["policy_active_from"] = effective_from.strftime("%Y-%m-%d")
+    add_flag(waiting, "WAITING_PERIOD")
+    waiting_rows = np.flatnonzero(waiting)
+    waiting_until = join_us[waiting_rows] + np.array([days for _, days in waiting_days])[waiting_last[waiting_rows]] * DAY_US
+    until_labels = {us: (EPOCH + timedelta(microseconds=us)).strftime("%Y-%m-%d") for us in set(waiting_until.tolist())}
+    for i, us in zip(waiting_rows.tolist(), waiting_until.tolist()):
+        notes[i]["waiting_period_until"] = until_labels[us]
+    add_flag(documents_ran & missing_documents & ~registration_invalid, "MISSING_DOCUMENTS")
+    add_flag(documents_ran & registration_invalid & ~missing_documents, "DOCTOR_REG_INVALID")
+    for i in np.flatnonzero(documents_ran & missing_documents & registration_invalid).tolist():
+        flags[i].extend(BOTH_DOCUMENT_FLAGS)
+    add_flag(fraud_ran & high_value, "HIGH_VALUE_CLAIM_MANUAL_REVIEW")
+    add_flag(fraud_ran & same_day, "MULTIPLE_CLAIMS_SAME_DAY")
+    for window, hits in zip(windows, velocity_hits):
+        add_flag(fraud_ran & hits, f"HIGH_CLAIM_VELOCITY_{window.upper()}")
+    add_flag(coverage_ran & not_covered, "SERVICE_NOT_COVERED")
+    add_flag(coverage_ran & sub_exceeded, "SUB_LIMIT_EXCEEDED")
+    add_flag(coverage_ran & per_claim_exceeded, "PER_CLAIM_EXCEEDED")
+    for k, flag in enumerate(balance_flags):
+        add_flag(coverage_ran & balance_exceeded & (balance_flag == k), flag)
+    # collect_reasons de-duplicates through a set; built the same way, the order matches too
+    reasons = [list(set(f)) if len(f) > 1 else f for f in flags]
+
+    # --- 12. Coverage breakdowns, one line type at a time ---
+    breakdowns: List[List[Dict[str, Any]]] = [[] for _ in range(n)]
+
+    def add_lines(mask: np.ndarray, amounts: np.ndarray, label, kind: str = "deduction") -> None:
+        rows = np.flatnonzero(mask)
+        labels = label if isinstance(label, list) else repeat(label)
+        for i, amount, text in zip(rows.tolist(), amounts[rows].tolist(), labels):
+            breakdowns[i].append({"label": text, "amount": amount, "type": kind})
+
+    add_lines(coverage_ran, cols.total, "Total Claimed Amount", "info")
+    excluded_lines = np.flatnonzero(excluded & coverage_ran[cols.item_rows])
+    for j, i, amount in zip(excluded_lines.tolist(), cols.item_rows[excluded_lines].tolist(),
+                            (-cols.amounts_arr[excluded_lines]).tolist()):
+        breakdowns[i].append({"label": f"Excluded: {cols.raw_item_names[j]}", "amount": amount, "type": "deduction"})
+    add_lines(coverage_ran & sub_exceeded, -sub_diff, "Dental Sub-limit Exceeded")
+    add_lines(coverage_ran & per_claim_exceeded, -per_claim_diff, "Per-Claim Limit Exceeded")
+    add_lines(coverage_ran & discount_applied, -discount, f"Network Discount ({policy.network_discount_pct}%)")
+    add_lines(coverage_ran & copay_applied, -copay, f"Co-pay ({policy.copay_pct}%)")
+    balance_rows = coverage_ran & balance_exceeded
+    add_lines(balance_rows, -balance_diff,
+              [BALANCE_LABELS[balance_flags[k]] for k in balance_flag[balance_rows].tolist()])
+    add_lines(coverage_ran, np.where(zeroed, 0.0, approved), "Final Approved Amount", "final")
+
+    # --- 13. Results ---
+    elapsed_ms = round((time.perf_counter() - start_time) * 1000 / n, 2)
+    policy_id, policy_version = policy.policy_id, policy.version
+    results = [
+        {
+            "decision": label,
+            "approved_amount": amount,
+            "reasons": claim_reasons,
+            "confidence": conf,
+            "notes": claim_notes,
+            "confidence_breakdown": {"extraction_conf": ext_conf, "doc_conf": 1.0, "policy_conf": pol_conf},
+            "breakdown": breakdown,
+            "policy_id": policy_id,
+            "policy_version": policy_version,
+            "processing_time_ms": elapsed_ms,
+        }
+        for label, amount, claim_reasons, conf, claim_notes, ext_conf, pol_conf, breakdown in zip(
+            DECISION_ARRAY[decision].tolist(), np.where(zeroed, 0.0, rounded).tolist(), reasons,
+            confidence.tolist(), notes, cols.extraction_conf, policy_conf.tolist(), breakdowns,
+        )
+    ]
+
+    logger.info(f"Batch adjudication complete: {n} claims in {round((time.perf_counter() - start_time) * 1000, 2)} ms")
+    return results
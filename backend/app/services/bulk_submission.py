@@ -0,0 +1,238 @@
+import asyncio
+import json
+import mimetypes
+import posixpath
+import tarfile
+import zipfile
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from ..core.config import BULK_CLAIM_CONCURRENCY, BULK_MANIFEST_MAX_BYTES, BULK_MAX_CLAIMS
+from ..core.database import SessionLocal
+from ..utils.exception_handlers import ServiceError
+from ..utils.logging_utils import setup_logging
+from ..utils.metrics import UPLOADS_IN_FLIGHT, track_stage
+from .claim_pipeline import process_claim
+from .ingestion import ByteBudget, IngestedFile, close_all, ingest_stream
+from .policy_registry import check_policy_id
+
+logger = setup_logging()
+
+MANIFEST_NAMES = ("manifest.json", "manifest.jsonl")
+
+# Claims from every bulk request share this budget, so concurrent batches cannot multiply the LLM load
+_BULK_SLOTS = asyncio.Semaphore(BULK_CLAIM_CONCURRENCY)
+
+
+def _bad_request(message: str) -> ServiceError:
+    return ServiceError(message, code="INVALID_BULK_SUBMISSION")
+
+
+class BulkClaim:
+    """One claim of a bulk submission: the caller's reference, form overrides and its documents."""
+    __slots__ = ("ref", "member_id", "policy_id", "family_id", "documents")
+
+    def __init__(self, ref: str, member_id: Optional[str], policy_id: Optional[str], family_id: Optional[str],
+                 documents: List[IngestedFile]):
+        self.ref = ref
+        self.member_id = member_id
+        self.policy_id = policy_id
+        self.family_id = family_id
+        self.documents = documents
+
+
+# --- MANIFEST ---
+
+def parse_manifest(text: str) -> List[Dict[str, Any]]:
+    """
+    A JSON list of claim entries, an object with a "claims" list, or JSONL (one entry per line).
+    Each entry: {"ref", "files": [...], optional "member_id", "policy_id", "family_id"}.
+    """
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        try:
+            parsed = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except ValueError as e:
+            raise _bad_request(f"Manifest is not valid JSON: {e}")
+    if isinstance(parsed, dict):
+        entries = parsed["claims"] if "claims" in parsed else [parsed]
+    else:
+        entries = parsed
+
+    if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+        raise _bad_request("Manifest must be a list of claim objects")
+    for index, entry in enumerate(entries):
+        files = entry.get("files")
+        if not isinstance(files, list) or not files or not all(isinstance(f, str) for f in files):
+            raise _bad_request(f"Manifest entry {index} needs a non-empty 'files' list")
+        entry.setdefault("ref", str(index))
+    return entries
+
+
+def _group_by_folder(names: List[str]) -> List[Dict[str, Any]]:
+    """Without a manifest, every top-level folder is one claim and every loose file a claim of its own."""
+    groups: Dict[str, List[str]] = {}
+    for name in names:
+        parts = name.split("/", 1)
+        groups.setdefault(parts[0] if len(parts) > 1 else name, []).append(name)
+    return [{"ref": ref, "files": files} for ref, files in groups.items()]
+
+
+def build_claims(entries: List[Dict[str, Any]], documents: Dict[str, IngestedFile], member_id: Optional[str],
+                 policy_id: Optional[str], family_id: Optional[str]) -> List[BulkClaim]:
+    """Resolves manifest entries against the ingested documents; form values fill unset identifiers."""
+    if not entries:
+        raise _bad_request("Bulk submission contains no claims")
+    if len(entries) > BULK_MAX_CLAIMS:
+        raise _bad_request(f"Bulk submission has {len(entries)} claims; the limit is {BULK_MAX_CLAIMS}")
+
+    claims = []
+    claimed = set()
+    for entry in entries:
+        missing = [name for name in entry["files"] if name not in documents]
+        if missing:
+            raise _bad_request(f"Claim '{entry['ref']}' references missing files: {missing}")
+        shared = claimed.intersection(entry["files"])
+        if shared:
+            raise _bad_request(f"Files {sorted(shared)} are referenced by more than one claim")
+        claimed.update(entry["files"])
+        claims.append(BulkClaim(
+            str(entry["ref"]),
+            entry.get("member_id") or member_id,
+            entry.get("policy_id") or policy_id,
+            entry.get("family_id") or family_id,
+            [documents[name] for name in entry["files"]],
+        ))
+    return claims
+
+
+# --- ARCHIVES ---
+
+def _member_name(name: str) -> Optional[str]:
+    """Normalized member path, or None for directories, hidden files and paths escaping the archive."""
+    name = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    base = posixpath.basename(name)
+    if not base or base.startswith(".") or name.startswith("..") or name.startswith("__MACOSX"):
+        return None
+    return name
+
+
+def unpack_archive(source: BinaryIO, budget: ByteBudget) -> Dict[str, Any]:
+    """
+    Streams every document of a zip or tar archive through ingestion (hashing, caps, spooling).
+    Returns {"manifest": text or None, "documents": {path: IngestedFile}}. Blocking; run in a thread.
+    """
+    documents: Dict[str, IngestedFile] = {}
+    manifest = None
+
+    def add(name: str, stream: BinaryIO) -> None:
+        nonlocal manifest
+        if name in MANIFEST_NAMES:
+            # Bounded read: the manifest is held in memory, unlike the spooled documents
+            data = stream.read(BULK_MANIFEST_MAX_BYTES + 1)
+            if len(data) > BULK_MANIFEST_MAX_BYTES:
+                raise ServiceError(f"Manifest exceeds the {BULK_MANIFEST_MAX_BYTES} byte limit",
+                                   code="PAYLOAD_TOO_LARGE", status_code=413)
+            budget.consume(len(data))
+            manifest = data.decode("utf-8")
+            return
+        documents[name] = ingest_stream(stream, name, mimetypes.guess_type(name)[0], budget)
+
+    try:
+        if zipfile.is_zipfile(source):
+            source.seek(0)
+            with zipfile.ZipFile(source) as archive:
+                for info in archive.infolist():
+                    name = None if info.is_dir() else _member_name(info.filename)
+                    if name:
+                        with archive.open(info) as stream:
+                            add(name, stream)
+        else:
+            source.seek(0)
+            try:
+                archive = tarfile.open(fileobj=source, mode="r:*")
+            except tarfile.TarError:
+                raise _bad_request("Archive must be a zip or tar file")
+            with archive:
+                for info in archive:
+                    name = _member_name(info.name) if info.isfile() else None
+                    if name:
+                        with archive.extractfile(info) as stream:
+                            add(name, stream)
+    except (zipfile.BadZipFile, tarfile.TarError, UnicodeDecodeError) as e:
+        close_all(list(documents.values()))
+        raise _bad_request(f"Could not read archive: {e}")
+    except BaseException:
+        close_all(list(documents.values()))
+        raise
+    return {"manifest": manifest, "documents": documents}
+
+
+def claims_from_documents(manifest: Optional[str], documents: Dict[str, IngestedFile], member_id: Optional[str],
+                          policy_id: Optional[str], family_id: Optional[str]) -> List[BulkClaim]:
+    """Claims from a manifest, or grouped by folder without one. Releases documents no claim uses."""
+    try:
+        entries = parse_manifest(manifest) if manifest is not None else _group_by_folder(sorted(documents))
+        claims = build_claims(entries, documents, member_id, policy_id, family_id)
+        # Refuse the whole batch (404) before any claim is extracted
+        for claim_policy_id in {claim.policy_id for claim in claims}:
+            check_policy_id(claim_policy_id)
+    except BaseException:
+        close_all(list(documents.values()))
+        raise
+    used = {id(d) for claim in claims for d in claim.documents}
+    close_all([d for d in documents.values() if id(d) not in used])
+    return claims
+
+
+# --- PROCESSING ---
+
+async def _run_claim(index: int, claim: BulkClaim) -> Dict[str, Any]:
+    line: Dict[str, Any] = {"ref": claim.ref, "index": index}
+    async with _BULK_SLOTS:
+        # Own session per claim: claims of one batch run concurrently
+        db = SessionLocal()
+        try:
+            with UPLOADS_IN_FLIGHT.track_in_progress(), track_stage("total"):
+                result = await process_claim(claim.documents, claim.member_id, claim.policy_id, claim.family_id, db)
+            line.update(status="ok", claim_id=result["claim_id"], files_processed=result["files_processed"],
+                        decision=result["decision"])
+        except HTTPException as he:
+            line.update(status="error", status_code=he.status_code, detail=he.detail)
+        except ServiceError as se:
+            line.update(status="error", status_code=se.status_code, detail=se.message, code=se.code)
+        except Exception as e:
+            logger.exception(f"Bulk claim '{claim.ref}' failed")
+            line.update(status="error", status_code=500, detail=str(e))
+        finally:
+            db.close()
+            close_all(claim.documents)
+    return line
+
+
+async def stream_bulk_results(claims: List[BulkClaim]) -> AsyncIterator[str]:
+    """
+    Runs the claims with bounded parallelism and yields one NDJSON line per claim in completion
+    order, then a summary line. Stopping early (client disconnect) cancels the remaining claims.
+    """
+    logger.info(f"Bulk submission: {len(claims)} claims, concurrency {BULK_CLAIM_CONCURRENCY}")
+    tasks = [asyncio.create_task(_run_claim(i, claim)) for i, claim in enumerate(claims)]
+    counts = {"ok": 0, "error": 0}
+    try:
+        for finished in asyncio.as_completed(tasks):
+            line = await finished
+            counts[line["status"]] += 1
+            yield json.dumps(jsonable_encoder(line)) + "\n"
+        yield json.dumps({"status": "complete", "claims": len(claims),
+                          "succeeded": counts["ok"], "failed": counts["error"]}) + "\n"
+    finally:
+        pending = [t for t in tasks if not t.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for claim in claims:
+            close_all(claim.documents)
+        logger.info(f"Bulk submission finished: {counts}")
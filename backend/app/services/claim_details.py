@@ -0,0 +1,83 @@
+import json
+from typing import Any, Dict, List
+
+from sqlalchemy import bindparam, inspect, select, text
+
+from ..core.database import engine
+from ..models.sql_models import ClaimDetail, ClaimRecord, primary_reason
+from ..utils.logging_utils import setup_logging
+
+logger = setup_logging()
+
+# Columns of the claims table before extracted_data / decision_reasons moved to claim_details
+LEGACY_COLUMNS = ("extracted_data", "decision_reasons")
+MIGRATION_CHUNK_SIZE = 1000
+
+claims_table = ClaimRecord.__table__
+details_table = ClaimDetail.__table__
+
+
+def legacy_columns() -> List[str]:
+    """Legacy JSON columns still present on the claims table (empty once migrated)."""
+    present = {c["name"] for c in inspect(engine).get_columns(claims_table.name)}
+    return [name for name in LEGACY_COLUMNS if name in present]
+
+
+def _json(value: Any) -> Any:
+    # SQLite hands back the JSON text of a column the model no longer maps; servers decode it
+    return json.loads(value) if isinstance(value, (str, bytes)) else value
+
+
+def split_claim_details(chunk_size: int = MIGRATION_CHUNK_SIZE, drop_columns: bool = True) -> Dict[str, int]:
+    """
+    Moves extracted_data / decision_reasons of existing claims into compressed claim_details rows
+    and fills claims.primary_reason, one id-ordered chunk per transaction. Moved rows have their
+    legacy columns cleared in the same transaction, so an interrupted run resumes where it stopped.
+    Finally drops the legacy columns. Returns {"moved", "dropped"}; a no-op on a migrated database.
+    """
+    columns = legacy_columns()
+    if not columns:
+        return {"moved": 0, "dropped": 0}
+    data_col = "extracted_data" if "extracted_data" in columns else "NULL"
+    reasons_col = "decision_reasons" if "decision_reasons" in columns else "NULL"
+    pending = " OR ".join(f"{c} IS NOT NULL" for c in columns)
+    select_chunk = text(
+        f"SELECT id, {data_col}, {reasons_col} FROM claims WHERE id > :last_id AND ({pending}) ORDER BY id LIMIT :limit"
+    )
+    clear_legacy = text(f"UPDATE claims SET {', '.join(f'{c} = NULL' for c in columns)} WHERE id = :row_id")
+    set_reason = claims_table.update().where(claims_table.c.id == bindparam("row_id")).values(
+        primary_reason=bindparam("reason"))
+
+    moved, last_id = 0, 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select_chunk, {"last_id": last_id, "limit": chunk_size}).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            ids = [row[0] for row in rows]
+            done = set(conn.execute(select(details_table.c.claim_id).where(details_table.c.claim_id.in_(ids))).scalars())
+            fresh = [(claim_id, _json(data), _json(reasons)) for claim_id, data, reasons in rows if claim_id not in done]
+            if fresh:
+                conn.execute(details_table.insert(), [
+                    {"claim_id": claim_id, "extracted_data": data, "decision_reasons": reasons}
+                    for claim_id, data, reasons in fresh
+                ])
+                conn.execute(set_reason, [{"row_id": claim_id, "reason": primary_reason(reasons)}
+                                          for claim_id, _, reasons in fresh])
+            conn.execute(clear_legacy, [{"row_id": claim_id} for claim_id in ids])
+            moved += len(fresh)
+        logger.info(f"Claim detail split: {moved} claims moved (up to id {last_id})")
+
+    dropped = 0
+    for column in columns if drop_columns else []:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE claims DROP COLUMN {column}"))
+            dropped += 1
+        except Exception as e:
+            # SQLite before 3.35 cannot drop columns; the emptied column costs almost nothing
+            logger.warning(f"Could not drop legacy column claims.{column}: {e}")
+    stats = {"moved": moved, "dropped": dropped}
+    logger.info(f"Claim detail split done: {stats}")
+    return stats
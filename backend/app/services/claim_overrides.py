@@ -0,0 +1,135 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from ..core.config import BULK_OVERRIDE_MAX_ROWS
+from ..models.sql_models import ClaimDetail, ClaimRecord, primary_reason
+from ..utils.exception_handlers import ServiceError
+from ..utils.logging_utils import setup_logging
+from .claim_stats import apply_stat_postings, claim_stat_postings, merge_stat_postings
+from .member_ledger import apply_postings, claim_postings, merge_postings
+
+logger = setup_logging()
+
+# A batch whose rows change between the read and the version-guarded UPDATE is re-read and retried
+MAX_ATTEMPTS = 3
+
+claims_table = ClaimRecord.__table__
+details_table = ClaimDetail.__table__
+
+# One statement for every row; executed with a parameter list (executemany)
+_OVERRIDE = update(claims_table).where(
+    claims_table.c.id == bindparam("row_id"),
+    claims_table.c.version == bindparam("expected_version"),
+).values(
+    status=bindparam("new_status"),
+    approved_amount=bindparam("new_amount"),
+    primary_reason=bindparam("new_primary_reason"),
+    version=bindparam("new_version"),
+    updated_at=bindparam("now"),
+)
+# The full reasons live in the claim's cold detail row
+_OVERRIDE_REASONS = update(details_table).where(
+    details_table.c.claim_id == bindparam("row_id"),
+).values(decision_reasons=bindparam("new_reasons"))
+
+
+class _ConcurrentChange(Exception):
+    pass
+
+
+def _apply(db: Session, overrides: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    claim_ids = {o["id"] for o in overrides}
+    # Row locks where the database has them (FOR UPDATE is not rendered on SQLite)
+    rows = {row.id: row for row in db.query(
+        ClaimRecord.id, ClaimRecord.version, ClaimRecord.member_id, ClaimRecord.policy_id, ClaimRecord.status,
+        ClaimRecord.total_amount, ClaimRecord.approved_amount, ClaimRecord.created_at,
+        ClaimDetail.claim_id.label("has_detail"), ClaimDetail.extracted_data, ClaimDetail.decision_reasons,
+    ).outerjoin(ClaimDetail, ClaimDetail.claim_id == ClaimRecord.id).filter(
+        ClaimRecord.id.in_(claim_ids)
+    ).with_for_update()}
+
+    now = datetime.utcnow()
+    results, params, before, after, seen = [], [], [], [], set()
+    stats_before, stats_after, missing_details = [], [], set()
+    for override in overrides:
+        claim_id = override["id"]
+        row = rows.get(claim_id)
+        if claim_id in seen:
+            results.append({"id": claim_id, "outcome": "duplicate"})
+            continue
+        seen.add(claim_id)
+        if row is None:
+            results.append({"id": claim_id, "outcome": "not_found"})
+            continue
+        if override["version"] != row.version:
+            results.append({"id": claim_id, "outcome": "conflict", "version": row.version, "status": row.status})
+            continue
+
+        params.append({
+            "row_id": claim_id, "expected_version": row.version, "new_version": row.version + 1,
+            "new_status": override["status"], "new_amount": override["approved_amount"],
+            "new_reasons": override["decision_reasons"],
+            "new_primary_reason": primary_reason(override["decision_reasons"]), "now": now,
+        })
+        if row.has_detail is None:
+            missing_details.add(claim_id)
+        before.append(claim_postings(row.member_id, row.policy_id, row.status, row.approved_amount,
+                                     row.extracted_data, row.created_at))
+        after.append(claim_postings(row.member_id, row.policy_id, override["status"], override["approved_amount"],
+                                    row.extracted_data, row.created_at))
+        stats_before.append(claim_stat_postings(row.status, row.total_amount, row.approved_amount,
+                                                row.decision_reasons, row.extracted_data, row.created_at))
+        stats_after.append(claim_stat_postings(override["status"], row.total_amount, override["approved_amount"],
+                                               override["decision_reasons"], row.extracted_data, row.created_at))
+        results.append({"id": claim_id, "outcome": "updated", "version": row.version + 1, "status": override["status"]})
+
+    if params:
+        result = db.execute(_OVERRIDE, params)
+        if db.get_bind().dialect.supports_sane_multi_rowcount and result.rowcount != len(params):
+            raise _ConcurrentChange()
+        db.execute(_OVERRIDE_REASONS, [p for p in params if p["row_id"] not in missing_details])
+        if missing_details:
+            db.execute(details_table.insert(), [
+                {"claim_id": p["row_id"], "decision_reasons": p["new_reasons"]}
+                for p in params if p["row_id"] in missing_details
+            ])
+        # Ledger deltas summed per bucket: one update per member/family bucket touched
+        apply_postings(db, merge_postings(before), merge_postings(after))
+        apply_stat_postings(db, merge_stat_postings(stats_before), merge_stat_postings(stats_after))
+    return results
+
+
+def override_claims(db: Session, overrides: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Applies admin decisions [{"id", "status", "approved_amount", "decision_reasons", "version"}]
+    with one bulk UPDATE and one commit, moving the member ledger and stats rollups with them.
+    A row whose "version" is stale is not touched and reported as a conflict. Returns one outcome
+    per input row: updated, conflict, not_found or duplicate (the same id earlier in the list).
+    """
+    if len(overrides) > BULK_OVERRIDE_MAX_ROWS:
+        raise ServiceError(f"At most {BULK_OVERRIDE_MAX_ROWS} overrides per request",
+                           code="TOO_MANY_OVERRIDES", status_code=413)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            results = _apply(db, overrides)
+            db.commit()
+        except _ConcurrentChange:
+            db.rollback()
+            logger.warning(f"Claims changed during a bulk override (attempt {attempt}); re-reading")
+            continue
+        except Exception:
+            db.rollback()
+            raise
+        updated = sum(r["outcome"] == "updated" for r in results)
+        logger.info(f"Admin override applied to {updated} of {len(overrides)} claims")
+        return results
+    raise ServiceError("Claims kept changing while the overrides were applied; retry the request",
+                       code="OVERRIDE_CONFLICT", status_code=409)
+
+
+def override_claim(db: Session, claim_id: int, override: Dict[str, Any]) -> Dict[str, Any]:
+    """Single-claim form used by PUT /v1/claims/{claim_id}."""
+    return override_claims(db, [{**override, "id": claim_id}])[0]
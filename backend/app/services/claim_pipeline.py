@@ -0,0 +1,253 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from ..core.database import run_sync
+from ..utils.logging_utils import setup_logging
+from ..utils.metrics import track_stage, record_decision
+from .adjudicator import BALANCE_LABELS, adjudicate_claim
+from .extraction_llm import extract_claim_data
+from .narrator_llm import generate_narrative
+from .fraud_detection import (
+    calculate_dhash, find_duplicate_files, find_near_duplicates, near_duplicates_enabled,
+)
+from .ingestion import IngestedFile
+from .claim_writer import claim_writer
+from .member_ledger import attach_ledger_usage
+from .storage import storage, save_document
+from .velocity import attach_velocity, velocity_tracker
+
+logger = setup_logging()
+
+# Called with the name of each pipeline stage as it starts (job progress reporting)
+StageCallback = Optional[Callable[[str], None]]
+
+
+@contextmanager
+def _stage(on_stage: StageCallback, name: str):
+    if on_stage:
+        on_stage(name)
+    with track_stage(name):
+        yield
+
+
+async def _upload_to_storage(document: IngestedFile) -> str:
+    try:
+        with track_stage("storage_upload"):
+            locator = await save_document(document)
+    except Exception as storage_err:
+        logger.error(f"{storage.name} storage failed for {document.filename}: {storage_err}")
+        raise HTTPException(status_code=500, detail="Failed to upload image to cloud storage")
+    logger.info(f"Stored {document.filename} via {storage.name}: {locator}")
+    return locator
+
+
+async def _cancel_pending(tasks: List[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _fingerprints(documents: List[IngestedFile]) -> List[Optional[str]]:
+    fingerprints = []
+    for document in documents:
+        with document.open() as source:
+            fingerprints.append(calculate_dhash(source))
+    return fingerprints
+
+
+def _apply_write_time_cap(decision_result: Dict[str, Any], record) -> None:
+    """Reflects an approval the writer lowered to the remaining balance (member_ledger.cap_to_balance)."""
+    if record.status == decision_result["decision"] and record.approved_amount == decision_result.get("approved_amount"):
+        return
+    flag = record.decision_reasons[-1]
+    reduction = round(decision_result.get("approved_amount", 0.0) - record.approved_amount, 2)
+    decision_result["decision"] = record.status
+    decision_result["approved_amount"] = record.approved_amount
+    if flag not in decision_result["reasons"]:
+        decision_result["reasons"] = decision_result["reasons"] + [flag]
+    breakdown = [b for b in decision_result.get("breakdown", []) if b["type"] != "final"]
+    breakdown.append({"label": BALANCE_LABELS.get(flag, flag), "amount": -reduction, "type": "deduction"})
+    breakdown.append({"label": "Final Approved Amount", "amount": record.approved_amount, "type": "final"})
+    decision_result["breakdown"] = breakdown
+
+
+def _find_duplicates(db: Session, digests: List[str], fingerprints: List[Optional[str]]):
+    exact_matches = find_duplicate_files(digests, db)
+    near_matches = [] if exact_matches else find_near_duplicates(fingerprints, db)
+    return exact_matches, near_matches
+
+
+async def process_claim(documents: List[IngestedFile], member_id: Optional[str], policy_id: Optional[str],
+                        family_id: Optional[str], db: Session, on_stage: StageCallback = None,
+                        job_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Runs one claim through storage, duplicate detection, extraction, adjudication, narration and
+    persistence. Shared by the synchronous upload endpoint and the background job workers.
+    `job_id` is stored on the claim as its idempotency key (unique), so one job yields one claim.
+    Raises HTTPException for failures that map to a client-visible status.
+    """
+    upload_tasks: List[asyncio.Task] = []
+    try:
+        original_filenames = [d.filename for d in documents]
+        computed_hashes = [d.digest for d in documents]
+
+        for document in documents:
+            # Store in the background; overlaps with duplicate lookup and extraction
+            upload_tasks.append(asyncio.create_task(_upload_to_storage(document)))
+
+        # Perceptual fingerprints (image decoding is CPU work, kept off the event loop)
+        fingerprints: List[Optional[str]] = [None] * len(documents)
+        if near_duplicates_enabled():
+            with _stage(on_stage, "perceptual_hash"):
+                fingerprints = await asyncio.to_thread(_fingerprints, documents)
+
+        # Duplicate check on the fingerprints of every file, in one lookup
+        # Blocking DB work runs on the DB threads (core.database.run_sync), never on the event loop
+        with _stage(on_stage, "duplicate_lookup"):
+            exact_matches, near_matches = await run_sync(_find_duplicates, db, computed_hashes, fingerprints)
+        file_rows = list(zip(computed_hashes, original_filenames, fingerprints))
+
+        # --- DUPLICATE HANDLING ---
+        if exact_matches or near_matches:
+            uploaded_urls = list(await asyncio.gather(*upload_tasks))
+            combined_file_urls = ", ".join(uploaded_urls)
+            if exact_matches:
+                reason_code = "DUPLICATE_IMAGE_DETECTED"
+                summary = "This document appears identical to a previously submitted claim. Flagged for manual verification."
+                matches = [{"page": page, "claim_id": exact_matches[digest], "distance": 0}
+                           for page, digest in enumerate(computed_hashes, 1) if digest in exact_matches]
+            else:
+                reason_code = "NEAR_DUPLICATE_IMAGE_DETECTED"
+                summary = "This document closely resembles a previously submitted claim (re-scanned, re-compressed or resized copy). Flagged for manual verification."
+                matches = near_matches
+            logger.warning(f"Duplicate detected ({reason_code}). Flagging for review.")
+            reasons = [reason_code] + [
+                f"Page {m['page']} matches claim {m['claim_id']} (distance {m['distance']}/64)" for m in matches
+            ]
+            extracted_data = {"total_amount": 0.0, "diagnosis": "Potential Duplicate Upload"}
+            decision_result = {
+                "decision": "MANUAL_REVIEW",
+                "approved_amount": 0.0,
+                "reasons": reasons,
+                "duplicate_matches": matches,
+                "confidence": 0.0,
+                "summary_text": summary,
+                "medical_context": "Analysis paused due to duplicate detection."
+            }
+            
+            claim_fields = dict(
+                file_name=combined_file_urls, 
+                status="MANUAL_REVIEW",
+                total_amount=0.0,
+                approved_amount=0.0,
+                confidence_score=0.0,
+                extracted_data=extracted_data,
+                decision_reasons=reasons,
+                image_hash=computed_hashes[0] if computed_hashes else None,
+                job_id=job_id
+            )
+            with _stage(on_stage, "db_commit"):
+                db_record = await claim_writer.save(claim_fields, file_rows,
+                                                    list(zip(uploaded_urls, computed_hashes, original_filenames)),
+                                                    post_to_ledger=False)
+            # Count the reason code only; the per-page match lines would make unbounded metric labels
+            record_decision({**decision_result, "reasons": [reason_code]})
+            
+            return {
+                "status": "ok",
+                "claim_id": db_record.id,
+                "version": db_record.version,
+                "files_processed": uploaded_urls,
+                "extracted_data": extracted_data,
+                "decision": decision_result
+            }
+
+        # --- AI EXTRACTION ---
+        with _stage(on_stage, "extraction"):
+            handles = [d.open() for d in documents]
+            try:
+                extracted_data = await extract_claim_data(handles, original_filenames)
+            finally:
+                for handle in handles: handle.close()
+        if not extracted_data:
+            raise HTTPException(status_code=422, detail="AI Extraction Failed.")
+
+        # Storage uploads ran alongside extraction; the record needs their URLs
+        uploaded_urls = list(await asyncio.gather(*upload_tasks))
+        combined_file_urls = ", ".join(uploaded_urls)
+
+        # --- MEMBER RESOLUTION ---
+        final_member_id = None
+        if member_id: final_member_id = member_id
+        elif extracted_data.get("member", {}).get("member_id"): final_member_id = extracted_data.get("member", {}).get("member_id")
+        elif extracted_data.get("member", {}).get("name"): final_member_id = extracted_data.get("member", {}).get("name")
+        else: final_member_id = "Unknown_Guest"
+
+        if not extracted_data.get("member"): extracted_data["member"] = {}
+        extracted_data["member"]["member_id"] = final_member_id
+        if family_id: extracted_data["member"]["family_id"] = family_id
+        if policy_id: extracted_data["policy_id"] = policy_id
+
+        # --- VELOCITY CHECK ---
+        with _stage(on_stage, "velocity_query"):
+            await run_sync(attach_velocity, db, extracted_data, final_member_id)
+
+        # --- ANNUAL / FAMILY BALANCE ---
+        with _stage(on_stage, "ledger_lookup"):
+            await run_sync(attach_ledger_usage, db, extracted_data)
+
+        # --- ADJUDICATION ---
+        with _stage(on_stage, "adjudication"):
+            decision_result = adjudicate_claim(extracted_data)
+        record_decision(decision_result)
+        
+        # --- NARRATOR ---
+        # Blocking Gemini call; in a thread so other uploads, job workers and DB hand-offs keep running
+        with _stage(on_stage, "narrator"):
+            narrative_data = await asyncio.to_thread(generate_narrative, extracted_data, decision_result)
+        decision_result["summary_text"] = narrative_data.get("summary")
+        decision_result["medical_context"] = narrative_data.get("medical_context")
+
+        # --- SAVE TO DATABASE ---
+        db_reasons = decision_result.get("reasons", [])[:]
+        if decision_result.get("summary_text"):
+            db_reasons.insert(0, f"Summary: {decision_result['summary_text']}")
+
+        claim_fields = dict(
+            file_name=combined_file_urls, # STORE URL NOT FILENAME
+            member_id=final_member_id,
+            status=decision_result["decision"],
+            total_amount=extracted_data.get("total_amount", 0.0),
+            approved_amount=decision_result.get("approved_amount", 0.0),
+            confidence_score=decision_result.get("confidence", 0.0),
+            extracted_data=extracted_data,
+            decision_reasons=db_reasons,
+            image_hash=computed_hashes[0] if computed_hashes else None,
+            policy_id=decision_result.get("policy_id"),
+            policy_version=decision_result.get("policy_version"),
+            job_id=job_id
+        )
+        # Inserted by the group-commit writer together with concurrent claims (services/claim_writer.py)
+        with _stage(on_stage, "db_commit"):
+            db_record = await claim_writer.save(claim_fields, file_rows,
+                                                list(zip(uploaded_urls, computed_hashes, original_filenames)))
+        velocity_tracker.record(db_record.member_id, db_record.created_at)
+        _apply_write_time_cap(decision_result, db_record)
+        
+        logger.info(f"Claim saved to DB with ID: {db_record.id}")
+
+        return {
+            "status": "ok",
+            "claim_id": db_record.id,
+            "version": db_record.version,
+            "files_processed": uploaded_urls, # Return URLs
+            "extracted_data": extracted_data,
+            "decision": decision_result
+        }
+
+    finally:
+        await _cancel_pending([t for t in upload_tasks if not t.done()])
@@ -0,0 +1,194 @@
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.normalized_claim import money
+from ..models.sql_models import ClaimDetail, ClaimRecord, ClaimStat
+from ..utils.exception_handlers import ServiceError
+from ..utils.logging_utils import setup_logging
+from .rollups import apply_rollup_deltas, merge_rollups, replace_rollups
+
+logger = setup_logging()
+
+# Outcomes counted as approvals in approval rates
+APPROVED_STATUSES = {"APPROVED", "PARTIAL"}
+ALL_DIMENSION = "_all"
+REASON_DIMENSION = "reason"
+HOSPITAL_DIMENSION = "hospital"
+UNKNOWN_HOSPITAL = "Unknown"
+HOSPITAL_KEY_CHARS = 120
+# Only reason codes are rolled up; summaries, duplicate match lines and free-text admin reasons
+# would make unbounded keys
+REASON_CODE = re.compile(r"^[A-Z][A-Z0-9_]{2,63}$")
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 366
+DEFAULT_TOP = 10
+MAX_TOP = 100
+REBUILD_CHUNK_SIZE = 1000
+
+# (day, status, dimension, key) -> (claim count, claimed total, approved total)
+StatKey = Tuple[date, str, str, str]
+StatPostings = Dict[StatKey, Tuple[int, float, float]]
+STAT_KEY_COLUMNS = ("day", "status", "dimension", "key")
+STAT_VALUE_COLUMNS = ("claim_count", "claimed_total", "approved_total")
+
+
+# --- POSTINGS ---
+
+def reason_codes(reasons: Optional[List[Any]]) -> List[str]:
+    """Distinct reason codes of a claim, in order."""
+    codes = []
+    for reason in reasons or []:
+        if isinstance(reason, str) and REASON_CODE.match(reason) and reason not in codes:
+            codes.append(reason)
+    return codes
+
+def hospital_key(claim_data: Optional[Dict[str, Any]]) -> str:
+    hospital = (claim_data or {}).get("hospital")
+    name = hospital.get("name") if isinstance(hospital, dict) else hospital
+    name = " ".join(str(name).split()) if name else ""
+    return name[:HOSPITAL_KEY_CHARS] or UNKNOWN_HOSPITAL
+
+def claim_stat_postings(status: Optional[str], total_amount: Optional[float], approved_amount: Optional[float],
+                        reasons: Optional[List[Any]], claim_data: Optional[Dict[str, Any]],
+                        created_at: Optional[datetime] = None) -> StatPostings:
+    """Rollup buckets a claim contributes to: its day and status overall, per hospital and per reason code."""
+    day = (created_at or datetime.utcnow()).date()
+    status = status or "UNKNOWN"
+    values = (1, money(total_amount), money(approved_amount))
+    postings = {
+        (day, status, ALL_DIMENSION, ""): values,
+        (day, status, HOSPITAL_DIMENSION, hospital_key(claim_data)): values,
+    }
+    for code in reason_codes(reasons):
+        postings[(day, status, REASON_DIMENSION, code)] = values
+    return postings
+
+def record_stat_postings(record: ClaimRecord) -> StatPostings:
+    return claim_stat_postings(record.status, record.total_amount, record.approved_amount,
+                               record.decision_reasons, record.extracted_data, record.created_at)
+
+def merge_stat_postings(postings: Iterable[StatPostings]) -> StatPostings:
+    """Sums the postings of several claims per bucket."""
+    return merge_rollups(postings)
+
+def apply_stat_postings(db: Session, before: StatPostings, after: StatPostings) -> None:
+    """Adds (after - before) to the rollups inside the caller's transaction; the caller commits."""
+    apply_rollup_deltas(db, ClaimStat, STAT_KEY_COLUMNS, STAT_VALUE_COLUMNS, before, after)
+
+def post_claim_stats(db: Session, records: List[ClaimRecord]) -> None:
+    """Posts new claims with one update per rollup bucket, however many claims share it."""
+    apply_stat_postings(db, {}, merge_stat_postings(record_stat_postings(record) for record in records))
+
+
+# --- QUERY ---
+
+def stats_range(start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+    """Inclusive day range; defaults to the last DEFAULT_RANGE_DAYS days up to today (UTC)."""
+    end = end or (start + timedelta(days=DEFAULT_RANGE_DAYS - 1) if start else datetime.utcnow().date())
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise ServiceError("'from' must not be after 'to'", code="INVALID_RANGE")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise ServiceError(f"At most {MAX_RANGE_DAYS} days per request", code="INVALID_RANGE")
+    return start, end
+
+def _new_summary() -> Dict[str, Any]:
+    return {"claims": 0, "approved_claims": 0, "claimed_total": 0.0, "approved_total": 0.0,
+            "by_status": defaultdict(int), "reasons": defaultdict(int), "hospitals": defaultdict(lambda: [0, 0.0, 0.0])}
+
+def _add(summary: Dict[str, Any], status: str, dimension: str, key: str, count: int, claimed: float, approved: float) -> None:
+    if dimension == ALL_DIMENSION:
+        summary["claims"] += count
+        summary["approved_claims"] += count if status in APPROVED_STATUSES else 0
+        summary["claimed_total"] += claimed
+        summary["approved_total"] += approved
+        summary["by_status"][status] += count
+    elif dimension == REASON_DIMENSION:
+        summary["reasons"][key] += count
+    elif dimension == HOSPITAL_DIMENSION:
+        totals = summary["hospitals"][key]
+        totals[0] += count
+        totals[1] += claimed
+        totals[2] += approved
+
+def _render(summary: Dict[str, Any], top: int) -> Dict[str, Any]:
+    claims = summary["claims"]
+    reasons = sorted(summary["reasons"].items(), key=lambda kv: (-kv[1], kv[0]))[:top]
+    hospitals = sorted(summary["hospitals"].items(), key=lambda kv: (-kv[1][0], -kv[1][2], kv[0]))[:top]
+    return {
+        "claims": claims,
+        "approved_claims": summary["approved_claims"],
+        "approval_rate": round(summary["approved_claims"] / claims, 4) if claims else None,
+        "claimed_total": round(summary["claimed_total"], 2),
+        "approved_total": round(summary["approved_total"], 2),
+        "by_status": {status: count for status, count in summary["by_status"].items() if count},
+        "reasons": [{"code": code, "count": count} for code, count in reasons if count],
+        "top_hospitals": [
+            {"hospital": name, "claims": count, "claimed_total": round(claimed, 2), "approved_total": round(approved, 2)}
+            for name, (count, claimed, approved) in hospitals if count
+        ],
+    }
+
+def claim_stats(db: Session, start: date, end: date, top: int = DEFAULT_TOP) -> Dict[str, Any]:
+    """
+    Per-day and whole-range analytics for days in [start, end]: claim counts, approval rate,
+    claimed vs approved totals, status mix, top reason codes and top hospitals. Reads the rollup
+    rows of the range only; days without claims are omitted.
+    """
+    rows = db.query(
+        ClaimStat.day, ClaimStat.status, ClaimStat.dimension, ClaimStat.key,
+        ClaimStat.claim_count, ClaimStat.claimed_total, ClaimStat.approved_total,
+    ).filter(ClaimStat.day >= start, ClaimStat.day <= end).all()
+
+    days: Dict[date, Dict[str, Any]] = defaultdict(_new_summary)
+    total = _new_summary()
+    for day, status, dimension, key, count, claimed, approved in rows:
+        if not count:
+            continue
+        _add(days[day], status, dimension, key, count, claimed or 0.0, approved or 0.0)
+        _add(total, status, dimension, key, count, claimed or 0.0, approved or 0.0)
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "totals": _render(total, top),
+        "days": [{"day": day.isoformat(), **_render(days[day], top)} for day in sorted(days) if days[day]["claims"]],
+    }
+
+
+# --- REBUILD ---
+
+def rebuild_claim_stats(db: Session, chunk_size: int = REBUILD_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Recomputes every rollup from claim history and swaps them in within one transaction.
+    Claims are streamed by id so memory is bounded by the number of rollup buckets, not claims.
+    """
+    scanned = 0
+
+    def history():
+        nonlocal scanned
+        last_id = 0
+        while True:
+            rows = db.query(
+                ClaimRecord.id, ClaimRecord.status, ClaimRecord.total_amount, ClaimRecord.approved_amount,
+                ClaimDetail.decision_reasons, ClaimDetail.extracted_data, ClaimRecord.created_at,
+            ).outerjoin(ClaimDetail, ClaimDetail.claim_id == ClaimRecord.id).filter(
+                ClaimRecord.id > last_id
+            ).order_by(ClaimRecord.id).limit(chunk_size).all()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            for _, status, total_amount, approved_amount, reasons, data, created_at in rows:
+                scanned += 1
+                yield claim_stat_postings(status, total_amount, approved_amount, reasons, data, created_at)
+
+    totals = merge_rollups(history())
+    replace_rollups(db, ClaimStat, STAT_KEY_COLUMNS, STAT_VALUE_COLUMNS, totals)
+
+    stats = {"claims_scanned": scanned, "buckets": len(totals)}
+    logger.info(f"Claim stats rebuilt: {stats}")
+    return stats
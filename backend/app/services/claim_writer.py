@@ -0,0 +1,166 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import CLAIM_WRITE_BATCH_SIZE, CLAIM_WRITE_BATCH_MS
+from ..core.database import SessionLocal, run_sync
+from ..models.sql_models import ClaimRecord
+from ..utils.logging_utils import setup_logging
+from .claim_stats import post_claim_stats
+from .fraud_detection import index_claim_files, record_claim_files
+from .member_ledger import cap_to_balance, post_claims
+from .storage import queue_remote_uploads
+
+logger = setup_logging()
+
+# Queued by close(): everything before it is written, then the writer task exits
+_STOP = object()
+
+
+class PendingClaim:
+    """A claim waiting for the next group commit, and the future its caller awaits."""
+    __slots__ = ("fields", "file_rows", "uploads", "post_to_ledger", "future")
+
+    def __init__(self, fields: Dict[str, Any], file_rows: List[Tuple[str, Optional[str], Optional[str]]],
+                 uploads: List[Tuple[str, str, Optional[str]]], post_to_ledger: bool, future: asyncio.Future):
+        self.fields = fields
+        self.file_rows = file_rows
+        self.uploads = uploads
+        self.post_to_ledger = post_to_ledger
+        self.future = future
+
+
+def write_batch(batch: List[PendingClaim]) -> List[ClaimRecord]:
+    """
+    Inserts every claim of the batch with its files, ledger postings, stats rollups and pending
+    uploads, and commits once. Claims go in with one multi-row INSERT. Ledger and rollup postings
+    are summed per bucket first, so claims sharing a bucket share an update. The files reach the
+    duplicate index only after the commit. Blocking; runs on the DB threads.
+    """
+    # Records stay readable after the session closes: ids and defaults are set on flush
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        records = [ClaimRecord(**claim.fields) for claim in batch]
+        db.add_all(records)
+        db.flush()
+        for claim, record in zip(batch, records):
+            record_claim_files(db, record.id, claim.file_rows)
+            queue_remote_uploads(db, claim.uploads)
+        ledger_records = [record for claim, record in zip(batch, records) if claim.post_to_ledger]
+        # Balance re-checked under the write lock: concurrent claims may have used it since adjudication
+        cap_to_balance(db, ledger_records)
+        post_claims(db, ledger_records)
+        post_claim_stats(db, records)
+        db.commit()
+        for claim, record in zip(batch, records):
+            index_claim_files(record.id, claim.file_rows)
+        return records
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class ClaimWriter:
+    """
+    Group commit for new claims. Callers await `save`; a single writer task collects everything
+    submitted within CLAIM_WRITE_BATCH_MS of the first pending claim (at most CLAIM_WRITE_BATCH_SIZE)
+    and inserts it in one transaction, so one disk sync covers the whole batch. A failing batch
+    is retried claim by claim so only the offending claim's caller sees the error.
+    """
+
+    def __init__(self, batch_size: int = CLAIM_WRITE_BATCH_SIZE, max_delay_ms: float = CLAIM_WRITE_BATCH_MS):
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """Starts the writer task on the running loop (again, if a previous loop went away)."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._task = loop.create_task(self._run())
+
+    async def save(self, fields: Dict[str, Any], file_rows: List[Tuple[str, Optional[str], Optional[str]]],
+                   uploads: List[Tuple[str, str, Optional[str]]], post_to_ledger: bool = True) -> ClaimRecord:
+        """Queues a claim for the next group commit and returns the stored (detached) record."""
+        self.start()
+        future = self._loop.create_future()
+        self._queue.put_nowait(PendingClaim(fields, file_rows, uploads, post_to_ledger, future))
+        # A caller that gives up still gets its claim written; it only stops waiting
+        return await asyncio.shield(future)
+
+    async def _collect(self) -> Tuple[List[PendingClaim], bool]:
+        """The next batch, and whether close() asked the writer to stop after it."""
+        batch: List[PendingClaim] = []
+        item = await self._queue.get()
+        deadline = self._loop.time() + self.max_delay
+        while item is not _STOP:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            if self._queue.empty():
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    return batch, False
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    return batch, False
+            else:
+                item = self._queue.get_nowait()
+        return batch, True
+
+    async def _write(self, batch: List[PendingClaim]) -> None:
+        if not batch:
+            return
+        try:
+            records = await run_sync(write_batch, batch)
+        except Exception as e:
+            if len(batch) == 1:
+                _resolve(batch[0], error=e)
+                return
+            logger.warning(f"Group commit of {len(batch)} claims failed ({e}); retrying one by one")
+            for claim in batch:
+                await self._write([claim])
+            return
+        for claim, record in zip(batch, records):
+            _resolve(claim, record=record)
+        if len(batch) > 1:
+            logger.info(f"Group commit: {len(batch)} claims in one transaction")
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            try:
+                await self._write(batch)
+            except asyncio.CancelledError:
+                # Cancelled mid-write: the outcome is unknown, do not leave callers waiting forever
+                for claim in batch:
+                    _resolve(claim, error=RuntimeError("Claim writer stopped"))
+                raise
+
+    async def close(self) -> None:
+        """Writes everything already queued, then stops the writer task (app shutdown)."""
+        if self._task is None or self._task.done() or self._loop is not asyncio.get_running_loop():
+            return
+        self._queue.put_nowait(_STOP)
+        await self._task
+        self._task = None
+
+
+def _resolve(claim: PendingClaim, record: Optional[ClaimRecord] = None, error: Optional[BaseException] = None) -> None:
+    if claim.future.done():
+        return
+    if error is not None:
+        claim.future.set_exception(error)
+    else:
+        claim.future.set_result(record)
+
+
+claim_writer = ClaimWriter()
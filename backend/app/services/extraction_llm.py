@@ -1,7 +1,8 @@
 import os
 import json
+import asyncio
 import io
-from typing import Dict, Any
+from typing import Any, BinaryIO, Dict, List, Union
 import google.generativeai as genai
 from PIL import Image
 from dotenv import load_dotenv
@@ -73,13 +74,14 @@ Your job is to extract structured data from medical documents (bills, prescripti
 }
 """
 
-async def extract_claim_data(file_contents: list[bytes], filenames: list[str]) -> Dict[str, Any]:
+async def extract_claim_data(file_contents: List[Union[bytes, BinaryIO]], filenames: list[str]) -> Dict[str, Any]:
     try:
         logger.info(f"Starting Gemini extraction for {len(filenames)} files: {filenames}")
         
         images = []
         for content in file_contents:
-            images.append(Image.open(io.BytesIO(content)))
+            # Raw bytes or an open binary handle (spooled uploads are never loaded into a bytes copy)
+            images.append(Image.open(io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content))
 
         model = genai.GenerativeModel(
             model_name=MODEL_NAME,
@@ -89,7 +91,8 @@ async def extract_claim_data(file_contents: list[bytes], filenames: list[str]) -
 
         prompt_content = ["Extract ONE combined claim JSON from these documents. Merge all data.", *images]
         
-        response = model.generate_content(prompt_content)
+        # Blocking SDK call; run it off the event loop so concurrent requests and storage uploads proceed
+        response = await asyncio.to_thread(model.generate_content, prompt_content)
         raw_json = response.text
         data = json.loads(raw_json)
 
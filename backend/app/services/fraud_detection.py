@@ -1,37 +1,241 @@
 import hashlib
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
 from sqlalchemy.orm import Session
-from ..models.sql_models import ClaimRecord
+from ..core.config import (
+    HASH_INDEX_CAPACITY, HASH_INDEX_ERROR_RATE, HASH_INDEX_REFRESH_SECONDS,
+    NEAR_DUPLICATE_DETECTION, NEAR_DUPLICATE_MAX_DISTANCE,
+)
+from ..models.sql_models import ClaimFile, ClaimRecord
+from ..utils.bloom_filter import BloomFilter
+from ..utils.hamming_index import HammingIndex
 from ..utils.logging_utils import setup_logging
 
+try:
+    import imagehash
+    from PIL import Image
+except ImportError:  # near-duplicate detection is optional
+    imagehash = None
+
 logger = setup_logging()
 
-def calculate_phash(image_bytes: bytes) -> str:
+HASH_CHUNK_BYTES = 256 * 1024
+WARM_CHUNK_SIZE = 50000
+
+def calculate_file_hash(image_bytes: Union[bytes, BinaryIO]) -> str:
     """
     Generates a SHA-256 cryptographic hash of the file.
     This ensures that EXACTLY identical files are flagged,
     but similar-looking bills (same template, different text) are allowed.
+    Accepts raw bytes or a binary file handle (read in chunks).
+    Uploads are hashed while they stream in (services/ingestion.py), with the same digest.
     """
     try:
-        # Calculate SHA-256 hash of the raw bytes
-        file_hash = hashlib.sha256(image_bytes).hexdigest()
+        if isinstance(image_bytes, (bytes, bytearray)):
+            # Calculate SHA-256 hash of the raw bytes
+            return hashlib.sha256(image_bytes).hexdigest()
+        hasher = hashlib.sha256()
+        for chunk in iter(lambda: image_bytes.read(HASH_CHUNK_BYTES), b""):
+            hasher.update(chunk)
+        file_hash = hasher.hexdigest()
         return file_hash
     except Exception as e:
         logger.error(f"Failed to generate hash: {e}")
         return None
 
+# Former name; this is the exact (cryptographic) hash, the perceptual one is calculate_dhash
+calculate_phash = calculate_file_hash
+
+DHASH_SIZE = 8 # 8x8 gradient bits -> 64-bit fingerprint
+# Blank or near-uniform pages hash to (almost) all zeros or ones and would match each other
+MIN_DHASH_BITS = 6
+
+def near_duplicates_enabled() -> bool:
+    return NEAR_DUPLICATE_DETECTION and imagehash is not None
+
+def calculate_dhash(source: BinaryIO) -> Optional[str]:
+    """
+    Perceptual difference hash of an image page (hex), stable across re-scans, re-compression
+    and resizing. None for PDFs and anything PIL cannot decode.
+    """
+    if not near_duplicates_enabled():
+        return None
+    try:
+        with Image.open(source) as img:
+            # JPEG decodes straight to a small greyscale image instead of full resolution
+            img.draft("L", (DHASH_SIZE * 8, DHASH_SIZE * 8))
+            fingerprint = str(imagehash.dhash(img, hash_size=DHASH_SIZE))
+    except Exception:
+        return None
+    bits = int(fingerprint, 16).bit_count()
+    if bits < MIN_DHASH_BITS or bits > DHASH_SIZE * DHASH_SIZE - MIN_DHASH_BITS:
+        return None
+    return fingerprint
+
+
+# --- IN-PROCESS HASH INDEX ---
+
+class HashIndex:
+    """
+    Bloom filter over the digests of every recorded file. A miss means "definitely new" and skips
+    the database; a hit is confirmed with one IN query. Perceptual hashes go into a HammingIndex
+    for near-duplicate queries. Only committed claim_files rows are indexed: the claim writer adds
+    its own after the commit, and rows written by other worker processes are pulled in by id
+    (high-water mark) at most every HASH_INDEX_REFRESH_SECONDS.
+    """
+
+    def __init__(self, refresh_seconds: float = HASH_INDEX_REFRESH_SECONDS,
+                 capacity: int = HASH_INDEX_CAPACITY, error_rate: float = HASH_INDEX_ERROR_RATE):
+        self.refresh_seconds = refresh_seconds
+        self.digests = BloomFilter(capacity, error_rate)
+        self.near = HammingIndex(NEAR_DUPLICATE_MAX_DISTANCE) if near_duplicates_enabled() else None
+        self.high_water = 0
+        self.ready = False
+        self.synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.digests)
+
+    def add(self, digests: Iterable[str]) -> None:
+        # Bit updates are read-modify-write; concurrent adds must not lose each other's bits
+        with self._lock:
+            for digest in digests:
+                if digest:
+                    self.digests.add(digest)
+
+    def add_fingerprints(self, fingerprints: Iterable[Tuple[Optional[str], int]]) -> None:
+        """(phash, claim_id) pairs; pages without a perceptual hash are skipped."""
+        if self.near is None:
+            return
+        with self._lock:
+            for phash, claim_id in fingerprints:
+                if phash:
+                    self.near.add(int(phash, 16), claim_id)
+
+    def _load_new_rows(self, db: Session) -> int:
+        loaded = 0
+        while True:
+            rows = db.query(ClaimFile.id, ClaimFile.digest, ClaimFile.phash, ClaimFile.claim_id).filter(
+                ClaimFile.id > self.high_water
+            ).order_by(ClaimFile.id).limit(WARM_CHUNK_SIZE).all()
+            if not rows:
+                break
+            self.high_water = rows[-1][0]
+            for _, digest, _, _ in rows:
+                if digest:
+                    self.digests.add(digest)
+            if self.near is not None:
+                for _, _, phash, claim_id in rows:
+                    if phash:
+                        self.near.add(int(phash, 16), claim_id)
+            loaded += len(rows)
+        self.synced_at = time.monotonic()
+        return loaded
+
+    def warm(self, db: Session) -> int:
+        """Backfills claim_files from legacy claims and loads every digest. Safe to call again."""
+        with self._lock:
+            backfill_claim_files(db)
+            loaded = self._load_new_rows(db)
+            self.ready = True
+        logger.info(f"Hash index warmed with {loaded} files ({len(self)} distinct digests, {self.digests.nbytes // 1024} KB)")
+        return loaded
+
+    def sync(self, db: Session) -> None:
+        if not self.ready:
+            self.warm(db)
+        elif time.monotonic() - self.synced_at >= self.refresh_seconds:
+            with self._lock:
+                self._load_new_rows(db)
+
+    def candidates(self, digests: List[str], db: Session) -> List[str]:
+        """Digests that may already be on file; the rest are definitely new."""
+        self.sync(db)
+        return [d for d in digests if d and d in self.digests]
+
+    def nearest(self, phash: str, db: Session) -> List[Tuple[int, int]]:
+        """(claim_id, distance) of stored pages within NEAR_DUPLICATE_MAX_DISTANCE, nearest first."""
+        if self.near is None or not phash:
+            return []
+        self.sync(db)
+        with self._lock:
+            return self.near.search(int(phash, 16))
+
+hash_index = HashIndex()
+
+
+# --- CLAIM FILES ---
+
+def backfill_claim_files(db: Session) -> int:
+    """Creates claim_files rows for claims stored before every file was recorded (first file only)."""
+    recorded = db.query(ClaimFile.claim_id)
+    legacy = db.query(ClaimRecord.id, ClaimRecord.image_hash, ClaimRecord.created_at).filter(
+        ClaimRecord.image_hash.isnot(None),
+        ClaimRecord.id.notin_(recorded),
+    ).all()
+    if legacy:
+        db.bulk_insert_mappings(ClaimFile, [
+            {"claim_id": claim_id, "digest": digest, "position": 0, "created_at": created_at}
+            for claim_id, digest, created_at in legacy
+        ])
+        db.commit()
+        logger.info(f"Backfilled claim_files for {len(legacy)} legacy claims")
+    return len(legacy)
+
+def record_claim_files(db: Session, claim_id: int, files: List[Tuple[str, Optional[str], Optional[str]]]) -> None:
+    """Adds (digest, filename, phash) rows for a claim inside the caller's transaction; the caller commits."""
+    for position, (digest, file_name, phash) in enumerate(files):
+        if digest:
+            db.add(ClaimFile(claim_id=claim_id, digest=digest, phash=phash, position=position, file_name=file_name))
+
+def index_claim_files(claim_id: int, files: List[Tuple[str, Optional[str], Optional[str]]]) -> None:
+    """
+    Makes a claim's files visible to this process's duplicate checks. Call only after the claim's
+    transaction committed: a rolled back claim must not leave entries behind, since its id can be
+    reused by the next claim.
+    """
+    hash_index.add(digest for digest, _, _ in files)
+    hash_index.add_fingerprints((phash, claim_id) for _, _, phash in files)
+
+
+# --- DUPLICATE LOOKUP ---
+
+def find_duplicate_files(digests: List[str], db: Session) -> Dict[str, int]:
+    """Maps each digest already on file to the earliest claim containing it, in one IN query."""
+    candidates = hash_index.candidates(digests, db)
+    if not candidates:
+        return {}
+    matches: Dict[str, int] = {}
+    rows = db.query(ClaimFile.digest, ClaimFile.claim_id).filter(
+        ClaimFile.digest.in_(set(candidates))
+    ).order_by(ClaimFile.claim_id).all()
+    for digest, claim_id in rows:
+        matches.setdefault(digest, claim_id)
+    for digest, claim_id in matches.items():
+        logger.warning(f"Duplicate File Detected! {digest[:12]} matches Claim ID {claim_id}")
+    return matches
+
+def find_near_duplicates(fingerprints: List[Optional[str]], db: Session) -> List[Dict[str, Any]]:
+    """
+    Pages perceptually close to a stored page: [{"page", "claim_id", "distance"}], nearest match
+    per page. Exact re-uploads are caught earlier by find_duplicate_files.
+    """
+    matches = []
+    for page, phash in enumerate(fingerprints, 1):
+        # The index holds committed pages only, so the nearest entry is a stored claim
+        nearest = hash_index.nearest(phash, db)
+        if nearest:
+            claim_id, distance = nearest[0]
+            matches.append({"page": page, "claim_id": claim_id, "distance": distance})
+            logger.warning(f"Near-duplicate page {page}: {distance}/64 bits from a page of Claim ID {claim_id}")
+    return matches
+
 def check_duplicate_images(current_hash: str, db: Session) -> bool:
     """
     Checks DB for the exact same file hash.
     """
     if not current_hash:
         return False
-
-    exists = db.query(ClaimRecord).filter(
-        ClaimRecord.image_hash == current_hash
-    ).first()
-    
-    if exists:
-        logger.warning(f"Duplicate File Detected! Exact match with Claim ID {exists.id}")
-        return True
-        
-    return False
\ No newline at end of file
+    return bool(find_duplicate_files([current_hash], db))
@@ -0,0 +1,174 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, List, Optional
+
+from fastapi import UploadFile
+
+from ..core.config import INGEST_CHUNK_BYTES, INGEST_SPOOL_BYTES, MAX_UPLOAD_FILE_BYTES, MAX_UPLOAD_REQUEST_BYTES
+from ..utils.exception_handlers import ServiceError
+from ..utils.logging_utils import setup_logging
+
+logger = setup_logging()
+
+
+# Literal status: the 413 constant was renamed across Starlette versions
+PAYLOAD_TOO_LARGE = 413
+
+def _too_large(message: str) -> ServiceError:
+    return ServiceError(message, code="PAYLOAD_TOO_LARGE", status_code=PAYLOAD_TOO_LARGE)
+
+
+class ByteBudget:
+    """Byte allowance shared by all files of one request."""
+    __slots__ = ("limit", "used")
+
+    def __init__(self, limit: int = MAX_UPLOAD_REQUEST_BYTES):
+        self.limit = limit
+        self.used = 0
+
+    def consume(self, n: int) -> None:
+        self.used += n
+        if self.used > self.limit:
+            raise _too_large(f"Upload exceeds the {self.limit} byte limit per claim")
+
+
+class IngestedFile:
+    """
+    One uploaded document after ingestion: SHA-256 and size computed while streaming, content held
+    in memory when small and spooled to a temp file otherwise.
+    `open()` returns an independent read handle, so storage and extraction can read concurrently.
+    """
+    __slots__ = ("filename", "content_type", "digest", "size", "_data", "_path")
+
+    def __init__(self, filename: Optional[str], content_type: Optional[str], digest: str, size: int,
+                 data: Optional[bytes] = None, path: Optional[str] = None):
+        self.filename = filename
+        self.content_type = content_type
+        self.digest = digest
+        self.size = size
+        self._data = data
+        self._path = path
+
+    @property
+    def spooled(self) -> bool:
+        return self._path is not None
+
+    def open(self) -> BinaryIO:
+        if self._path is not None:
+            return open(self._path, "rb")
+        # BytesIO shares an immutable bytes buffer instead of copying it
+        return io.BytesIO(self._data)
+
+    def persist(self, path: str) -> None:
+        """Moves the content to `path` and hands it over: the caller owns that file from now on."""
+        if self._path is not None:
+            shutil.move(self._path, path)
+        else:
+            with open(path, "wb") as f:
+                f.write(self._data)
+        self._data = None
+        self._path = None
+
+    def close(self) -> None:
+        self._data = None
+        if self._path is not None:
+            try: os.remove(self._path)
+            except OSError: pass
+            self._path = None
+
+    def __repr__(self):
+        return f"IngestedFile({self.filename}, {self.size} bytes, {'disk' if self.spooled else 'memory'})"
+
+
+def check_declared_sizes(files: List[UploadFile], budget: ByteBudget, max_file_bytes: int = MAX_UPLOAD_FILE_BYTES) -> None:
+    """Rejects before any bytes are read when the sizes the client declared already exceed the caps."""
+    declared = 0
+    for f in files:
+        size = getattr(f, "size", None)
+        if size is None:
+            continue
+        if size > max_file_bytes:
+            raise _too_large(f"{f.filename} exceeds the {max_file_bytes} byte limit per file")
+        declared += size
+    if declared > budget.limit:
+        raise _too_large(f"Upload exceeds the {budget.limit} byte limit per claim")
+
+
+class _Spooler:
+    """Accumulates one file's chunks: hashes them, enforces the caps and spools past INGEST_SPOOL_BYTES."""
+    __slots__ = ("filename", "budget", "max_bytes", "hasher", "chunks", "spool", "size")
+
+    def __init__(self, filename: Optional[str], budget: ByteBudget, max_bytes: int = MAX_UPLOAD_FILE_BYTES):
+        self.filename = filename
+        self.budget = budget
+        self.max_bytes = max_bytes
+        self.hasher = hashlib.sha256()
+        self.chunks: List[bytes] = []
+        self.spool = None
+        self.size = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise _too_large(f"{self.filename} exceeds the {self.max_bytes} byte limit per file")
+        self.budget.consume(len(chunk))
+        self.hasher.update(chunk)
+
+        if self.spool is None and self.size > INGEST_SPOOL_BYTES:
+            self.spool = tempfile.NamedTemporaryFile(prefix="plum-ingest-", delete=False)
+            for buffered in self.chunks:
+                self.spool.write(buffered)
+            self.chunks = []
+        if self.spool is not None:
+            self.spool.write(chunk)
+        else:
+            self.chunks.append(chunk)
+
+    def finish(self, content_type: Optional[str]) -> IngestedFile:
+        if self.spool is not None:
+            self.spool.close()
+            return IngestedFile(self.filename, content_type, self.hasher.hexdigest(), self.size, path=self.spool.name)
+        return IngestedFile(self.filename, content_type, self.hasher.hexdigest(), self.size, data=b"".join(self.chunks))
+
+    def abort(self) -> None:
+        if self.spool is not None:
+            self.spool.close()
+            os.remove(self.spool.name)
+
+
+async def ingest_upload(file: UploadFile, budget: ByteBudget, max_bytes: int = MAX_UPLOAD_FILE_BYTES) -> IngestedFile:
+    """Streams an UploadFile in chunks, hashing as bytes arrive and enforcing the byte caps."""
+    spooler = _Spooler(file.filename, budget, max_bytes)
+    try:
+        while True:
+            chunk = await file.read(INGEST_CHUNK_BYTES)
+            if not chunk:
+                break
+            spooler.feed(chunk)
+    except BaseException:
+        spooler.abort()
+        raise
+    return spooler.finish(file.content_type)
+
+
+def ingest_stream(source: BinaryIO, filename: Optional[str], content_type: Optional[str], budget: ByteBudget) -> IngestedFile:
+    """Blocking counterpart of `ingest_upload` for file objects, e.g. members of an uploaded archive."""
+    spooler = _Spooler(filename, budget)
+    try:
+        while True:
+            chunk = source.read(INGEST_CHUNK_BYTES)
+            if not chunk:
+                break
+            spooler.feed(chunk)
+    except BaseException:
+        spooler.abort()
+        raise
+    return spooler.finish(content_type)
+
+
+def close_all(documents: List[IngestedFile]) -> None:
+    for document in documents:
+        document.close()
@@ -0,0 +1,246 @@
+import asyncio
+import os
+import shutil
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import JOB_SPOOL_DIR, JOB_POLL_SECONDS, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+from ..core.database import SessionLocal, run_in_session, run_sync
+from ..models.sql_models import ClaimJob, ClaimRecord
+from ..utils.exception_handlers import ServiceError
+from ..utils.logging_utils import setup_logging
+from ..utils.metrics import UPLOADS_IN_FLIGHT, track_stage
+from .claim_pipeline import process_claim
+from .ingestion import IngestedFile
+from .policy_registry import check_policy_id
+
+logger = setup_logging()
+
+FINAL_STATUSES = {"DONE", "FAILED"}
+
+
+# --- ENQUEUE ---
+
+def enqueue_job(db: Session, documents: List[IngestedFile], member_id: Optional[str],
+                policy_id: Optional[str], family_id: Optional[str]) -> ClaimJob:
+    """
+    Moves the ingested documents into the job spool and persists a QUEUED job.
+    The queue lives in the database, so accepted jobs survive a restart.
+    """
+    check_policy_id(policy_id)
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(JOB_SPOOL_DIR, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    try:
+        files = []
+        for index, document in enumerate(documents):
+            path = os.path.join(job_dir, str(index))
+            files.append({"filename": document.filename, "content_type": document.content_type,
+                          "digest": document.digest, "size": document.size, "path": path})
+            document.persist(path)
+
+        job = ClaimJob(id=job_id, status="QUEUED", params={
+            "member_id": member_id, "policy_id": policy_id, "family_id": family_id, "files": files,
+        })
+        db.add(job)
+        db.commit()
+    except Exception:
+        db.rollback()
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+    logger.info(f"Queued claim job {job_id} with {len(files)} documents")
+    return job
+
+
+# --- QUEUE STATE ---
+
+def update_job(job_id: str, **fields: Any) -> None:
+    """Writes job progress in its own short transaction, apart from the pipeline's session."""
+    db = SessionLocal()
+    try:
+        fields["updated_at"] = datetime.utcnow()
+        db.query(ClaimJob).filter(ClaimJob.id == job_id).update(fields, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _fail_abandoned(db: Session, now: datetime) -> None:
+    """Jobs whose lease lapsed on their last allowed attempt are not retried again."""
+    abandoned = db.query(ClaimJob).filter(
+        ClaimJob.status == "RUNNING",
+        ClaimJob.lease_expires_at < now,
+        ClaimJob.attempts >= JOB_MAX_ATTEMPTS,
+    ).all()
+    for job in abandoned:
+        logger.error(f"Claim job {job.id} abandoned after {job.attempts} attempts")
+        job.status = "FAILED"
+        job.error = {"status_code": 500, "detail": "Claim processing was interrupted"}
+        job.finished_at = now
+        _remove_spool(job.id)
+    if abandoned:
+        db.commit()
+
+
+def claim_next_job(db: Session, worker: str) -> Optional[str]:
+    """
+    Leases the oldest runnable job to `worker`: a QUEUED job, or a RUNNING one whose lease expired.
+    The conditional UPDATE makes the claim atomic across workers and processes.
+    """
+    now = datetime.utcnow()
+    _fail_abandoned(db, now)
+    runnable = or_(
+        ClaimJob.status == "QUEUED",
+        and_(ClaimJob.status == "RUNNING", ClaimJob.lease_expires_at < now),
+    )
+    for _ in range(3):
+        row = db.query(ClaimJob.id).filter(runnable).order_by(ClaimJob.created_at).first()
+        if not row:
+            return None
+        claimed = db.query(ClaimJob).filter(ClaimJob.id == row[0], runnable).update({
+            ClaimJob.status: "RUNNING",
+            ClaimJob.stage: None,
+            ClaimJob.worker: worker,
+            ClaimJob.attempts: ClaimJob.attempts + 1,
+            ClaimJob.lease_expires_at: now + timedelta(seconds=JOB_LEASE_SECONDS),
+            ClaimJob.started_at: now,
+            ClaimJob.updated_at: now,
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            return row[0]
+    # Lost every race to other workers; try again on the next poll
+    return None
+
+
+def job_status(job: ClaimJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "stage": job.stage,
+        "attempts": job.attempts,
+        "claim_id": job.claim_id,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result": job.result,
+        "error": job.error,
+    }
+
+
+def stored_claim_result(db: Session, job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Result for the claim an earlier run of this job already stored (claims.job_id), or None.
+    A re-run after a lapsed lease returns it instead of creating a second claim.
+    """
+    record = db.query(ClaimRecord).filter(ClaimRecord.job_id == job_id).first()
+    if record is None:
+        return None
+    return {
+        "status": "ok",
+        "claim_id": record.id,
+        "version": record.version,
+        "files_processed": [part.strip() for part in (record.file_name or "").split(",") if part.strip()],
+        "extracted_data": record.extracted_data,
+        "decision": {
+            "decision": record.status,
+            "approved_amount": record.approved_amount,
+            "reasons": record.decision_reasons,
+            "confidence": record.confidence_score,
+            "policy_id": record.policy_id,
+            "policy_version": record.policy_version,
+        },
+    }
+
+
+def _remove_spool(job_id: str) -> None:
+    shutil.rmtree(os.path.join(JOB_SPOOL_DIR, job_id), ignore_errors=True)
+
+
+# --- WORKER ---
+
+async def run_job(job_id: str) -> None:
+    """Runs one leased job through the claim pipeline and records the outcome on the job row."""
+    db = SessionLocal()
+    try:
+        job = await run_sync(db.get, ClaimJob, job_id)
+        params = job.params or {}
+        documents = [
+            IngestedFile(f["filename"], f["content_type"], f["digest"], f["size"], path=f["path"])
+            for f in params.get("files", [])
+        ]
+
+        progress: Optional[asyncio.Task] = None
+
+        async def write_stage(previous: Optional[asyncio.Task], stage: str) -> None:
+            if previous:
+                await asyncio.gather(previous, return_exceptions=True)
+            await run_sync(update_job, job_id, stage=stage,
+                           lease_expires_at=datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS))
+
+        def on_stage(stage: str) -> None:
+            # Every stage renews the lease, so only a stalled or dead worker loses the job.
+            # Written in the background, one after another, so the pipeline never waits on it
+            nonlocal progress
+            progress = asyncio.create_task(write_stage(progress, stage))
+
+        outcome: Dict[str, Any] = {}
+        try:
+            result = await run_sync(stored_claim_result, db, job_id)
+            if result:
+                logger.warning(f"Claim job {job_id} re-run: claim {result['claim_id']} was already stored")
+            else:
+                try:
+                    with UPLOADS_IN_FLIGHT.track_in_progress(), track_stage("total"):
+                        result = await process_claim(documents, params.get("member_id"), params.get("policy_id"),
+                                                     params.get("family_id"), db, on_stage, job_id=job_id)
+                except IntegrityError:
+                    # A stalled earlier run of the same job stored its claim first (unique claims.job_id)
+                    await run_sync(db.rollback)
+                    result = await run_sync(stored_claim_result, db, job_id)
+                    if not result:
+                        raise
+            outcome = {"status": "DONE", "result": jsonable_encoder(result), "claim_id": result.get("claim_id")}
+        except HTTPException as he:
+            outcome = {"status": "FAILED", "error": {"status_code": he.status_code, "detail": he.detail}}
+        except ServiceError as se:
+            outcome = {"status": "FAILED", "error": {"status_code": se.status_code, "detail": se.message, "code": se.code}}
+        except Exception as e:
+            logger.exception(f"Claim job {job_id} failed")
+            outcome = {"status": "FAILED", "error": {"status_code": 500, "detail": str(e)}}
+
+        if progress:
+            await asyncio.gather(progress, return_exceptions=True)
+        await run_sync(db.rollback)
+        await run_sync(update_job, job_id, stage=None, finished_at=datetime.utcnow(), lease_expires_at=None, **outcome)
+        _remove_spool(job_id)
+        logger.info(f"Claim job {job_id} {outcome['status']}")
+    finally:
+        # The spooled documents stay on disk until the job finishes, so a job interrupted by a
+        # shutdown can be picked up again once its lease expires
+        db.close()
+
+
+async def run_job_worker(poll_interval: float = JOB_POLL_SECONDS) -> None:
+    """Background loop started with the app; several run side by side (JOB_WORKERS)."""
+    worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    logger.info(f"Claim job worker {worker} started")
+    while True:
+        try:
+            job_id = await run_in_session(claim_next_job, worker)
+            if job_id:
+                await run_job(job_id)
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Claim job worker iteration failed")
+        await asyncio.sleep(poll_interval)
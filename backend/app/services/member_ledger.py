@@ -0,0 +1,246 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from ..models.normalized_claim import NormalizedClaim, normalize_claim
+from ..models.sql_models import ClaimDetail, ClaimRecord, MemberLedger
+from ..utils.exception_handlers import ServiceError
+from ..utils.logging_utils import setup_logging
+from .policy_engine import CompiledPolicy
+from .policy_registry import registry
+from .rollups import UPSERT_INSERTS, apply_rollup_deltas, merge_rollups, replace_rollups
+
+logger = setup_logging()
+
+# Only these outcomes consume the member's balance
+LEDGER_STATUSES = {"APPROVED", "PARTIAL"}
+TOTAL_CATEGORY = "_all"
+GUEST_MEMBER = "Unknown_Guest"
+REBUILD_CHUNK_SIZE = 1000
+
+# (scope, scope_key, policy_id, policy_year, category) -> (approved amount, claim count)
+LedgerKey = Tuple[str, str, str, int, str]
+Postings = Dict[LedgerKey, Tuple[float, int]]
+
+LEDGER_KEY_COLUMNS = ("scope", "scope_key", "policy_id", "policy_year", "category")
+LEDGER_VALUE_COLUMNS = ("approved_total", "claim_count")
+
+
+# --- HELPERS ---
+
+def _policy_or_none(policy_id: Optional[str]) -> Optional[CompiledPolicy]:
+    try:
+        return registry.get(policy_id)
+    except ServiceError:
+        # Policy file removed since the claim was decided; fall back to calendar years
+        return None
+
+def policy_year(policy: Optional[CompiledPolicy], when: Optional[datetime]) -> int:
+    """Year in which the policy year containing `when` started (policy years renew on the effective date)."""
+    when = when or datetime.utcnow()
+    start = policy.effective_from if policy else None
+    if start and (when.month, when.day) < (start.month, start.day):
+        return when.year - 1
+    return when.year
+
+def claim_category(claim: NormalizedClaim, policy: Optional[CompiledPolicy]) -> str:
+    """Dental for dental diagnoses, otherwise the category of the largest line item."""
+    if policy and policy.dental_matcher.matches(claim.diagnosis_lc):
+        return "dental"
+    if not claim.item_amounts:
+        return "general"
+    largest = max(range(len(claim.item_amounts)), key=claim.item_amounts.__getitem__)
+    return claim.item_categories_lc[largest] or "general"
+
+
+# --- POSTINGS ---
+
+def claim_postings(member_id: Optional[str], policy_id: Optional[str], status: Optional[str],
+                   approved_amount: Optional[float], claim_data: Optional[Dict[str, Any]],
+                   created_at: Optional[datetime] = None) -> Postings:
+    """Ledger buckets a claim contributes to; empty when it does not consume any balance."""
+    amount = round(float(approved_amount or 0.0), 2)
+    if status not in LEDGER_STATUSES or amount <= 0 or not member_id or member_id == GUEST_MEMBER:
+        return {}
+
+    claim = normalize_claim(claim_data or {})
+    policy = _policy_or_none(policy_id or claim.policy_id)
+    policy_key = policy.policy_id if policy else (policy_id or "UNKNOWN")
+    year = policy_year(policy, claim.treatment_date or created_at)
+    category = claim_category(claim, policy)
+    family_id = claim.family_id or member_id
+
+    postings = {}
+    for scope, key in (("member", member_id), ("family", family_id)):
+        for cat in (TOTAL_CATEGORY, category):
+            postings[(scope, key, policy_key, year, cat)] = (amount, 1)
+    return postings
+
+def record_postings(record: ClaimRecord) -> Postings:
+    return claim_postings(record.member_id, record.policy_id, record.status,
+                          record.approved_amount, record.extracted_data, record.created_at)
+
+def apply_postings(db: Session, before: Postings, after: Postings) -> None:
+    """Adds (after - before) to the ledger inside the caller's transaction; the caller commits."""
+    apply_rollup_deltas(db, MemberLedger, LEDGER_KEY_COLUMNS, LEDGER_VALUE_COLUMNS, before, after)
+
+def merge_postings(postings: Iterable[Postings]) -> Postings:
+    """Sums the postings of several claims per bucket."""
+    return merge_rollups(postings)
+
+def post_claim(db: Session, record: ClaimRecord, before: Optional[Postings] = None) -> None:
+    """Posts a new or changed claim; pass `before=record_postings(record)` taken prior to an override."""
+    apply_postings(db, before or {}, record_postings(record))
+
+def post_claims(db: Session, records: List[ClaimRecord]) -> None:
+    """Posts new claims with one update per ledger bucket, however many claims share it."""
+    apply_postings(db, {}, merge_postings(record_postings(record) for record in records))
+
+
+# --- BALANCE LOOKUP ---
+
+def ledger_usage(db: Session, member_id: str, family_id: str, policy: CompiledPolicy, year: int) -> Tuple[float, float]:
+    """(member, family) approved totals for the policy year: two unique-key rows, independent of claim history."""
+    rows = db.query(MemberLedger.scope, MemberLedger.approved_total).filter(
+        MemberLedger.policy_id == policy.policy_id,
+        MemberLedger.policy_year == year,
+        MemberLedger.category == TOTAL_CATEGORY,
+        or_(
+            and_(MemberLedger.scope == "member", MemberLedger.scope_key == member_id),
+            and_(MemberLedger.scope == "family", MemberLedger.scope_key == family_id),
+        ),
+    ).all()
+    used = {scope: total or 0.0 for scope, total in rows}
+    return round(used.get("member", 0.0), 2), round(used.get("family", 0.0), 2)
+
+def attach_ledger_usage(db: Session, claim_data: Dict[str, Any]) -> None:
+    """Stamps `annual_used` / `family_used` on an extracted claim so the adjudicator can enforce the balance."""
+    claim = normalize_claim(claim_data)
+    if not claim.member_id or claim.member_id == GUEST_MEMBER:
+        return
+    policy = registry.get(claim.policy_id)
+    year = policy_year(policy, claim.treatment_date)
+    member_used, family_used = ledger_usage(db, claim.member_id, claim.family_id, policy, year)
+    claim_data["annual_used"] = member_used
+    claim_data["family_used"] = family_used
+    logger.info("LEDGER: Member '%(member_id)s' used %(member_used)s, family used %(family_used)s in policy year %(year)s.",
+                {"member_id": claim.member_id, "member_used": member_used, "family_used": family_used, "year": year})
+
+
+# --- WRITE-TIME BALANCE CHECK ---
+
+# (scope, scope_key, policy_id, policy_year) of a balance: the "_all" category row
+BalanceKey = Tuple[str, str, str, int]
+
+def _locked_usage(db: Session, keys: List[BalanceKey]) -> Dict[BalanceKey, float]:
+    """Approved totals of the balance rows, locked FOR UPDATE in key order where the database has row locks."""
+    dialect = db.get_bind().dialect.name
+    if dialect in UPSERT_INSERTS and dialect != "sqlite":
+        # Lockable rows must exist; concurrent writers then queue on them instead of both inserting
+        db.execute(UPSERT_INSERTS[dialect](MemberLedger).on_conflict_do_nothing(index_elements=list(LEDGER_KEY_COLUMNS)), [
+            {**dict(zip(LEDGER_KEY_COLUMNS, key + (TOTAL_CATEGORY,))), "approved_total": 0.0, "claim_count": 0}
+            for key in keys
+        ])
+    rows = db.query(
+        MemberLedger.scope, MemberLedger.scope_key, MemberLedger.policy_id, MemberLedger.policy_year,
+        MemberLedger.approved_total,
+    ).filter(MemberLedger.category == TOTAL_CATEGORY, or_(*[
+        and_(MemberLedger.scope == scope, MemberLedger.scope_key == scope_key,
+             MemberLedger.policy_id == policy_id, MemberLedger.policy_year == year)
+        for scope, scope_key, policy_id, year in keys
+    ])).order_by(
+        MemberLedger.scope, MemberLedger.scope_key, MemberLedger.policy_id, MemberLedger.policy_year,
+    ).with_for_update().all()
+    used = {key: 0.0 for key in keys}
+    for scope, scope_key, policy_id, year, total in rows:
+        used[(scope, scope_key, policy_id, year)] = total or 0.0
+    return used
+
+def cap_to_balance(db: Session, records: List[ClaimRecord]) -> List[ClaimRecord]:
+    """
+    Re-checks approvals against the member / family balance inside the write transaction, before
+    they are posted, and lowers any that no longer fit (PARTIAL, or REJECTED when nothing is left).
+    Adjudication read the balance in an earlier transaction, so concurrent claims of one member,
+    or claims sharing a group commit, could otherwise all pass the same check. Call after the
+    claims' INSERT, which holds the SQLite write lock; other databases lock the balance rows.
+    Records are checked in order, each against the ledger plus the approvals before it.
+    Returns the records that were capped.
+    """
+    checks = []
+    for record in records:
+        amount = round(float(record.approved_amount or 0.0), 2)
+        if record.status not in LEDGER_STATUSES or amount <= 0 or not record.member_id \
+                or record.member_id == GUEST_MEMBER:
+            continue
+        claim = normalize_claim(record.extracted_data or {})
+        policy = _policy_or_none(record.policy_id or claim.policy_id)
+        if policy is None:
+            continue
+        year = policy_year(policy, claim.treatment_date or record.created_at)
+        member_key = ("member", record.member_id, policy.policy_id, year)
+        family_key = ("family", claim.family_id or record.member_id, policy.policy_id, year)
+        checks.append((record, amount, policy, member_key, family_key))
+    if not checks:
+        return []
+
+    used = _locked_usage(db, sorted({key for check in checks for key in check[3:]}))
+    capped = []
+    for record, amount, policy, member_key, family_key in checks:
+        balance, flag = float("inf"), None
+        for limit, key, limit_flag in (
+            (policy.annual_limit, member_key, "ANNUAL_LIMIT_EXCEEDED"),
+            (policy.family_floater_limit, family_key, "FAMILY_LIMIT_EXCEEDED"),
+        ):
+            if limit > 0 and max(0.0, limit - used[key]) < balance:
+                balance, flag = max(0.0, round(limit - used[key], 2)), limit_flag
+        if amount > balance:
+            logger.warning(f"LEDGER: claim {record.id} approval {amount} exceeds the remaining balance "
+                           f"{balance} ({flag}); capped at write time")
+            amount = balance
+            record.approved_amount = amount
+            record.status = "PARTIAL" if amount > 0 else "REJECTED"
+            reasons = list(record.decision_reasons or [])
+            if flag not in reasons:
+                record.decision_reasons = reasons + [flag]
+            capped.append(record)
+        used[member_key] += amount
+        used[family_key] += amount
+    return capped
+
+
+# --- REBUILD ---
+
+def rebuild_ledger(db: Session, chunk_size: int = REBUILD_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Recomputes the whole ledger from claim history and swaps it in within one transaction.
+    Claims are streamed by id so memory is bounded by the number of ledger buckets, not claims.
+    """
+    scanned, posted = 0, 0
+
+    def history():
+        nonlocal scanned, posted
+        last_id = 0
+        while True:
+            rows = db.query(
+                ClaimRecord.id, ClaimRecord.member_id, ClaimRecord.policy_id, ClaimRecord.status,
+                ClaimRecord.approved_amount, ClaimDetail.extracted_data, ClaimRecord.created_at,
+            ).outerjoin(ClaimDetail, ClaimDetail.claim_id == ClaimRecord.id).filter(
+                ClaimRecord.id > last_id
+            ).order_by(ClaimRecord.id).limit(chunk_size).all()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            for _, member_id, policy_id, status, amount, data, created_at in rows:
+                postings = claim_postings(member_id, policy_id, status, amount, data, created_at)
+                scanned += 1
+                posted += bool(postings)
+                yield postings
+
+    totals = merge_rollups(history())
+    replace_rollups(db, MemberLedger, LEDGER_KEY_COLUMNS, LEDGER_VALUE_COLUMNS, totals)
+
+    stats = {"claims_scanned": scanned, "claims_posted": posted, "buckets": len(totals)}
+    logger.info(f"Member ledger rebuilt: {stats}")
+    return stats
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from ..core.config import POLICY_CACHE_SIZE, VELOCITY_LIMITS
+from ..utils.date_parsing import parse_date
+from ..utils.logging_utils import setup_logging
+
+logger = setup_logging()
+
+# --- KEYWORD CONFIGURATION ---
+# Terms that are always treated as exclusions on top of the policy's own list
+SUPPLEMENTAL_EXCLUSIONS = ["Whitening", "Aesthetic", "Beautification", "Cosmetic"]
+
+# Label -> keywords matched against lower-cased item names / categories
+ITEM_KEYWORDS = {
+    "alternative": ["alternative", "ayurveda", "homeopathy"],
+    "consultation": ["consultation"],
+    "pharmacy": ["pharmacy", "medicine"],
+}
+
+DENTAL_DIAGNOSIS_KEYWORDS = ["root canal", "tooth", "dental"]
+
+EMPTY_LABELS: FrozenSet[str] = frozenset()
+
+# Item names and categories repeat heavily across claims, so label lookups are memoized per matcher
+MATCH_MEMO_SIZE = 8192
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over lower-cased keywords.
+    Each keyword carries a label; a single pass over the text returns every label hit,
+    so the cost per text is O(len(text)) regardless of how many keywords are loaded.
+    """
+    __slots__ = ("_goto", "_fail", "_out", "_memo")
+
+    def __init__(self, keywords: Iterable[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[FrozenSet[str]] = [EMPTY_LABELS]
+        pending: List[set] = [set()]
+
+        for keyword, label in keywords:
+            keyword = (keyword or "").lower()
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    pending.append(set())
+                state = nxt
+            pending[state].add(label)
+
+        # Breadth-first pass to wire failure links and merge outputs of suffix states
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fallback = self._goto[f].get(ch, 0)
+                self._fail[nxt] = fallback if fallback != nxt else 0
+                pending[nxt] |= pending[self._fail[nxt]]
+        self._out = [frozenset(labels) if labels else EMPTY_LABELS for labels in pending]
+        self._memo: Dict[str, FrozenSet[str]] = {}
+
+    def labels(self, text: str) -> FrozenSet[str]:
+        """Returns the set of labels whose keywords occur in `text` (expected lower-cased)."""
+        if not text:
+            return EMPTY_LABELS
+        cached = self._memo.get(text)
+        if cached is not None:
+            return cached
+        goto, fail, out = self._goto, self._fail, self._out
+        found = None
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found = out[state] if found is None else found | out[state]
+        found = found or EMPTY_LABELS
+        if len(self._memo) >= MATCH_MEMO_SIZE:
+            self._memo.clear()
+        self._memo[text] = found
+        return found
+
+    def matches(self, text: str) -> bool:
+        """True if any keyword occurs in `text` (expected lower-cased)."""
+        return bool(self.labels(text))
+
+
+def _limit(value: Any) -> float:
+    try: return round(float(value or 0.0), 2)
+    except (TypeError, ValueError): return 0.0
+
+
+def policy_fingerprint(policy: Dict[str, Any]) -> str:
+    """Stable short hash of the policy content, used as its version when none is declared."""
+    canonical = json.dumps(policy, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+class CompiledPolicy:
+    """
+    Read-only, pre-normalized view of a policy document.
+    Built once per policy version; rule functions consume this instead of the raw dict.
+    """
+    __slots__ = (
+        "raw", "policy_id", "version", "effective_date", "effective_from",
+        "per_claim_limit", "annual_limit", "family_floater_limit",
+        "dental_sub_limit", "network_discount_pct", "copay_pct",
+        "waiting_periods", "waiting_matcher", "item_matcher", "dental_matcher",
+        "network_index", "network_matcher", "velocity_limits",
+    )
+
+    def __init__(self, policy: Dict[str, Any], version: Optional[str] = None):
+        coverage = policy.get("coverage_details", {})
+        consultation = coverage.get("consultation_fees", {})
+
+        self.raw = policy
+        self.policy_id = policy.get("policy_id", "UNKNOWN")
+        self.version = version or str(policy.get("version") or policy_fingerprint(policy))
+        self.effective_date = policy.get("effective_date")
+        self.effective_from = parse_date(self.effective_date)
+
+        self.per_claim_limit = _limit(coverage.get("per_claim_limit"))
+        self.annual_limit = _limit(coverage.get("annual_limit"))
+        self.family_floater_limit = _limit(coverage.get("family_floater_limit"))
+        self.dental_sub_limit = _limit(coverage.get("dental", {}).get("sub_limit"))
+        self.network_discount_pct = _limit(consultation.get("network_discount"))
+        self.copay_pct = _limit(consultation.get("copay_percentage"))
+        # Velocity window -> prior claims that trigger review
+        overrides = policy.get("claim_requirements", {}).get("velocity_limits", {})
+        self.velocity_limits = {**VELOCITY_LIMITS, **{k: int(v) for k, v in overrides.items()}}
+
+        # Waiting periods: condition (lower-cased) -> days
+        ailments = policy.get("waiting_periods", {}).get("specific_ailments", {})
+        self.waiting_periods = {cond.lower(): int(days) for cond, days in ailments.items()}
+        self.waiting_matcher = KeywordMatcher((cond, cond) for cond in self.waiting_periods)
+
+        # Item classification: exclusions plus category keywords in one automaton
+        exclusions = policy.get("exclusions", []) + SUPPLEMENTAL_EXCLUSIONS
+        item_keywords = [(ex, "exclusion") for ex in exclusions]
+        for label, words in ITEM_KEYWORDS.items():
+            item_keywords.extend((w, label) for w in words)
+        self.item_matcher = KeywordMatcher(item_keywords)
+        self.dental_matcher = KeywordMatcher((w, "dental") for w in DENTAL_DIAGNOSIS_KEYWORDS)
+
+        # Network hospitals: exact-name index for the common case, automaton for substrings
+        networks = [h for h in policy.get("network_hospitals", []) if h]
+        self.network_index = {h.strip().lower(): h for h in networks}
+        self.network_matcher = KeywordMatcher((h, "network") for h in networks)
+
+    def is_network_hospital(self, hospital_name: Optional[str]) -> bool:
+        if not hospital_name:
+            return False
+        name = hospital_name.lower()
+        if name.strip() in self.network_index:
+            return True
+        return self.network_matcher.matches(name)
+
+    def __repr__(self):
+        return f"CompiledPolicy({self.policy_id}@{self.version})"
+
+
+# --- COMPILATION CACHE ---
+# Bounded LRU keyed by (policy_id, version); shared by the registry and ad-hoc callers
+_COMPILED: "OrderedDict[Tuple[str, str], CompiledPolicy]" = OrderedDict()
+_COMPILED_LOCK = threading.Lock()
+
+def compile_policy(policy: Dict[str, Any], version: Optional[str] = None) -> CompiledPolicy:
+    """Compiles a raw policy dict, reusing an existing build for the same policy version."""
+    version = version or str(policy.get("version") or policy_fingerprint(policy))
+    key = (policy.get("policy_id", "UNKNOWN"), version)
+    with _COMPILED_LOCK:
+        compiled = _COMPILED.get(key)
+        if compiled is not None:
+            _COMPILED.move_to_end(key)
+            return compiled
+
+    compiled = CompiledPolicy(policy, version=version)
+    with _COMPILED_LOCK:
+        _COMPILED[key] = compiled
+        _COMPILED.move_to_end(key)
+        while len(_COMPILED) > POLICY_CACHE_SIZE:
+            evicted, _ = _COMPILED.popitem(last=False)
+            logger.info(f"Evicted compiled policy {evicted[0]} version {evicted[1]}")
+    logger.info(f"Compiled policy {compiled.policy_id} version {compiled.version}")
+    return compiled
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from fastapi import status
+
+from ..core.config import POLICY_FILE, POLICY_DIR, POLICY_RELOAD_SECONDS
+from ..utils.logging_utils import setup_logging
+from ..utils.exception_handlers import ServiceError
+from .policy_engine import CompiledPolicy, compile_policy
+
+logger = setup_logging()
+
+
+class _PolicySource:
+    """Tracks one policy file on disk so unchanged files are never re-read or re-compiled."""
+    __slots__ = ("path", "mtime", "digest", "policy_id", "version", "raw")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = None
+        self.digest = None
+        self.policy_id = None
+        self.version = None
+        self.raw = None
+
+
+class PolicyRegistry:
+    """
+    Registry of employer policies keyed by policy_id and version.
+    Files are re-checked at most every `reload_seconds`: an mtime change triggers a content hash,
+    and only a changed hash produces a new version (compiled lazily through the shared LRU).
+    """
+
+    def __init__(self, default_file: str = POLICY_FILE, policy_dir: str = POLICY_DIR,
+                 reload_seconds: float = POLICY_RELOAD_SECONDS):
+        self.default_file = str(default_file)
+        self.policy_dir = str(policy_dir)
+        self.reload_seconds = reload_seconds
+        self.default_policy_id: Optional[str] = None
+        self._sources: Dict[str, _PolicySource] = {}
+        self._by_id: Dict[str, _PolicySource] = {}
+        self._last_scan = 0.0
+        self._lock = threading.RLock()
+
+    # --- LOADING ---
+
+    def _candidate_paths(self) -> List[str]:
+        paths = [self.default_file]
+        if os.path.isdir(self.policy_dir):
+            paths.extend(sorted(str(p) for p in Path(self.policy_dir).glob("*.json")))
+        return paths
+
+    def _refresh_source(self, source: _PolicySource) -> bool:
+        """Re-reads a policy file if it changed on disk. Returns True when a new version was loaded."""
+        try:
+            mtime = os.stat(source.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == source.mtime:
+            return False
+        source.mtime = mtime
+
+        with open(source.path, "rb") as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if digest == source.digest:
+            return False
+
+        try:
+            raw = json.loads(content)
+        except ValueError as e:
+            logger.error(f"Ignoring invalid policy file {source.path}: {e}")
+            return False
+        if not isinstance(raw, dict) or not raw.get("policy_id"):
+            logger.warning(f"Skipping {source.path}: not a policy document (missing policy_id)")
+            return False
+
+        source.digest = digest
+        source.raw = raw
+        source.policy_id = raw["policy_id"]
+        source.version = str(raw.get("version") or digest[:12])
+        logger.info(f"Loaded policy {source.policy_id} version {source.version} from {source.path}")
+        return True
+
+    def reload(self, force: bool = False) -> None:
+        """Scans the policy files and picks up any that changed since the last scan."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_scan and now - self._last_scan < self.reload_seconds:
+                return
+            self._last_scan = now
+
+            paths = self._candidate_paths()
+            for path in paths:
+                source = self._sources.get(path)
+                if source is None:
+                    source = self._sources[path] = _PolicySource(path)
+                self._refresh_source(source)
+
+            for path in list(self._sources):
+                if path not in paths or not os.path.exists(path):
+                    del self._sources[path]
+
+            by_id = {}
+            for path in paths:
+                source = self._sources.get(path)
+                if source and source.raw is not None:
+                    if source.policy_id in by_id:
+                        logger.warning(f"Policy {source.policy_id} defined twice; {path} takes precedence")
+                    by_id[source.policy_id] = source
+            self._by_id = by_id
+
+            default = self._sources.get(self.default_file)
+            if default and default.raw is not None:
+                self.default_policy_id = default.policy_id
+
+    # --- LOOKUP ---
+
+    def get(self, policy_id: Optional[str] = None) -> CompiledPolicy:
+        """Returns the current compiled version of a policy (the default policy when no id is given)."""
+        self.reload()
+        policy_id = policy_id or self.default_policy_id
+        source = self._by_id.get(policy_id) if policy_id else None
+        if source is None:
+            raise ServiceError(f"Unknown policy '{policy_id}'", code="POLICY_NOT_FOUND", status_code=status.HTTP_404_NOT_FOUND)
+        return compile_policy(source.raw, version=source.version)
+
+    def versions(self) -> Dict[str, str]:
+        """policy_id -> currently active version."""
+        self.reload()
+        return {pid: src.version for pid, src in self._by_id.items()}
+
+    def raw(self, policy_id: Optional[str] = None) -> Dict[str, Any]:
+        return self.get(policy_id).raw
+
+
+registry = PolicyRegistry()
+
+
+def check_policy_id(policy_id: Optional[str]) -> None:
+    """
+    Raises POLICY_NOT_FOUND (404) for an unknown explicit policy id, so entry points can refuse a
+    claim before storage uploads and extraction run. None means the claim's own or the default policy.
+    """
+    if policy_id:
+        registry.get(policy_id)
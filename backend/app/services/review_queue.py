@@ -0,0 +1,120 @@
+import base64
+import hashlib
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from ..models.sql_models import ClaimDetail, ClaimRecord
+from ..utils.exception_handlers import ServiceError
+
+REVIEW_STATUS = "MANUAL_REVIEW"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# List views only need these (all on the slim claims row); extracted_data / decision_reasons are
+# fetched per claim from claim_details
+SUMMARY_COLUMNS = (
+    ClaimRecord.id, ClaimRecord.status, ClaimRecord.member_id, ClaimRecord.policy_id,
+    ClaimRecord.total_amount, ClaimRecord.approved_amount, ClaimRecord.confidence_score,
+    ClaimRecord.file_name, ClaimRecord.primary_reason, ClaimRecord.version,
+    ClaimRecord.created_at, ClaimRecord.updated_at,
+)
+DETAIL_COLUMNS = SUMMARY_COLUMNS + (
+    ClaimRecord.image_hash, ClaimRecord.policy_version, ClaimDetail.extracted_data, ClaimDetail.decision_reasons,
+)
+
+
+def _bad_cursor(message: str) -> ServiceError:
+    return ServiceError(message, code="INVALID_CURSOR")
+
+
+# --- CURSORS ---
+
+# Page cursors are (created_at, id) of the last item; sync tokens (updated_at, id) of the last change
+
+def encode_cursor(at: datetime, claim_id: int) -> str:
+    raw = f"{at.isoformat()}|{claim_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        at, claim_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(at), int(claim_id)
+    except (ValueError, UnicodeDecodeError):
+        raise _bad_cursor("Malformed pagination cursor")
+
+def parse_since(since: str) -> Tuple[datetime, int]:
+    try:
+        return decode_cursor(since)
+    except ServiceError:
+        pass
+    try:
+        # Bare ISO timestamp (older tokens): everything changed strictly after it
+        return datetime.fromisoformat(since), sys.maxsize
+    except ValueError:
+        raise _bad_cursor("`since` must be the X-Sync-Token of a previous response")
+
+
+# --- QUERIES ---
+
+def _summaries(rows) -> List[Dict[str, Any]]:
+    return [dict(row._mapping) for row in rows]
+
+def list_pending(db: Session, after: Optional[str] = None,
+                 limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of the review queue, newest first, keyed on (created_at, id) so every page is an
+    index range scan regardless of depth. Returns (items, cursor of the next page or None).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = db.query(*SUMMARY_COLUMNS).filter(ClaimRecord.status == REVIEW_STATUS)
+    if after:
+        created_at, claim_id = decode_cursor(after)
+        query = query.filter(or_(
+            ClaimRecord.created_at < created_at,
+            and_(ClaimRecord.created_at == created_at, ClaimRecord.id < claim_id),
+        ))
+    rows = query.order_by(ClaimRecord.created_at.desc(), ClaimRecord.id.desc()).limit(limit + 1).all()
+    items = _summaries(rows[:limit])
+    next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return items, next_cursor
+
+def claim_detail(db: Session, claim_id: int) -> Optional[Dict[str, Any]]:
+    """The full claim, hot row and compressed detail in one query; None if it does not exist."""
+    row = db.query(*DETAIL_COLUMNS).outerjoin(
+        ClaimDetail, ClaimDetail.claim_id == ClaimRecord.id
+    ).filter(ClaimRecord.id == claim_id).first()
+    return dict(row._mapping) if row else None
+
+def changed_since(db: Session, since: Tuple[datetime, int], limit: int = MAX_PAGE_SIZE) -> List[Dict[str, Any]]:
+    """
+    Claims changed after the (updated_at, id) position `since`, oldest change first, in any status:
+    items whose status is no longer MANUAL_REVIEW have left the queue. Keyed on the pair because a
+    bulk override stamps every claim it touches with the same updated_at.
+    """
+    updated_at, claim_id = since
+    rows = db.query(*SUMMARY_COLUMNS).filter(or_(
+        ClaimRecord.updated_at > updated_at,
+        and_(ClaimRecord.updated_at == updated_at, ClaimRecord.id > claim_id),
+    )).order_by(ClaimRecord.updated_at, ClaimRecord.id).limit(max(1, min(limit, MAX_PAGE_SIZE))).all()
+    return _summaries(rows)
+
+def sync_token(db: Session) -> Optional[str]:
+    """Position of the latest change to any claim: pass back as `since` to receive only later changes."""
+    row = db.query(ClaimRecord.updated_at, ClaimRecord.id).order_by(
+        ClaimRecord.updated_at.desc(), ClaimRecord.id.desc()
+    ).first()
+    return encode_cursor(row.updated_at, row.id) if row and row.updated_at else None
+
+def queue_etag(db: Session, *parts: Any) -> str:
+    """
+    Validator for the queue. Every insert raises max(id) and every update (entering or leaving
+    review included) raises max(updated_at), so the two index-only maxima cover all changes.
+    """
+    latest_change, latest_id = db.query(func.max(ClaimRecord.updated_at), func.max(ClaimRecord.id)).one()
+    state = "|".join(str(p) for p in (latest_change, latest_id) + parts)
+    return f'W/"{hashlib.sha1(state.encode()).hexdigest()[:20]}"'
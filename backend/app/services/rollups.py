@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Dict, Iterable, Sequence, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+# Bucket key (one value per key column) -> values (one per value column)
+Rollup = Dict[Tuple, Tuple]
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE; others fall back to UPDATE, then INSERT
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+# --- SHARED ROLLUP TABLE HELPERS ---
+# Used by the member ledger and the claim stats: tables of running totals with a unique key,
+# maintained incrementally as claims are written and rebuilt from claim history on demand.
+
+def _round(value):
+    # Money is kept to the paisa; counts stay integers
+    return round(value, 2) if isinstance(value, float) else value
+
+def merge_rollups(postings: Iterable[Rollup]) -> Rollup:
+    """Sums the postings of several claims per bucket. Consumes `postings` lazily."""
+    totals: Dict[Tuple, list] = {}
+    for claim in postings:
+        for key, values in claim.items():
+            current = totals.get(key)
+            if current is None:
+                totals[key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    current[i] += value
+    return {key: tuple(_round(v) for v in values) for key, values in totals.items()}
+
+def apply_rollup_deltas(db: Session, model, key_columns: Sequence[str], value_columns: Sequence[str],
+                        before: Rollup, after: Rollup) -> None:
+    """
+    Adds (after - before) to the rollup rows inside the caller's transaction; the caller commits.
+    Updates are issued as `total = total + delta` so concurrent writers do not lose increments,
+    and missing buckets are created by an upsert, so two writers creating the same bucket add up
+    instead of one failing on the unique constraint.
+    """
+    zeros = (0,) * len(value_columns)
+    deltas = []
+    for key in set(before) | set(after):
+        delta = tuple(_round(new - old) for new, old in zip(after.get(key, zeros), before.get(key, zeros)))
+        if any(delta):
+            deltas.append((key, delta))
+    if not deltas:
+        return
+
+    now = datetime.utcnow()
+    upsert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if upsert is not None:
+        stmt = upsert(model)
+        set_ = {column: getattr(model, column) + getattr(stmt.excluded, column) for column in value_columns}
+        set_["updated_at"] = stmt.excluded.updated_at
+        db.execute(stmt.on_conflict_do_update(index_elements=list(key_columns), set_=set_), [
+            {**dict(zip(key_columns, key)), **dict(zip(value_columns, delta)), "updated_at": now}
+            for key, delta in deltas
+        ])
+        return
+
+    for key, delta in deltas:
+        updated = db.query(model).filter(
+            *[getattr(model, column) == value for column, value in zip(key_columns, key)]
+        ).update({
+            **{getattr(model, column): getattr(model, column) + value for column, value in zip(value_columns, delta)},
+            model.updated_at: now,
+        }, synchronize_session=False)
+        if not updated:
+            db.add(model(**dict(zip(key_columns, key)), **dict(zip(value_columns, delta))))
+            db.flush()
+
+def replace_rollups(db: Session, model, key_columns: Sequence[str], value_columns: Sequence[str],
+                    totals: Rollup) -> None:
+    """Swaps every row of the rollup table for `totals` in one transaction (rebuilds)."""
+    try:
+        db.query(model).delete(synchronize_session=False)
+        db.bulk_insert_mappings(model, [
+            {**dict(zip(key_columns, key)), **dict(zip(value_columns, values))}
+            for key, values in totals.items()
+        ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
@@ -0,0 +1,83 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# A rule check returns (ok, flags, extras); a rule "fires" when ok is False
+RuleOutcome = Tuple[bool, List[str], Dict[str, Any]]
+
+
+class Rule:
+    """
+    One adjudication step.
+    `depends_on` lists rules that must be evaluated first; `terminal_decision`, when set,
+    fixes the claim's outcome as soon as this rule fires so later rules can be skipped.
+    """
+    __slots__ = ("name", "check", "depends_on", "terminal_decision")
+
+    def __init__(self, name: str, check: Callable[[Dict[str, Any], Any], RuleOutcome],
+                 depends_on: Sequence[str] = (), terminal_decision: Optional[str] = None):
+        self.name = name
+        self.check = check
+        self.depends_on = tuple(depends_on)
+        self.terminal_decision = terminal_decision
+
+    def __repr__(self):
+        return f"Rule({self.name})"
+
+
+class RuleEngine:
+    """Evaluates a rule graph in dependency order, stopping at the first terminal rule that fires."""
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = self._order(rules)
+
+    @staticmethod
+    def _order(rules: Sequence[Rule]) -> List[Rule]:
+        """Stable topological sort (declaration order among independent rules)."""
+        by_name = {r.name: r for r in rules}
+        for rule in rules:
+            missing = [d for d in rule.depends_on if d not in by_name]
+            if missing:
+                raise ValueError(f"Rule '{rule.name}' depends on unknown rule(s): {missing}")
+
+        ordered, done = [], set()
+        while len(ordered) < len(rules):
+            progressed = False
+            for rule in rules:
+                if rule.name not in done and all(d in done for d in rule.depends_on):
+                    ordered.append(rule)
+                    done.add(rule.name)
+                    progressed = True
+            if not progressed:
+                pending = [r.name for r in rules if r.name not in done]
+                raise ValueError(f"Cyclic rule dependencies between: {pending}")
+        return ordered
+
+    def run(self, claim: Dict[str, Any], policy: Any, short_circuit: bool = True,
+            with_trace: bool = True) -> Tuple[Dict[str, RuleOutcome], List[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        """
+        Returns (outcomes by rule name, trace, terminal) where terminal is (rule_name, decision)
+        for the first terminal rule that fired, or None.
+        With short_circuit, rules after a terminal hit are not evaluated: they have no outcome
+        and appear in the trace as skipped.
+        """
+        outcomes: Dict[str, RuleOutcome] = {}
+        trace: List[Dict[str, Any]] = []
+        terminal = None
+
+        for rule in self.rules:
+            if terminal is not None and short_circuit:
+                if with_trace:
+                    trace.append({"rule": rule.name, "fired": False, "skipped": True, "ms": 0.0})
+                continue
+
+            started = time.perf_counter() if with_trace else 0.0
+            outcome = rule.check(claim, policy)
+            outcomes[rule.name] = outcome
+            fired = not outcome[0]
+            if with_trace:
+                trace.append({"rule": rule.name, "fired": fired, "ms": round((time.perf_counter() - started) * 1000, 3)})
+
+            if fired and rule.terminal_decision and terminal is None:
+                terminal = (rule.name, rule.terminal_decision)
+
+        return outcomes, trace, terminal
@@ -0,0 +1,202 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import shutil
+from datetime import datetime, timedelta
+from typing import BinaryIO, List, Optional, Tuple
+
+import cloudinary
+import cloudinary.uploader
+from sqlalchemy.orm import Session
+
+from ..core.config import (
+    STORAGE_BACKEND, UPLOAD_DIR, STORAGE_UPLOAD_CONCURRENCY,
+    STORAGE_FLUSH_SECONDS, STORAGE_MAX_ATTEMPTS, STORAGE_RETRY_BASE_SECONDS,
+)
+from ..core.database import SessionLocal
+from ..models.sql_models import ClaimFile, ClaimRecord, StorageUpload
+from .ingestion import IngestedFile
+from ..utils.logging_utils import setup_logging
+
+logger = setup_logging()
+
+cloudinary.config(
+  cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME"),
+  api_key = os.getenv("CLOUDINARY_API_KEY"),
+  api_secret = os.getenv("CLOUDINARY_API_SECRET"),
+  secure = True
+)
+
+
+# --- DRIVERS ---
+
+class StorageBackend(ABC):
+    """Stores one claim document and returns the locator saved in ClaimRecord.file_name."""
+    name = "base"
+
+    @abstractmethod
+    def save(self, source: BinaryIO, digest: str, filename: Optional[str] = None) -> str:
+        ...
+
+
+class LocalStorage(StorageBackend):
+    """
+    Content-addressed files under UPLOAD_DIR (served at /uploads), keyed by the SHA-256 digest.
+    Identical documents share one file and re-saving is a no-op.
+    """
+    name = "local"
+
+    def __init__(self, root: str = UPLOAD_DIR):
+        self.root = root
+
+    def key_for(self, digest: str, filename: Optional[str] = None) -> str:
+        ext = os.path.splitext(filename or "")[1].lower()
+        return f"{digest[:2]}/{digest}{ext}"
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def save(self, source: BinaryIO, digest: str, filename: Optional[str] = None) -> str:
+        key = self.key_for(digest, filename)
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{id(source)}.tmp"
+            with open(tmp, "wb") as f:
+                shutil.copyfileobj(source, f)
+            os.replace(tmp, path)
+        return key
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path_for(key), "rb")
+
+
+class CloudinaryStorage(StorageBackend):
+    name = "cloudinary"
+
+    def save(self, source: BinaryIO, digest: str, filename: Optional[str] = None) -> str:
+        # The SDK streams file objects itself
+        # resource_type="auto" handles PDFs and Images automatically; the digest as public_id
+        # makes retried uploads of the same document idempotent
+        upload_result = cloudinary.uploader.upload(source, resource_type="auto", public_id=digest)
+        return upload_result.get("secure_url")
+
+
+class WriteBehindStorage(StorageBackend):
+    """
+    Saves locally so the request never waits on remote storage. Remote uploads are queued with
+    `queue_remote_uploads` in the claim's own transaction and pushed by the background worker,
+    which then swaps the local key for the remote URL.
+    """
+    name = "write_behind"
+
+    def __init__(self, local: LocalStorage, remote: StorageBackend):
+        self.local = local
+        self.remote = remote
+
+    def save(self, source: BinaryIO, digest: str, filename: Optional[str] = None) -> str:
+        return self.local.save(source, digest, filename)
+
+
+_DRIVERS = {
+    "local": lambda: LocalStorage(),
+    "cloudinary": lambda: CloudinaryStorage(),
+    "write_behind": lambda: WriteBehindStorage(LocalStorage(), CloudinaryStorage()),
+}
+
+def create_storage(backend: str = STORAGE_BACKEND) -> StorageBackend:
+    if backend not in _DRIVERS:
+        raise ValueError(f"Unknown storage backend '{backend}' (expected one of {sorted(_DRIVERS)})")
+    return _DRIVERS[backend]()
+
+storage = create_storage()
+
+# Storage calls are blocking (disk or SDK); they run in worker threads, bounded per process
+_STORAGE_SLOTS = asyncio.Semaphore(STORAGE_UPLOAD_CONCURRENCY)
+
+def _save_ingested(document: IngestedFile) -> str:
+    with document.open() as source:
+        return storage.save(source, document.digest, document.filename)
+
+async def save_document(document: IngestedFile) -> str:
+    async with _STORAGE_SLOTS:
+        return await asyncio.to_thread(_save_ingested, document)
+
+
+# --- WRITE-BEHIND WORKER ---
+
+def queue_remote_uploads(db: Session, documents: List[Tuple[str, str, Optional[str]]]) -> None:
+    """
+    Queues (locator, digest, filename) documents for the remote push; a no-op unless write-behind
+    is configured. Call before committing the claim so the worker never sees a key whose claim
+    row does not exist yet.
+    """
+    if not isinstance(storage, WriteBehindStorage):
+        return
+    for key, digest, filename in documents:
+        db.add(StorageUpload(digest=digest, local_key=key, file_name=filename))
+
+
+def process_pending_uploads(db: Session, limit: int = 20) -> int:
+    """Pushes due queue entries to remote storage. Returns how many were uploaded."""
+    if not isinstance(storage, WriteBehindStorage):
+        return 0
+    now = datetime.utcnow()
+    due: List[StorageUpload] = db.query(StorageUpload).filter(
+        StorageUpload.status == "PENDING",
+        StorageUpload.next_attempt_at <= now,
+    ).order_by(StorageUpload.id).limit(limit).all()
+
+    uploaded = 0
+    for entry in due:
+        try:
+            with storage.local.open(entry.local_key) as source:
+                remote_url = storage.remote.save(source, entry.digest, entry.file_name)
+        except Exception as e:
+            entry.attempts += 1
+            entry.last_error = str(e)[:500]
+            if entry.attempts >= STORAGE_MAX_ATTEMPTS:
+                entry.status = "FAILED"
+                logger.error(f"Giving up on remote upload of {entry.local_key} after {entry.attempts} attempts: {e}")
+            else:
+                entry.next_attempt_at = now + timedelta(seconds=STORAGE_RETRY_BASE_SECONDS * 2 ** (entry.attempts - 1))
+                logger.warning(f"Remote upload of {entry.local_key} failed (attempt {entry.attempts}): {e}")
+            db.commit()
+            continue
+
+        entry.status = "DONE"
+        entry.remote_url = remote_url
+        # Point claims at the remote copy; file_name is a comma separated list of locators.
+        # Claims holding the document are found through the indexed claim_files digest
+        claim_ids = db.query(ClaimFile.claim_id).filter(ClaimFile.digest == entry.digest)
+        claims = db.query(ClaimRecord).filter(ClaimRecord.id.in_(claim_ids.scalar_subquery())).all()
+        for claim in claims:
+            claim.file_name = ", ".join(
+                remote_url if part.strip() == entry.local_key else part.strip()
+                for part in claim.file_name.split(",")
+            )
+        db.commit()
+        uploaded += 1
+        logger.info(f"Write-behind upload done: {entry.local_key} -> {remote_url}")
+    return uploaded
+
+
+def _flush_once() -> int:
+    db = SessionLocal()
+    try:
+        return process_pending_uploads(db)
+    finally:
+        db.close()
+
+
+async def run_write_behind_worker(interval: float = STORAGE_FLUSH_SECONDS) -> None:
+    """Background loop started with the app when the write-behind backend is configured."""
+    logger.info(f"Write-behind storage worker started (every {interval}s)")
+    while True:
+        try:
+            # Drain everything that is due before sleeping again
+            while await asyncio.to_thread(_flush_once):
+                pass
+        except Exception:
+            logger.exception("Write-behind storage worker iteration failed")
+        await asyncio.sleep(interval)
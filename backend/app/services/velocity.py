@@ -0,0 +1,98 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..core.config import VELOCITY_WINDOWS, VELOCITY_CACHE_MEMBERS, VELOCITY_REFRESH_SECONDS
+from ..models.sql_models import ClaimRecord
+from ..utils.logging_utils import setup_logging
+
+logger = setup_logging()
+
+SAME_DAY = "same_day"
+GUEST_MEMBER = "Unknown_Guest"
+
+
+def window_start(window: str, now: datetime) -> datetime:
+    """Start of a velocity window: midnight UTC for "same_day", otherwise a rolling number of days."""
+    if window == SAME_DAY:
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return now - timedelta(days=VELOCITY_WINDOWS[window])
+
+
+def load_claim_times(db: Session, member_id: str, since: datetime, until: datetime) -> List[datetime]:
+    """created_at of the member's claims in [since, until): a range scan on ix_claims_member_created."""
+    rows = db.query(ClaimRecord.created_at).filter(
+        ClaimRecord.member_id == member_id,
+        ClaimRecord.created_at >= since,
+        ClaimRecord.created_at < until,
+    ).order_by(ClaimRecord.created_at).all()
+    return [created_at for (created_at,) in rows]
+
+
+class VelocityTracker:
+    """
+    Per-member sliding windows of claim timestamps, kept in process (LRU over members).
+    A member's timestamps are loaded with one index range query covering the longest window, then
+    kept current by `record`. Entries older than VELOCITY_REFRESH_SECONDS are reloaded so claims
+    stored by other worker processes are counted too.
+    """
+
+    def __init__(self, max_members: int = VELOCITY_CACHE_MEMBERS, refresh_seconds: float = VELOCITY_REFRESH_SECONDS):
+        self.max_members = max_members
+        self.refresh_seconds = refresh_seconds
+        self.horizon = timedelta(days=max(VELOCITY_WINDOWS.values(), default=1))
+        # member_id -> [loaded_at (monotonic), sorted created_at list]
+        self._members: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _times(self, db: Session, member_id: str, now: datetime) -> List[datetime]:
+        with self._lock:
+            entry = self._members.get(member_id)
+            if entry is not None and time.monotonic() - entry[0] < self.refresh_seconds:
+                self._members.move_to_end(member_id)
+                return entry[1]
+        times = load_claim_times(db, member_id, now - self.horizon, now + timedelta(seconds=1))
+        with self._lock:
+            self._members[member_id] = [time.monotonic(), times]
+            self._members.move_to_end(member_id)
+            while len(self._members) > self.max_members:
+                self._members.popitem(last=False)
+        return times
+
+    def counts(self, db: Session, member_id: str, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Prior claims of the member in every configured window."""
+        now = now or datetime.utcnow()
+        times = self._times(db, member_id, now)
+        with self._lock:
+            # Trim what slid out of the longest window, then count each window by bisection
+            del times[:bisect_left(times, now - self.horizon)]
+            return {window: len(times) - bisect_left(times, window_start(window, now)) for window in VELOCITY_WINDOWS}
+
+    def record(self, member_id: Optional[str], created_at: Optional[datetime]) -> None:
+        """Counts a newly committed claim; members not cached are loaded on their next lookup."""
+        if not member_id or member_id == GUEST_MEMBER or created_at is None:
+            return
+        with self._lock:
+            entry = self._members.get(member_id)
+            if entry is not None:
+                insort(entry[1], created_at)
+
+velocity_tracker = VelocityTracker()
+
+
+def attach_velocity(db: Session, claim_data: Dict[str, Any], member_id: str) -> Dict[str, int]:
+    """Stamps `velocity` and `prev_claims_same_day` on an extracted claim for the fraud checks."""
+    counts = {window: 0 for window in VELOCITY_WINDOWS}
+    if member_id and member_id != GUEST_MEMBER:
+        counts = velocity_tracker.counts(db, member_id)
+    claim_data["velocity"] = counts
+    claim_data["prev_claims_same_day"] = counts.get(SAME_DAY, 0)
+    # Mapping args go through PHIRedactionFilter, which masks member_id
+    logger.info("VELOCITY CHECK: Member '%(member_id)s' prior claims %(counts)s.",
+                {"member_id": member_id, "counts": counts})
+    return counts
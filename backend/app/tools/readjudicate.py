@@ -0,0 +1,219 @@
+"""
+Re-adjudicates stored claims against the current policy rules and reports decisions that would flip.
+
+Usage (from the backend directory):
+    python -m app.tools.readjudicate --output reports/readjudication.jsonl --workers 8
+
+Rows are streamed from the claims table in id order, fanned out to a process pool in chunks,
+and diffs are appended to a JSONL report. The last fully written claim id, the running stats and
+the report size are checkpointed so an interrupted run resumes where it stopped, dropping any
+report lines written after the checkpoint (pass --restart to start over).
+"""
+import argparse
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..core.database import SessionLocal
+from ..models.sql_models import ClaimDetail, ClaimRecord
+from ..services.adjudicator import adjudicate_claim, resolve_policy
+from ..services.batch_adjudicator import adjudicate_claims_batch
+from ..utils.exception_handlers import ServiceError
+from ..utils.logging_utils import setup_logging
+
+DEFAULT_CHUNK_SIZE = 500
+STAT_KEYS = ("processed", "changed", "skipped", "errors")
+SKIP_REASONS = {"DUPLICATE_IMAGE_DETECTED", "NEAR_DUPLICATE_IMAGE_DETECTED"}
+
+# (claim_id, status, approved_amount, extracted_data, decision_reasons)
+ClaimRow = Tuple[int, str, float, Dict[str, Any], List[str]]
+
+
+# --- STREAMING ---
+
+def iter_claim_chunks(db: Session, after_id: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[ClaimRow]]:
+    """Keyset-paginates the claims table by id so memory stays bounded to one chunk."""
+    last_id = after_id
+    while True:
+        rows = db.query(
+            ClaimRecord.id, ClaimRecord.status, ClaimRecord.approved_amount,
+            ClaimDetail.extracted_data, ClaimDetail.decision_reasons,
+        ).outerjoin(ClaimDetail, ClaimDetail.claim_id == ClaimRecord.id).filter(
+            ClaimRecord.id > last_id
+        ).order_by(ClaimRecord.id).limit(chunk_size).all()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [tuple(r) for r in rows]
+
+
+# --- WORKER ---
+
+_WORKER_POLICY_ID: Optional[str] = None
+
+def _init_worker(policy_id: Optional[str]) -> None:
+    global _WORKER_POLICY_ID
+    _WORKER_POLICY_ID = policy_id
+    # Per-claim INFO lines dominate the cost of a bulk re-run
+    setup_logging().setLevel(logging.WARNING)
+
+
+def adjudicate_group(claims: List[Dict[str, Any]], policy: Any) -> List[Dict[str, Any]]:
+    """
+    Batch-adjudicates claims against one policy (id, raw dict or CompiledPolicy); errors become {"error": ...}.
+    Backfills and simulations only compare decisions, amounts and reasons, so rules are short-circuited.
+    """
+    policy = resolve_policy(policy)
+    try:
+        return adjudicate_claims_batch(claims, policy, short_circuit=True)
+    except ServiceError:
+        # Isolate the offending claim(s) instead of failing the whole chunk
+        results = []
+        for claim in claims:
+            try: results.append(adjudicate_claim(claim, policy, short_circuit=True))
+            except ServiceError as e: results.append({"error": e.message})
+        return results
+
+
+def readjudicate_chunk(rows: List[ClaimRow], policy_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Re-runs a chunk and returns one diff record per claim (claims sharing a policy are batched)."""
+    policy_id = policy_id or _WORKER_POLICY_ID
+    groups: Dict[Optional[str], List[ClaimRow]] = {}
+    diffs = []
+    for row in rows:
+        claim_id, status, amount, data, reasons = row
+        if not data or SKIP_REASONS.intersection(reasons or []):
+            diffs.append({"claim_id": claim_id, "skipped": True})
+            continue
+        groups.setdefault(policy_id or data.get("policy_id"), []).append(row)
+
+    for group_policy, group_rows in groups.items():
+        try:
+            results = adjudicate_group([r[3] for r in group_rows], group_policy)
+        except ServiceError as e:
+            results = [{"error": e.message}] * len(group_rows)
+        for (claim_id, status, amount, _, _), result in zip(group_rows, results):
+            if "error" in result:
+                diffs.append({"claim_id": claim_id, "error": result["error"]})
+                continue
+            old_amount = round(float(amount or 0.0), 2)
+            new_amount = result.get("approved_amount", 0.0)
+            diffs.append({
+                "claim_id": claim_id,
+                "old_status": status,
+                "new_status": result["decision"],
+                "old_approved_amount": old_amount,
+                "new_approved_amount": new_amount,
+                "amount_delta": round(new_amount - old_amount, 2),
+                "changed": status != result["decision"] or abs(new_amount - old_amount) > 0.005,
+                "new_reasons": result.get("reasons", []),
+                "policy_id": result.get("policy_id"),
+                "policy_version": result.get("policy_version"),
+            })
+    diffs.sort(key=lambda d: d["claim_id"])
+    return diffs
+
+
+# --- CHECKPOINTING ---
+
+def read_checkpoint(path: str) -> Dict[str, Any]:
+    """Returns last_claim_id, stats and report_offset (None when unknown); zeros without a checkpoint."""
+    state = {"last_claim_id": 0, "stats": dict.fromkeys(STAT_KEYS, 0), "report_offset": None}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        state["last_claim_id"] = int(saved.get("last_claim_id", 0))
+        state["stats"].update({k: int(v) for k, v in (saved.get("stats") or {}).items() if k in STAT_KEYS})
+        if saved.get("report_offset") is not None:
+            state["report_offset"] = int(saved["report_offset"])
+    except (OSError, ValueError, TypeError, AttributeError):
+        pass
+    return state
+
+
+def write_checkpoint(path: str, last_claim_id: int, stats: Dict[str, int], report_offset: int) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"last_claim_id": last_claim_id, "stats": stats, "report_offset": report_offset}, f)
+    os.replace(tmp, path)
+
+
+def truncate_report(path: str, offset: Optional[int]) -> None:
+    """Drops report lines written after the checkpoint, so a resumed run does not repeat them."""
+    if offset is None or not os.path.exists(path):
+        return
+    with open(path, "r+b") as f:
+        f.truncate(offset)
+
+
+# --- DRIVER ---
+
+def run_backfill(output: str, checkpoint: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 workers: Optional[int] = None, policy_id: Optional[str] = None,
+                 include_unchanged: bool = False, restart: bool = False) -> Dict[str, int]:
+    checkpoint = checkpoint or f"{output}.checkpoint"
+    workers = workers or os.cpu_count() or 1
+    if restart:
+        for path in (output, checkpoint):
+            if os.path.exists(path): os.remove(path)
+    state = read_checkpoint(checkpoint)
+    after_id, stats = state["last_claim_id"], state["stats"]
+    if after_id:
+        print(f"Resuming after claim id {after_id}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    truncate_report(output, state["report_offset"])
+    db = SessionLocal()
+    try:
+        with open(output, "a", encoding="utf-8") as report, \
+                ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(policy_id,)) as pool:
+            in_flight = deque()
+
+            def drain_one():
+                last_id, future = in_flight.popleft()
+                for diff in future.result():
+                    if diff.get("skipped"): stats["skipped"] += 1; continue
+                    if "error" in diff: stats["errors"] += 1
+                    else:
+                        stats["processed"] += 1
+                        if diff["changed"]: stats["changed"] += 1
+                    if include_unchanged or diff.get("changed", True):
+                        report.write(json.dumps(diff) + "\n")
+                report.flush()
+                # Chunks are drained in submission order, so everything up to last_id is on disk
+                write_checkpoint(checkpoint, last_id, stats, report.tell())
+
+            for chunk in iter_claim_chunks(db, after_id, chunk_size):
+                in_flight.append((chunk[-1][0], pool.submit(readjudicate_chunk, chunk)))
+                if len(in_flight) >= workers * 2:
+                    drain_one()
+            while in_flight:
+                drain_one()
+    finally:
+        db.close()
+
+    print(f"Re-adjudication done: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-adjudicate stored claims and report decision flips.")
+    parser.add_argument("--output", default="reports/readjudication.jsonl", help="JSONL diff report (appended)")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--policy-id", default=None, help="Force a policy instead of each claim's own")
+    parser.add_argument("--all", action="store_true", help="Also write claims whose decision did not change")
+    parser.add_argument("--restart", action="store_true", help="Ignore and overwrite any previous checkpoint/report")
+    args = parser.parse_args()
+    run_backfill(args.output, args.checkpoint, args.chunk_size, args.workers,
+                 args.policy_id, args.all, args.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Rebuilds the daily claim analytics rollups (claim_stats) from claim history.
+
+Usage (from the backend directory):
+    python -m app.tools.rebuild_claim_stats
+
+Run once after upgrading a database that already holds claims, and after restoring a backup or
+editing claims outside the API. The new rollups replace the old ones in a single transaction.
+"""
+import argparse
+
+from ..core.database import Base, SessionLocal, engine
+from ..services.claim_stats import REBUILD_CHUNK_SIZE, rebuild_claim_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the claim analytics rollups from stored claims.")
+    parser.add_argument("--chunk-size", type=int, default=REBUILD_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        stats = rebuild_claim_stats(db, args.chunk_size)
+    finally:
+        db.close()
+    print(f"Claim stats rebuild done: {stats}")
+
+
+if __name__ == "__main__":
+    main()
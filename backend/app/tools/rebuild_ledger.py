@@ -0,0 +1,31 @@
+"""
+Rebuilds the member / family-floater ledger from claim history.
+
+Usage (from the backend directory):
+    python -m app.tools.rebuild_ledger
+
+Use after restoring a backup, editing claims outside the API, or changing how claims are
+bucketed. The new ledger replaces the old one in a single transaction.
+"""
+import argparse
+
+from ..core.database import Base, SessionLocal, engine
+from ..services.member_ledger import REBUILD_CHUNK_SIZE, rebuild_ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the member ledger from stored claims.")
+    parser.add_argument("--chunk-size", type=int, default=REBUILD_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        stats = rebuild_ledger(db, args.chunk_size)
+    finally:
+        db.close()
+    print(f"Ledger rebuild done: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+What-if simulation of a candidate policy against the current (baseline) policy.
+
+Usage (from the backend directory):
+    python -m app.tools.simulate_policy --candidate candidate_policy.json --test-cases
+    python -m app.tools.simulate_policy --candidate candidate_policy.json --claims export.jsonl --workers 8
+    python -m app.tools.simulate_policy --candidate candidate_policy.json --from-db --output reports/whatif.json
+
+Every claim in the corpus is adjudicated under both policies. The report has total approved
+amounts and their delta, decision flips, per-reason histograms, and the claims whose payout
+moved most.
+
+The corpus is streamed in chunks to a process pool. Each worker compiles both policies once
+and runs them through the batch adjudicator, and only per-chunk aggregates come back to the
+driver. Corpus sources:
+  --test-cases [PATH]  data/test_cases.json format (default path: PLUM_TEST_CASES_FILE)
+  --claims PATH        JSONL export, one claim per line, either the extracted claim itself or a
+                       record with an "extracted_data" field (and optionally "id")
+  --from-db            claims stored in the database
+"""
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..core.config import TEST_CASES_FILE, load_json
+from ..core.database import SessionLocal
+from ..services.policy_engine import CompiledPolicy, compile_policy, policy_fingerprint
+from ..services.policy_registry import registry
+from ..utils.logging_utils import setup_logging
+from ..utils.test_case_adapter import iter_test_case_claims
+from .readjudicate import SKIP_REASONS, adjudicate_group, iter_claim_chunks
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_TOP_DELTAS = 20
+
+# (reference, claim) pairs; the reference identifies the claim in the report
+CorpusItem = Tuple[str, Dict[str, Any]]
+
+
+# --- CORPUS ---
+
+def iter_jsonl_claims(path: str) -> Iterator[CorpusItem]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "extracted_data" in record:
+                if SKIP_REASONS.intersection(record.get("decision_reasons") or []):
+                    continue
+                ref = record.get("id", record.get("claim_id", line_no))
+                record = record["extracted_data"]
+            else:
+                ref = record.get("claim_id", line_no)
+            if record:
+                yield f"{os.path.basename(path)}:{ref}", record
+
+
+def iter_db_claims(chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[CorpusItem]:
+    db = SessionLocal()
+    try:
+        for chunk in iter_claim_chunks(db, 0, chunk_size):
+            for claim_id, _, _, data, reasons in chunk:
+                if data and not SKIP_REASONS.intersection(reasons or []):
+                    yield f"claim:{claim_id}", data
+    finally:
+        db.close()
+
+
+def chunked(items: Iterable[CorpusItem], size: int) -> Iterator[List[CorpusItem]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- WORKER ---
+
+_WORKER_POLICIES: Optional[Tuple[CompiledPolicy, CompiledPolicy]] = None
+
+def compile_pair(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Tuple[CompiledPolicy, CompiledPolicy]:
+    # The candidate is usually an edited copy of the baseline that may still carry the same
+    # policy_id/version, so key its build by content to keep the two apart in the compile cache
+    return compile_policy(baseline), compile_policy(candidate, version=f"candidate-{policy_fingerprint(candidate)}")
+
+
+def _init_worker(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> None:
+    global _WORKER_POLICIES
+    setup_logging().setLevel(logging.WARNING)
+    _WORKER_POLICIES = compile_pair(baseline, candidate)
+
+
+def _empty_summary() -> Dict[str, Any]:
+    return {
+        "claims": 0, "errors": 0,
+        "baseline_approved": 0.0, "candidate_approved": 0.0,
+        "changed_amounts": 0, "decision_flips": 0,
+        "flips": Counter(),
+        "decisions": {"baseline": Counter(), "candidate": Counter()},
+        "reasons": {"baseline": Counter(), "candidate": Counter()},
+        "largest_deltas": [],
+    }
+
+
+def simulate_chunk(items: List[CorpusItem], top: int = DEFAULT_TOP_DELTAS,
+                   policies: Optional[Tuple[CompiledPolicy, CompiledPolicy]] = None) -> Dict[str, Any]:
+    """Adjudicates a chunk under both policies and returns its aggregate summary."""
+    baseline, candidate = policies or _WORKER_POLICIES
+    claims = [claim for _, claim in items]
+    baseline_results = adjudicate_group(claims, baseline)
+    candidate_results = adjudicate_group(claims, candidate)
+
+    summary = _empty_summary()
+    deltas = []
+    for (ref, _), old, new in zip(items, baseline_results, candidate_results):
+        if "error" in old or "error" in new:
+            summary["errors"] += 1
+            continue
+        summary["claims"] += 1
+        old_amount, new_amount = old["approved_amount"], new["approved_amount"]
+        summary["baseline_approved"] += old_amount
+        summary["candidate_approved"] += new_amount
+        summary["decisions"]["baseline"][old["decision"]] += 1
+        summary["decisions"]["candidate"][new["decision"]] += 1
+        summary["reasons"]["baseline"].update(old["reasons"])
+        summary["reasons"]["candidate"].update(new["reasons"])
+
+        if old["decision"] != new["decision"]:
+            summary["decision_flips"] += 1
+            summary["flips"][f"{old['decision']}->{new['decision']}"] += 1
+        delta = round(new_amount - old_amount, 2)
+        if delta:
+            summary["changed_amounts"] += 1
+            deltas.append((abs(delta), ref, old["decision"], new["decision"], old_amount, new_amount, delta))
+
+    summary["largest_deltas"] = [
+        {"claim": ref, "baseline_decision": od, "candidate_decision": nd,
+         "baseline_amount": oa, "candidate_amount": na, "delta": d}
+        for _, ref, od, nd, oa, na, d in heapq.nlargest(top, deltas, key=lambda x: x[0])
+    ]
+    return summary
+
+
+def merge_summaries(total: Dict[str, Any], part: Dict[str, Any], top: int = DEFAULT_TOP_DELTAS) -> None:
+    for key in ("claims", "errors", "baseline_approved", "candidate_approved", "changed_amounts", "decision_flips"):
+        total[key] += part[key]
+    total["flips"].update(part["flips"])
+    for side in ("baseline", "candidate"):
+        total["decisions"][side].update(part["decisions"][side])
+        total["reasons"][side].update(part["reasons"][side])
+    total["largest_deltas"] = heapq.nlargest(
+        top, total["largest_deltas"] + part["largest_deltas"], key=lambda d: abs(d["delta"]))
+
+
+# --- REPORT ---
+
+def finalize_report(summary: Dict[str, Any], baseline: CompiledPolicy, candidate: CompiledPolicy) -> Dict[str, Any]:
+    reasons = {}
+    for reason in sorted(set(summary["reasons"]["baseline"]) | set(summary["reasons"]["candidate"])):
+        old, new = summary["reasons"]["baseline"][reason], summary["reasons"]["candidate"][reason]
+        reasons[reason] = {"baseline": old, "candidate": new, "delta": new - old}
+    return {
+        "baseline_policy": f"{baseline.policy_id}@{baseline.version}",
+        "candidate_policy": f"{candidate.policy_id}@{candidate.version}",
+        "claims": summary["claims"],
+        "errors": summary["errors"],
+        "baseline_approved": round(summary["baseline_approved"], 2),
+        "candidate_approved": round(summary["candidate_approved"], 2),
+        "approved_delta": round(summary["candidate_approved"] - summary["baseline_approved"], 2),
+        "changed_amounts": summary["changed_amounts"],
+        "decision_flips": summary["decision_flips"],
+        "flips": dict(summary["flips"].most_common()),
+        "decisions": {side: dict(c) for side, c in summary["decisions"].items()},
+        "reasons": reasons,
+        "largest_deltas": summary["largest_deltas"],
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n Baseline {report['baseline_policy']} vs candidate {report['candidate_policy']}")
+    print(f" Claims: {report['claims']} (errors: {report['errors']})")
+    print(f" Approved: {report['baseline_approved']:,.2f} -> {report['candidate_approved']:,.2f} "
+          f"(delta {report['approved_delta']:+,.2f}, {report['changed_amounts']} claims changed)")
+    print(f" Decision flips: {report['decision_flips']}")
+    for flip, count in report["flips"].items():
+        print(f"   {flip:<30} {count}")
+    print("-" * 80)
+    print(f"{'REASON':<34} | {'BASELINE':>10} | {'CANDIDATE':>10} | {'DELTA':>8}")
+    print("-" * 80)
+    for reason, row in report["reasons"].items():
+        print(f"{reason:<34} | {row['baseline']:>10} | {row['candidate']:>10} | {row['delta']:>+8}")
+    print("-" * 80)
+
+
+# --- DRIVER ---
+
+def load_policy_document(ref: Optional[str]) -> Dict[str, Any]:
+    """A policy JSON file path, or a registered policy_id (None for the default policy)."""
+    if ref and os.path.isfile(ref):
+        policy = load_json(ref)
+        if not policy.get("policy_id"):
+            raise SystemExit(f"{ref} is not a policy document (missing policy_id)")
+        return policy
+    return registry.raw(ref)
+
+
+def run_simulation(candidate: Dict[str, Any], corpus: Iterable[CorpusItem], baseline: Optional[Dict[str, Any]] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE, workers: Optional[int] = None,
+                   top: int = DEFAULT_TOP_DELTAS) -> Dict[str, Any]:
+    baseline = baseline or registry.raw()
+    workers = workers or os.cpu_count() or 1
+    summary = _empty_summary()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(baseline, candidate)) as pool:
+        in_flight = deque()
+        for chunk in chunked(corpus, chunk_size):
+            in_flight.append(pool.submit(simulate_chunk, chunk, top))
+            if len(in_flight) >= workers * 2:
+                merge_summaries(summary, in_flight.popleft().result(), top)
+        while in_flight:
+            merge_summaries(summary, in_flight.popleft().result(), top)
+
+    return finalize_report(summary, *compile_pair(baseline, candidate))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a candidate policy against the baseline over a claim corpus.")
+    parser.add_argument("--candidate", required=True, help="Candidate policy JSON file")
+    parser.add_argument("--baseline", default=None, help="Baseline policy file or policy_id (default: the default policy)")
+    parser.add_argument("--test-cases", nargs="?", const=TEST_CASES_FILE, default=None, help="Include test cases")
+    parser.add_argument("--claims", action="append", default=[], help="JSONL claim export (repeatable)")
+    parser.add_argument("--from-db", action="store_true", help="Include claims stored in the database")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_DELTAS, help="Largest payout changes to list")
+    parser.add_argument("--output", default=None, help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    sources = []
+    if args.test_cases:
+        sources.append(iter_test_case_claims(args.test_cases))
+    sources.extend(iter_jsonl_claims(path) for path in args.claims)
+    if args.from_db:
+        sources.append(iter_db_claims(args.chunk_size))
+    if not sources:
+        parser.error("no corpus given: use --test-cases, --claims and/or --from-db")
+
+    report = run_simulation(
+        load_policy_document(args.candidate), itertools.chain(*sources), load_policy_document(args.baseline),
+        args.chunk_size, args.workers, args.top,
+    )
+    print_report(report)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Moves the large JSON columns of existing claims (extracted_data, decision_reasons) into the
+compressed claim_details table and drops them from claims.
+
+Usage (from the backend directory):
+    python -m app.tools.split_claim_details --vacuum
+
+This is the one-shot migration step: the Docker image runs it before starting uvicorn, and the app
+only warns at startup while the legacy columns exist. It works in id-ordered chunks, can be
+interrupted and re-run, and is a no-op on a migrated database.
+--vacuum rewrites the SQLite file afterwards so the freed pages go back to the filesystem.
+"""
+import argparse
+
+from sqlalchemy import text
+
+from ..core.database import Base, engine, ensure_columns
+from ..services.claim_details import MIGRATION_CHUNK_SIZE, split_claim_details
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split claim JSON blobs into the claim_details table.")
+    parser.add_argument("--chunk-size", type=int, default=MIGRATION_CHUNK_SIZE)
+    parser.add_argument("--keep-columns", action="store_true", help="Empty the legacy columns but do not drop them")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the SQLite database afterwards")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    ensure_columns()
+    stats = split_claim_details(args.chunk_size, drop_columns=not args.keep_columns)
+    print(f"Claim detail split done: {stats}")
+    if args.vacuum and engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+        print("VACUUM done")
+
+
+if __name__ == "__main__":
+    main()
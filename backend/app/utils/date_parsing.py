@@ -0,0 +1,75 @@
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+
+# Bounded memo: real traffic repeats a small set of treatment / join / effective dates
+DATE_CACHE_SIZE = 4096
+
+MONTH_ABBREVIATIONS = {
+    m: i for i, m in enumerate(
+        ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1
+    )
+}
+
+# Shape -> (format label, regex, group order as (year, month, day) indexes)
+_SHAPES = (
+    ("%Y-%m-%d", re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})$"), (0, 1, 2)),
+    ("%d-%m-%Y", re.compile(r"^(\d{1,2})-(\d{1,2})-(\d{4})$"), (2, 1, 0)),
+    ("%d/%m/%Y", re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{4})$"), (2, 1, 0)),
+    ("%Y/%m/%d", re.compile(r"^(\d{4})/(\d{1,2})/(\d{1,2})$"), (0, 1, 2)),
+    ("%d-%b-%Y", re.compile(r"^(\d{1,2})-([A-Za-z]{3})-(\d{4})$"), (2, 1, 0)),
+)
+
+# Legacy order, only used for strings whose shape is not recognised above
+_FALLBACK_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d", "%d-%b-%Y")
+
+
+def _sniff(d: str) -> Tuple[Optional[datetime], Optional[str]]:
+    """Picks the format from the string's shape and builds the date without trial-and-error parsing."""
+    for fmt, pattern, (yi, mi, di) in _SHAPES:
+        m = pattern.match(d)
+        if not m:
+            continue
+        parts = m.groups()
+        month = parts[mi]
+        month = MONTH_ABBREVIATIONS.get(month.lower()) if fmt == "%d-%b-%Y" else int(month)
+        if not month:
+            return None, None
+        try:
+            return datetime(int(parts[yi]), month, int(parts[di]), tzinfo=timezone.utc), fmt
+        except ValueError:
+            return None, None
+
+    # Timestamps and other ISO 8601 variants
+    try: return datetime.fromisoformat(d).replace(tzinfo=timezone.utc), "isoformat"
+    except ValueError: pass
+    for fmt in _FALLBACK_FORMATS:
+        try: return datetime.strptime(d, fmt).replace(tzinfo=timezone.utc), fmt
+        except ValueError: continue
+    return None, None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_cached(d: str) -> Tuple[Optional[datetime], Optional[str]]:
+    return _sniff(d)
+
+
+def parse_date(d: Any) -> Optional[datetime]:
+    """Parses a date string or UNIX timestamp into a UTC datetime; returns None if unparseable."""
+    if not d: return None
+    if isinstance(d, (int, float)):
+        try: return datetime.fromtimestamp(d, tz=timezone.utc)
+        except (OverflowError, OSError, ValueError): return None
+    return _parse_cached(str(d).strip())[0]
+
+
+def detect_date_format(d: Any) -> Optional[str]:
+    """Diagnostics: the format `parse_date` used for this value ("timestamp", "isoformat", a strptime pattern, or None)."""
+    if not d: return None
+    if isinstance(d, (int, float)): return "timestamp"
+    return _parse_cached(str(d).strip())[1]
+
+
+def date_cache_info():
+    return _parse_cached.cache_info()
@@ -0,0 +1,59 @@
+from array import array
+from typing import Dict, List, Tuple
+
+
+class HammingIndex:
+    """
+    Multi-index hashing over 64-bit fingerprints for Hamming-radius queries.
+
+    Each fingerprint is split into `max_distance + 1` bit chunks. Two fingerprints within
+    `max_distance` bits of each other must agree exactly on at least one chunk (pigeonhole), so a
+    query only verifies the entries sharing a chunk value with it: about (r + 1) * n / 2**(64 / (r + 1))
+    candidates instead of n. Each chunk table maps the chunk values present to the slots holding
+    them, so memory grows with the entries, not with the 2**(64 / (r + 1)) possible chunk values.
+    """
+
+    def __init__(self, max_distance: int, bits: int = 64):
+        if not 0 <= max_distance < bits:
+            raise ValueError(f"max_distance must be between 0 and {bits - 1}, got {max_distance}")
+        self.max_distance = max_distance
+        self.bits = bits
+        chunks = max_distance + 1
+        self._spans = [(i * bits // chunks, (i + 1) * bits // chunks) for i in range(chunks)]
+        self._tables: List[Dict[int, array]] = [{} for _ in self._spans]
+        self._values = array("Q")
+        self._payloads = array("q")
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, value: int, payload: int) -> None:
+        slot = len(self._values)
+        self._values.append(value)
+        self._payloads.append(payload)
+        for (start, end), table in zip(self._spans, self._tables):
+            key = (value >> start) & ((1 << (end - start)) - 1)
+            bucket = table.get(key)
+            if bucket is None:
+                bucket = table[key] = array("L")
+            bucket.append(slot)
+
+    def search(self, value: int, radius: int = None) -> List[Tuple[int, int]]:
+        """(payload, distance) of every entry within `radius` bits (at most max_distance), nearest first."""
+        radius = self.max_distance if radius is None else min(radius, self.max_distance)
+        seen = set()
+        matches = []
+        values, payloads = self._values, self._payloads
+        for (start, end), table in zip(self._spans, self._tables):
+            bucket = table.get((value >> start) & ((1 << (end - start)) - 1))
+            if bucket is None:
+                continue
+            for slot in bucket:
+                if slot in seen:
+                    continue
+                seen.add(slot)
+                distance = (values[slot] ^ value).bit_count()
+                if distance <= radius:
+                    matches.append((payloads[slot], distance))
+        matches.sort(key=lambda m: m[1])
+        return matches
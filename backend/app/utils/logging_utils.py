@@ -2,6 +2,7 @@ import logging
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from ..core.config import LOG_DIR
+from .security import PHIRedactionFilter
 
 LOG_FILE = Path(LOG_DIR) / "app.log"
 
@@ -10,6 +11,7 @@ def setup_logging(level=logging.INFO):
     if logger.handlers:
         return logger 
     logger.setLevel(level)
+    logger.addFilter(PHIRedactionFilter())
 
     fmt = logging.Formatter(
         "%(asctime)s %(levelname)s [%(name)s:%(lineno)d] %(message)s"
@@ -0,0 +1,185 @@
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Seconds; spans in-process rule timings up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_REGISTRY: List["_Metric"] = []
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        with _REGISTRY_LOCK:
+            _REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Sample lines of the metric, without the HELP / TYPE header."""
+
+    def render(self) -> str:
+        header = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(header + self._samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[idx] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((k, list(c), self._sums[k]) for k, c in self._counts.items())
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format (per worker process)."""
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+# --- CLAIM PIPELINE METRICS ---
+
+STAGE_SECONDS = Histogram("plum_claim_stage_seconds", "Latency of each /v1/claims/upload pipeline stage.", ["stage"])
+STAGE_IN_FLIGHT = Gauge("plum_claim_stage_in_flight", "Pipeline stages currently executing.", ["stage"])
+UPLOADS_IN_FLIGHT = Gauge("plum_claim_uploads_in_flight", "Claim uploads currently being processed.")
+DECISIONS_TOTAL = Counter("plum_claim_decisions_total", "Adjudication decisions by outcome.", ["decision"])
+REASONS_TOTAL = Counter("plum_claim_reason_codes_total", "Reason codes attached to adjudication decisions.", ["reason"])
+RULE_SECONDS = Histogram("plum_adjudication_rule_seconds", "Time spent in each adjudication rule.", ["rule"])
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Times one pipeline stage and counts it as in flight while it runs."""
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+        STAGE_IN_FLIGHT.dec(stage=stage)
+
+
+def record_decision(decision_result: Dict) -> None:
+    DECISIONS_TOTAL.inc(decision=decision_result.get("decision") or "UNKNOWN")
+    for reason in decision_result.get("reasons", []):
+        REASONS_TOTAL.inc(reason=reason)
+    for step in decision_result.get("trace", []):
+        if not step.get("skipped"):
+            RULE_SECONDS.observe(step["ms"] / 1000, rule=step["rule"])
@@ -1,13 +1,17 @@
 import copy
+import logging
+from collections.abc import Mapping, Sequence
 from typing import Any, Dict
 
 # Fields to redact in logs
 SENSITIVE_FIELDS = {"member_id", "name", "patient_name", "phone", "email", "aadhaar"}
+REDACTED = "***REDACTED***"
 
 def redact_phi(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Recursively scrubs sensitive keys from a dictionary for safe logging.
     Does not modify the original dictionary.
+    Prefer `redacted_view` on hot paths: this makes a full deep copy.
     """
     if not isinstance(data, dict):
         return data
@@ -17,7 +21,7 @@ def redact_phi(data: Dict[str, Any]) -> Dict[str, Any]:
     def _scrub(d):
         for key, value in d.items():
             if key in SENSITIVE_FIELDS:
-                d[key] = "***REDACTED***"
+                d[key] = REDACTED
             elif isinstance(value, dict):
                 _scrub(value)
             elif isinstance(value, list):
@@ -26,4 +30,79 @@ def redact_phi(data: Dict[str, Any]) -> Dict[str, Any]:
                         _scrub(item)
     
     _scrub(safe_data)
-    return safe_data
\ No newline at end of file
+    return safe_data
+
+
+class RedactedView(Mapping):
+    """
+    Read-only, zero-copy view of a claim dict that hides SENSITIVE_FIELDS.
+    Nested dicts/lists are wrapped on access, so nothing is copied unless the view is formatted.
+    """
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Mapping):
+        self._data = data
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        return REDACTED if key in SENSITIVE_FIELDS else _wrap(value)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return "{" + ", ".join(f"{k!r}: {self[k]!r}" for k in self._data) + "}"
+
+    __str__ = __repr__
+
+
+class RedactedList(Sequence):
+    """List counterpart of RedactedView."""
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Sequence):
+        self._data = data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RedactedList(self._data[index])
+        return _wrap(self._data[index])
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return "[" + ", ".join(repr(v) for v in self) + "]"
+
+    __str__ = __repr__
+
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, Mapping) and not isinstance(value, RedactedView):
+        return RedactedView(value)
+    if isinstance(value, list):
+        return RedactedList(value)
+    return value
+
+
+def redacted_view(data: Any) -> Any:
+    """Wraps dicts/lists in a redacting view; other values are returned unchanged."""
+    return _wrap(data)
+
+
+class PHIRedactionFilter(logging.Filter):
+    """
+    Logging filter that redacts dict/list arguments of a record.
+    Logger filters only run for records that pass the level check, and the views are only
+    rendered when a handler formats the message, so disabled log calls cost nothing.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        args = record.args
+        if isinstance(args, Mapping):
+            record.args = RedactedView(args)
+        elif args:
+            record.args = tuple(_wrap(a) for a in args)
+        return True
@@ -0,0 +1,52 @@
+"""
+Wall-clock comparison of adjudicate_claims_batch with a loop over adjudicate_claim.
+
+Usage (from the repository root):
+    python backend/tests/bench_batch_adjudicator.py [--repeat 50] [--runs 8]
+
+Not part of the pytest run: timings depend on the machine and its load. Logging is held at WARNING
+so only adjudication work is timed. Both paths are run with the same short_circuit setting, the
+runs are interleaved, and the fastest of each is reported.
+"""
+import argparse
+import gc
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add project root to python path to allow imports
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from backend.tests.test_batch_parity import _corpus
+from backend.app.services.adjudicator import adjudicate_claim
+from backend.app.services.batch_adjudicator import adjudicate_claims_batch
+
+
+def _timed(fn) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(repeat: int, runs: int) -> None:
+    claims = _corpus() * repeat
+    print(f"{len(claims)} claims, best of {runs} runs")
+    logging.disable(logging.INFO)
+    for short_circuit in (False, True):
+        scalar_s = batch_s = float("inf")
+        for _ in range(runs):
+            scalar_s = min(scalar_s, _timed(lambda: [adjudicate_claim(c, short_circuit=short_circuit) for c in claims]))
+            batch_s = min(batch_s, _timed(lambda: adjudicate_claims_batch(claims, short_circuit=short_circuit)))
+        print(f"short_circuit={short_circuit!s:<5}  scalar {scalar_s:.3f}s ({len(claims) / scalar_s:,.0f} claims/s)  "
+              f"batch {batch_s:.3f}s ({len(claims) / batch_s:,.0f} claims/s)  {scalar_s / batch_s:.1f}x")
+    logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the batch adjudicator against the scalar path.")
+    parser.add_argument("--repeat", type=int, default=50, help="Copies of the parity corpus to adjudicate")
+    parser.add_argument("--runs", type=int, default=8, help="Timed runs per path; the fastest is reported")
+    args = parser.parse_args()
+    run(args.repeat, args.runs)
@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Add project root to python path to allow imports
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+# Tests get their own database, upload / spool directories and logs; set before the app is imported
+_TMP = tempfile.mkdtemp(prefix="plum-tests-")
+os.environ.setdefault("PLUM_DATABASE_URL", f"sqlite:///{_TMP}/plum_claims.db")
+os.environ.setdefault("PLUM_STORAGE_BACKEND", "local")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_TMP, "uploads"))
+os.environ.setdefault("PLUM_JOB_SPOOL_DIR", os.path.join(_TMP, "job_spool"))
+os.environ.setdefault("PLUM_JOB_WORKERS", "0")
+os.environ.setdefault("PLUM_LOG_DIR", os.path.join(_TMP, "logs"))
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables."""
+    from backend.app.core.database import Base, SessionLocal, engine
+    from backend.app.models import sql_models  # noqa: F401 (registers the tables)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
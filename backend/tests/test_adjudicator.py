@@ -0,0 +1,47 @@
+import pytest
+
+from .test_cases_runner import load_tests, normalize_test_input
+from backend.app.core.config import TEST_CASES_FILE
+from backend.app.services.adjudicator import adjudicate_claim
+from backend.app.tools.readjudicate import adjudicate_group
+
+# Rejected test cases and the reason each must keep
+REJECTED_REASONS = {
+    "TC004": "MISSING_DOCUMENTS",
+    "TC005": "WAITING_PERIOD",
+    "TC007": "PER_CLAIM_EXCEEDED",
+}
+
+
+def _case(case_id):
+    data = load_tests(TEST_CASES_FILE)
+    cases = data.get("test_cases", data) if isinstance(data, dict) else data
+    return next(tc for tc in cases if tc.get("case_id") == case_id)
+
+
+@pytest.mark.parametrize("case_id", sorted(REJECTED_REASONS))
+def test_rejections_keep_reasons_and_breakdown(case_id):
+    out = adjudicate_claim(normalize_test_input(_case(case_id)["input_data"]))
+    assert out["decision"] == "REJECTED"
+    assert REJECTED_REASONS[case_id] in out["reasons"]
+    # Every rule ran, so the coverage breakdown is still there, with the final line zeroed
+    assert not any(step.get("skipped") for step in out["trace"])
+    assert out["breakdown"]
+    assert [b["amount"] for b in out["breakdown"] if b["type"] == "final"] == [0.0]
+
+
+# Rejected by a terminal rule (documents, eligibility); TC007's per-claim limit is found by coverage itself
+@pytest.mark.parametrize("case_id", ["TC004", "TC005"])
+def test_offline_paths_short_circuit_to_the_same_decision(case_id):
+    claim = normalize_test_input(_case(case_id)["input_data"])
+    full = adjudicate_claim(claim)
+    out = adjudicate_claim(claim, short_circuit=True)
+    assert "coverage" in {step["rule"] for step in out["trace"] if step.get("skipped")}
+    assert (out["decision"], out["approved_amount"]) == (full["decision"], full["approved_amount"])
+    assert REJECTED_REASONS[case_id] in out["reasons"]
+    assert out["breakdown"] == []
+
+    # Backfills and simulations go through adjudicate_group, which never builds the breakdown
+    [grouped] = adjudicate_group([claim], None)
+    assert (grouped["decision"], grouped["approved_amount"], grouped["breakdown"]) == ("REJECTED", 0.0, [])
+    assert REJECTED_REASONS[case_id] in grouped["reasons"]
@@ -0,0 +1,52 @@
+import copy
+
+import pytest
+
+from .test_cases_runner import load_tests, normalize_test_input
+from backend.app.core.config import TEST_CASES_FILE
+from backend.app.services.adjudicator import adjudicate_claim
+from backend.app.services.batch_adjudicator import adjudicate_claims_batch
+
+TIMING_FIELDS = ("processing_time_ms", "trace")
+
+
+def _strip_timing(result):
+    return {k: v for k, v in result.items() if k not in TIMING_FIELDS}
+
+
+def _corpus():
+    data = load_tests(TEST_CASES_FILE)
+    cases = data.get("test_cases", data) if isinstance(data, dict) else data
+    claims = [normalize_test_input(tc.get("input_data", {})) for tc in cases]
+
+    # Variants that exercise the network discount, dental sub-limit, alternative medicine
+    # and annual / family-floater balance paths
+    extra = []
+    for claim in claims:
+        networked = copy.deepcopy(claim)
+        networked["hospital"]["name"] = "Apollo Hospitals"
+        dental = copy.deepcopy(claim)
+        dental["diagnosis"] = "Dental caries"
+        dental["items"].append({"name": "Crown", "amount": 9500.0, "category": "Dental"})
+        alternative = copy.deepcopy(claim)
+        alternative["items"].append({"name": "Panchakarma", "amount": 700.0, "category": "Ayurveda"})
+        near_annual = copy.deepcopy(claim)
+        near_annual["annual_used"] = 49000.0
+        near_family = copy.deepcopy(claim)
+        near_family.update({"annual_used": 1000.0, "family_used": 149500.0})
+        exhausted = copy.deepcopy(claim)
+        exhausted["annual_used"] = 50000.0
+        extra.extend([networked, dental, alternative, near_annual, near_family, exhausted])
+    return claims + extra
+
+
+@pytest.mark.parametrize("short_circuit", [False, True])
+def test_batch_matches_scalar_path(short_circuit):
+    claims = _corpus()
+    scalar = [adjudicate_claim(copy.deepcopy(c), short_circuit=short_circuit) for c in claims]
+    batch = adjudicate_claims_batch(copy.deepcopy(claims), short_circuit=short_circuit)
+
+    assert len(batch) == len(scalar)
+    for expected, actual in zip(scalar, batch):
+        assert _strip_timing(actual) == _strip_timing(expected)
+
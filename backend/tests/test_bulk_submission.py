@@ -0,0 +1,43 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from backend.app.core.config import BULK_MANIFEST_MAX_BYTES
+from backend.app.services.bulk_submission import unpack_archive
+from backend.app.services.ingestion import ByteBudget, close_all
+from backend.app.utils.exception_handlers import ServiceError
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_manifest_is_read_and_counted_against_budget():
+    manifest = json.dumps([{"ref": "a", "files": ["a/bill.pdf"]}])
+    budget = ByteBudget(10_000)
+    unpacked = unpack_archive(_zip({"manifest.json": manifest, "a/bill.pdf": b"%PDF bill"}), budget)
+    assert unpacked["manifest"] == manifest
+    assert budget.used == len(manifest) + len(b"%PDF bill")
+    close_all(list(unpacked["documents"].values()))
+
+
+def test_oversized_manifest_is_rejected_without_reading_it_all():
+    # Compresses to a few KB but would inflate far past the cap
+    bomb = _zip({"manifest.json": b" " * (BULK_MANIFEST_MAX_BYTES * 8)})
+    with pytest.raises(ServiceError) as error:
+        unpack_archive(bomb, ByteBudget(BULK_MANIFEST_MAX_BYTES * 100))
+    assert error.value.status_code == 413
+
+
+def test_manifest_over_request_budget_is_rejected():
+    manifest = json.dumps([{"ref": str(i), "files": [f"{i}.pdf"]} for i in range(50)])
+    with pytest.raises(ServiceError) as error:
+        unpack_archive(_zip({"manifest.json": manifest}), ByteBudget(100))
+    assert error.value.status_code == 413
@@ -0,0 +1,51 @@
+import json
+
+from sqlalchemy import text
+
+from backend.app.core.database import engine
+from backend.app.models.sql_models import ClaimDetail, ClaimRecord
+from backend.app.services.claim_details import legacy_columns, split_claim_details
+
+
+def _legacy_claims(count):
+    """Adds the pre-split JSON columns back and fills them the way old releases did."""
+    with engine.begin() as conn:
+        for column in ("extracted_data", "decision_reasons"):
+            conn.execute(text(f"ALTER TABLE claims ADD COLUMN {column} JSON"))
+        for i in range(count):
+            conn.execute(text("INSERT INTO claims (status, member_id, total_amount, extracted_data, decision_reasons) "
+                              "VALUES ('APPROVED', :member, 100.0, :data, :reasons)"),
+                         {"member": f"M{i}", "data": json.dumps({"total_amount": 100.0, "index": i}),
+                          "reasons": json.dumps([f"Reason {i}", "Summary: ok"])})
+
+
+def test_split_moves_json_and_drops_columns(db):
+    _legacy_claims(5)
+    assert legacy_columns() == ["extracted_data", "decision_reasons"]
+
+    assert split_claim_details(chunk_size=2) == {"moved": 5, "dropped": 2}
+    assert legacy_columns() == []
+    db.expire_all()
+    for record in db.query(ClaimRecord).order_by(ClaimRecord.id):
+        i = int(record.member_id[1:])
+        assert record.extracted_data == {"total_amount": 100.0, "index": i}
+        assert record.decision_reasons == [f"Reason {i}", "Summary: ok"]
+        assert record.primary_reason == f"Reason {i}"
+    # Migrated databases are left alone
+    assert split_claim_details() == {"moved": 0, "dropped": 0}
+
+
+def test_split_resumes_after_interruption(db):
+    _legacy_claims(4)
+    # A previous run moved the first claim and stopped before clearing its legacy columns
+    db.add(ClaimDetail(claim_id=1, extracted_data={"moved": True}, decision_reasons=["Already moved"]))
+    db.commit()
+
+    assert split_claim_details(chunk_size=3, drop_columns=False) == {"moved": 3, "dropped": 0}
+    assert legacy_columns() == ["extracted_data", "decision_reasons"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM claims WHERE extracted_data IS NOT NULL "
+                                 "OR decision_reasons IS NOT NULL")).scalar() == 0
+    db.expire_all()
+    assert db.get(ClaimRecord, 1).decision_reasons == ["Already moved"]
+    assert db.query(ClaimDetail).count() == 4
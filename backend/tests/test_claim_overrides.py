@@ -0,0 +1,70 @@
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.models.sql_models import ClaimRecord
+
+
+def _claims(db, count):
+    records = []
+    for i in range(count):
+        record = ClaimRecord(status="MANUAL_REVIEW", member_id=f"M{i}", total_amount=100.0, approved_amount=0.0)
+        record.decision_reasons = ["DUPLICATE_IMAGE_DETECTED"]
+        records.append(record)
+    db.add_all(records)
+    db.commit()
+    return records
+
+
+def _body(version, **extra):
+    return {"status": "APPROVED", "approved_amount": 100.0, "decision_reasons": ["ok"], "version": version, **extra}
+
+
+def test_put_requires_version(db):
+    record = _claims(db, 1)[0]
+    body = _body(1)
+    del body["version"]
+    response = TestClient(app).put(f"/v1/claims/{record.id}", json=body)
+    assert response.status_code == 422
+    db.expire_all()
+    assert db.get(ClaimRecord, record.id).status == "MANUAL_REVIEW"
+
+
+def test_put_with_stale_version_conflicts(db):
+    record = _claims(db, 1)[0]
+    client = TestClient(app)
+    first = client.put(f"/v1/claims/{record.id}", json=_body(1))
+    assert first.json()["version"] == 2
+    # A second reviewer still holding version 1
+    stale = client.put(f"/v1/claims/{record.id}", json={**_body(1), "status": "REJECTED", "approved_amount": 0.0})
+    assert stale.status_code == 409
+    db.expire_all()
+    stored = db.get(ClaimRecord, record.id)
+    assert (stored.status, stored.version, stored.decision_reasons) == ("APPROVED", 2, ["ok"])
+
+
+def test_patch_reports_outcome_per_row(db):
+    records = _claims(db, 3)
+    client = TestClient(app)
+    client.put(f"/v1/claims/{records[1].id}", json=_body(1))
+
+    response = client.patch("/v1/claims", json=[
+        _body(1, id=records[0].id),
+        _body(1, id=records[1].id),  # now at version 2
+        _body(1, id=999),
+        _body(1, id=records[0].id),
+    ])
+    assert response.status_code == 200
+    outcomes = [(r["id"], r["outcome"]) for r in response.json()["results"]]
+    assert outcomes == [(records[0].id, "updated"), (records[1].id, "conflict"), (999, "not_found"),
+                        (records[0].id, "duplicate")]
+    assert response.json()["results"][1]["version"] == 2
+
+
+def test_patch_requires_version_on_every_item(db):
+    records = _claims(db, 2)
+    missing = _body(1, id=records[1].id)
+    del missing["version"]
+    response = TestClient(app).patch("/v1/claims", json=[_body(1, id=records[0].id), missing])
+    assert response.status_code == 422
+    db.expire_all()
+    assert {r.status for r in db.query(ClaimRecord)} == {"MANUAL_REVIEW"}
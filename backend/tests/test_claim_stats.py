@@ -0,0 +1,80 @@
+from datetime import date, datetime
+
+import pytest
+
+from backend.app.models.sql_models import ClaimRecord, ClaimStat, MemberLedger
+from backend.app.services import rollups
+from backend.app.services.claim_overrides import override_claims
+from backend.app.services.claim_stats import claim_stats, rebuild_claim_stats
+from backend.app.services.claim_writer import PendingClaim, write_batch
+from backend.app.services.member_ledger import rebuild_ledger
+
+DAY = datetime(2024, 6, 3, 10, 0)
+
+
+def _pending(status, amount, approved, hospital, reasons, member_id="M1", created_at=DAY):
+    data = {"member": {"member_id": member_id, "family_id": "F1"}, "policy_id": "PLUM_OPD_2024",
+            "treatment_date": "2024-06-01", "hospital": {"name": hospital}, "total_amount": amount,
+            "items": [{"name": "Consultation", "amount": amount, "category": "Consultation"}]}
+    fields = dict(member_id=member_id, status=status, total_amount=amount, approved_amount=approved,
+                  confidence_score=0.9, extracted_data=data, decision_reasons=reasons,
+                  policy_id="PLUM_OPD_2024", created_at=created_at)
+    return PendingClaim(fields, [], [], True, None)
+
+
+def _rows(db, model, key_columns, value_columns):
+    db.expire_all()
+    return {tuple(getattr(r, c) for c in key_columns): tuple(round(getattr(r, c), 2) for c in value_columns)
+            for r in db.query(model) if any(getattr(r, c) for c in value_columns)}
+
+
+def _stats(db):
+    return _rows(db, ClaimStat, ("day", "status", "dimension", "key"), ("claim_count", "claimed_total", "approved_total"))
+
+
+def _ledger(db):
+    return _rows(db, MemberLedger, ("scope", "scope_key", "policy_id", "policy_year", "category"),
+                 ("approved_total", "claim_count"))
+
+
+def _history(db):
+    write_batch([
+        _pending("APPROVED", 1000.0, 1000.0, "Apollo Hospitals", ["Summary: ok"]),
+        _pending("PARTIAL", 2000.0, 1500.0, "Apollo  Hospitals", ["EXCLUDED_ITEM", "Summary: partial"], "M2"),
+        _pending("REJECTED", 700.0, 0.0, "City Clinic", ["WAITING_PERIOD", "NOT_COVERED", "free text"], "M3"),
+    ])
+    write_batch([_pending("MANUAL_REVIEW", 300.0, 0.0, None, ["DOCTOR_REG_INVALID"], created_at=datetime(2024, 6, 4))])
+    # An override moves a claim between buckets after it was posted
+    record = db.query(ClaimRecord).filter(ClaimRecord.status == "REJECTED").one()
+    override_claims(db, [{"id": record.id, "status": "APPROVED", "approved_amount": 700.0,
+                          "decision_reasons": ["MANUAL_OVERRIDE"], "version": record.version}])
+
+
+@pytest.mark.parametrize("upsert", [True, False])
+def test_incremental_rollups_match_rebuild(db, monkeypatch, upsert):
+    if not upsert:
+        # Databases without ON CONFLICT take the UPDATE-then-INSERT path
+        monkeypatch.setattr(rollups, "UPSERT_INSERTS", {})
+    _history(db)
+    stats, ledger = _stats(db), _ledger(db)
+    assert stats[(date(2024, 6, 3), "APPROVED", "_all", "")] == (2, 1700.0, 1700.0)
+    assert stats[(date(2024, 6, 3), "PARTIAL", "hospital", "Apollo Hospitals")] == (1, 2000.0, 1500.0)
+    assert (date(2024, 6, 3), "REJECTED", "_all", "") not in stats
+
+    assert rebuild_claim_stats(db)["claims_scanned"] == 4
+    assert _stats(db) == stats
+    rebuild_ledger(db)
+    assert _ledger(db) == ledger
+
+
+def test_stats_summary(db):
+    _history(db)
+    summary = claim_stats(db, date(2024, 6, 1), date(2024, 6, 30))
+    totals = summary["totals"]
+    assert (totals["claims"], totals["approved_claims"], totals["approval_rate"]) == (4, 3, 0.75)
+    assert (totals["claimed_total"], totals["approved_total"]) == (4000.0, 3200.0)
+    assert totals["by_status"] == {"APPROVED": 2, "PARTIAL": 1, "MANUAL_REVIEW": 1}
+    assert {r["code"] for r in totals["reasons"]} == {"EXCLUDED_ITEM", "MANUAL_OVERRIDE", "DOCTOR_REG_INVALID"}
+    assert totals["top_hospitals"][0] == {"hospital": "Apollo Hospitals", "claims": 2,
+                                          "claimed_total": 3000.0, "approved_total": 2500.0}
+    assert [d["day"] for d in summary["days"]] == ["2024-06-03", "2024-06-04"]
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from backend.app.models.sql_models import ClaimRecord
+from backend.app.services import claim_writer as claim_writer_module
+from backend.app.services.claim_writer import ClaimWriter
+
+
+def _fields(member_id):
+    return dict(status="MANUAL_REVIEW", member_id=member_id, total_amount=100.0, approved_amount=0.0,
+                decision_reasons=["Summary: ok"])
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Records the member ids of every write_batch call; a claim of member "BAD" fails its batch."""
+    calls = []
+    real = claim_writer_module.write_batch
+
+    def write_batch(batch):
+        calls.append([claim.fields["member_id"] for claim in batch])
+        if any(claim.fields["member_id"] == "BAD" for claim in batch):
+            raise RuntimeError("constraint failed")
+        return real(batch)
+
+    monkeypatch.setattr(claim_writer_module, "write_batch", write_batch)
+    return calls
+
+
+def _save_all(writer, members):
+    async def run():
+        results = await asyncio.gather(*[writer.save(_fields(m), [], [], post_to_ledger=False) for m in members],
+                                       return_exceptions=True)
+        await writer.close()
+        return results
+    return asyncio.run(run())
+
+
+def test_concurrent_saves_share_one_commit(db, batches):
+    records = _save_all(ClaimWriter(batch_size=10, max_delay_ms=50), [f"M{i}" for i in range(5)])
+    assert batches == [["M0", "M1", "M2", "M3", "M4"]]
+    assert [r.member_id for r in records] == ["M0", "M1", "M2", "M3", "M4"]
+    assert len({r.id for r in records}) == 5
+    assert db.query(ClaimRecord).count() == 5
+
+
+def test_batches_are_capped_at_batch_size(db, batches):
+    _save_all(ClaimWriter(batch_size=2, max_delay_ms=50), [f"M{i}" for i in range(5)])
+    assert batches == [["M0", "M1"], ["M2", "M3"], ["M4"]]
+    assert db.query(ClaimRecord).count() == 5
+
+
+def test_failing_claim_is_retried_alone(db, batches):
+    results = _save_all(ClaimWriter(batch_size=10, max_delay_ms=50), ["M0", "BAD", "M2"])
+    # The batch fails, then each claim is written on its own; only the offending caller sees the error
+    assert batches == [["M0", "BAD", "M2"], ["M0"], ["BAD"], ["M2"]]
+    assert isinstance(results[1], RuntimeError)
+    assert [results[0].member_id, results[2].member_id] == ["M0", "M2"]
+    assert sorted(r.member_id for r in db.query(ClaimRecord)) == ["M0", "M2"]
+
+
+def test_close_writes_queued_claims(db, batches):
+    async def run():
+        writer = ClaimWriter(batch_size=10, max_delay_ms=10_000)
+        pending = [asyncio.ensure_future(writer.save(_fields(f"M{i}"), [], [], post_to_ledger=False)) for i in range(3)]
+        await asyncio.sleep(0)
+        # Long batch window: close() must flush instead of waiting it out
+        await asyncio.wait_for(writer.close(), 5)
+        return await asyncio.gather(*pending)
+
+    records = asyncio.run(run())
+    assert [r.member_id for r in records] == ["M0", "M1", "M2"]
+    assert batches == [["M0", "M1", "M2"]]
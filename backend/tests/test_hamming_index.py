@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from backend.app.utils.hamming_index import HammingIndex
+
+
+def _brute_force(entries, query, radius):
+    return sorted((payload, (value ^ query).bit_count()) for value, payload in entries
+                  if (value ^ query).bit_count() <= radius)
+
+
+def _flip(value, bits, rng):
+    for bit in rng.sample(range(64), bits):
+        value ^= 1 << bit
+    return value
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 3, 6, 16])
+def test_search_matches_brute_force(max_distance):
+    rng = random.Random(max_distance)
+    entries = []
+    for payload in range(400):
+        base = rng.getrandbits(64)
+        entries.append((base, payload))
+        # Near copies at and around the radius boundary
+        for distance in {0, max_distance, max_distance + 1, rng.randint(0, max_distance)}:
+            entries.append((_flip(base, distance, rng), payload + 1000))
+    index = HammingIndex(max_distance)
+    for value, payload in entries:
+        index.add(value, payload)
+
+    queries = [value for value, _ in rng.sample(entries, 200)]
+    queries += [_flip(value, rng.randint(0, max_distance + 2), rng) for value, _ in rng.sample(entries, 200)]
+    queries += [rng.getrandbits(64) for _ in range(50)]
+    for query in queries:
+        for radius in {max_distance, max_distance // 2}:
+            matches = index.search(query, radius)
+            assert sorted(matches) == _brute_force(entries, query, radius)
+            assert [d for _, d in matches] == sorted(d for _, d in matches)
+
+
+def test_small_radius_does_not_preallocate_chunk_tables():
+    # One 64-bit (or two 32-bit) chunks: the tables must only hold the values added
+    for max_distance in (0, 1):
+        index = HammingIndex(max_distance)
+        index.add(0xFFFF0000FFFF0000, 7)
+        assert index.search(0xFFFF0000FFFF0000) == [(7, 0)]
+        assert sum(len(table) for table in index._tables) == max_distance + 1
+
+
+def test_rejects_out_of_range_distance():
+    for max_distance in (-1, 64):
+        with pytest.raises(ValueError):
+            HammingIndex(max_distance)
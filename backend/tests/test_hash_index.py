@@ -0,0 +1,86 @@
+import hashlib
+
+import pytest
+
+from backend.app.services import claim_writer as claim_writer_module
+from backend.app.services import fraud_detection
+from backend.app.services.claim_writer import PendingClaim, write_batch
+from backend.app.services.fraud_detection import HashIndex, find_duplicate_files, find_near_duplicates
+from backend.app.utils.bloom_filter import BloomFilter
+
+
+def _digest(value):
+    return hashlib.sha256(str(value).encode()).hexdigest()
+
+
+def _pending(files):
+    fields = dict(status="MANUAL_REVIEW", member_id="M1", total_amount=0.0, approved_amount=0.0)
+    return PendingClaim(fields, files, [], False, None)
+
+
+@pytest.fixture
+def index(db, monkeypatch):
+    """A fresh, warmed process index (near-duplicates on) that only re-syncs when asked to."""
+    monkeypatch.setattr(fraud_detection, "NEAR_DUPLICATE_DETECTION", True)
+    fresh = HashIndex(refresh_seconds=3600)
+    monkeypatch.setattr(fraud_detection, "hash_index", fresh)
+    fresh.warm(db)
+    return fresh
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(capacity=20000, error_rate=0.01)
+    added = [_digest(i) for i in range(20000)]
+    for digest in added:
+        bloom.add(digest)
+    assert all(digest in bloom for digest in added)
+    false_positives = sum(_digest(f"other-{i}") in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+    # About 1.2 MB per million entries at 1%
+    assert 23000 < bloom.nbytes < 25000
+
+
+def test_bloom_filter_grows_past_capacity():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    added = [_digest(i) for i in range(5000)]
+    for digest in added:
+        bloom.add(digest)
+    assert len(bloom._layers) > 1
+    assert all(digest in bloom for digest in added)
+    assert sum(_digest(f"other-{i}") in bloom for i in range(20000)) / 20000 < 0.02
+
+
+def test_committed_files_are_found(index, db):
+    digest = _digest("bill")
+    record = write_batch([_pending([(digest, "bill.pdf", None)])])[0]
+    assert index.candidates([digest, _digest("new")], db) == [digest]
+    assert find_duplicate_files([digest, _digest("new")], db) == {digest: record.id}
+
+
+def test_rolled_back_claims_are_not_indexed(index, db, monkeypatch):
+    # Pages from a claim whose transaction failed must not match the claim that reuses its id
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    phash = "f0f0f0f0f0f0f0f0"
+    monkeypatch.setattr(claim_writer_module, "post_claim_stats", fail)
+    with pytest.raises(RuntimeError):
+        write_batch([_pending([(_digest("lost"), "lost.png", phash)])])
+    monkeypatch.undo()
+    monkeypatch.setattr(fraud_detection, "hash_index", index)
+
+    record = write_batch([_pending([(_digest("other"), "other.png", "0123456789abcdef")])])[0]
+    assert record.id == 1
+    assert index.candidates([_digest("lost")], db) == []
+    assert find_near_duplicates([phash], db) == []
+    assert find_near_duplicates(["0123456789abcdee"], db) == [{"page": 1, "claim_id": 1, "distance": 1}]
+
+
+def test_sync_picks_up_rows_from_other_processes(index, db):
+    digest = _digest("elsewhere")
+    # Written by another worker: this process's index only learns of it on sync
+    fraud_detection.record_claim_files(db, 42, [(digest, "x.pdf", None)])
+    db.commit()
+    assert index.candidates([digest], db) == []
+    index.refresh_seconds = 0
+    assert index.candidates([digest], db) == [digest]
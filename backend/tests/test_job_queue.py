@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from backend.app.core.config import JOB_MAX_ATTEMPTS
+from backend.app.models.sql_models import ClaimJob, ClaimRecord
+from backend.app.services import job_queue
+from backend.app.services.claim_writer import PendingClaim, write_batch
+from backend.app.services.job_queue import claim_next_job, run_job
+
+
+def _job(db, job_id="job-1"):
+    db.add(ClaimJob(id=job_id, status="QUEUED", params={"member_id": "M1", "files": []}))
+    db.commit()
+    return job_id
+
+
+def _store_claim(job_id):
+    fields = dict(status="APPROVED", member_id="M1", total_amount=100.0, approved_amount=100.0,
+                  confidence_score=0.9, decision_reasons=["Summary: ok"], job_id=job_id)
+    return write_batch([PendingClaim(fields, [], [], False, None)])[0]
+
+
+def _expire_lease(db, job_id):
+    db.query(ClaimJob).filter(ClaimJob.id == job_id).update(
+        {ClaimJob.lease_expires_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+
+
+def test_expired_lease_is_taken_over(db):
+    job_id = _job(db)
+    assert claim_next_job(db, "worker-a") == job_id
+    # Leased: no other worker gets it
+    assert claim_next_job(db, "worker-b") is None
+
+    _expire_lease(db, job_id)
+    assert claim_next_job(db, "worker-b") == job_id
+    db.expire_all()
+    job = db.get(ClaimJob, job_id)
+    assert (job.status, job.worker, job.attempts) == ("RUNNING", "worker-b", 2)
+
+
+def test_job_fails_after_last_attempt(db):
+    job_id = _job(db)
+    for attempt in range(JOB_MAX_ATTEMPTS):
+        assert claim_next_job(db, f"worker-{attempt}") == job_id
+        _expire_lease(db, job_id)
+    assert claim_next_job(db, "worker-last") is None
+    db.expire_all()
+    job = db.get(ClaimJob, job_id)
+    assert (job.status, job.attempts) == ("FAILED", JOB_MAX_ATTEMPTS)
+
+
+def test_claim_job_id_is_unique(db):
+    _store_claim("job-1")
+    with pytest.raises(IntegrityError):
+        _store_claim("job-1")
+    # Claims without a job (synchronous uploads) do not collide
+    _store_claim(None)
+    _store_claim(None)
+
+
+def test_rerun_returns_stored_claim(db, monkeypatch):
+    job_id = _job(db)
+    # The first run stored its claim, then the worker died before finishing the job
+    record = _store_claim(job_id)
+
+    async def must_not_run(*args, **kwargs):
+        raise AssertionError("pipeline ran again")
+
+    monkeypatch.setattr(job_queue, "process_claim", must_not_run)
+    asyncio.run(run_job(job_id))
+
+    db.expire_all()
+    job = db.get(ClaimJob, job_id)
+    assert (job.status, job.claim_id) == ("DONE", record.id)
+    assert job.result["decision"]["decision"] == "APPROVED"
+    assert db.query(ClaimRecord).count() == 1
+
+
+def test_concurrent_rerun_returns_claim_stored_first(db, monkeypatch):
+    job_id = _job(db)
+    first = {}
+
+    async def race(*args, job_id=None, **kwargs):
+        # The stalled first run commits while this run is in the pipeline
+        first["record"] = _store_claim(job_id)
+        _store_claim(job_id)
+
+    monkeypatch.setattr(job_queue, "process_claim", race)
+    asyncio.run(run_job(job_id))
+
+    db.expire_all()
+    job = db.get(ClaimJob, job_id)
+    assert (job.status, job.claim_id) == ("DONE", first["record"].id)
+    assert db.query(ClaimRecord).count() == 1
@@ -0,0 +1,125 @@
+from datetime import datetime
+
+from backend.app.models.sql_models import ClaimRecord, MemberLedger
+from backend.app.services.claim_writer import PendingClaim, write_batch
+from backend.app.services.member_ledger import (
+    TOTAL_CATEGORY, apply_postings, attach_ledger_usage, claim_postings, merge_postings, rebuild_ledger,
+)
+
+POLICY = "PLUM_OPD_2024"
+
+
+def _claim_data(member_id, family_id=None, amount=5000.0, treatment_date="2024-06-01"):
+    return {
+        "member": {"member_id": member_id, "family_id": family_id or member_id},
+        "policy_id": POLICY,
+        "treatment_date": treatment_date,
+        "total_amount": amount,
+        "items": [{"name": "Consultation", "amount": amount, "category": "Consultation"}],
+    }
+
+
+def _pending(member_id, amount=5000.0, family_id=None, status="APPROVED", post_to_ledger=True):
+    fields = dict(member_id=member_id, status=status, total_amount=amount, approved_amount=amount,
+                  confidence_score=1.0, extracted_data=_claim_data(member_id, family_id, amount),
+                  decision_reasons=["Summary: ok"], policy_id=POLICY)
+    return PendingClaim(fields, [], [], post_to_ledger, None)
+
+
+def _ledger(db):
+    db.expire_all()
+    return {(r.scope, r.scope_key, r.policy_id, r.policy_year, r.category): (round(r.approved_total, 2), r.claim_count)
+            for r in db.query(MemberLedger) if r.claim_count or r.approved_total}
+
+
+def test_claim_postings_buckets():
+    postings = claim_postings("M1", POLICY, "APPROVED", 1200.0, _claim_data("M1", "F1", 1200.0))
+    assert postings == {
+        ("member", "M1", POLICY, 2024, TOTAL_CATEGORY): (1200.0, 1),
+        ("member", "M1", POLICY, 2024, "consultation"): (1200.0, 1),
+        ("family", "F1", POLICY, 2024, TOTAL_CATEGORY): (1200.0, 1),
+        ("family", "F1", POLICY, 2024, "consultation"): (1200.0, 1),
+    }
+    # Nothing consumes the balance unless it was (partly) approved for a known member
+    assert claim_postings("M1", POLICY, "REJECTED", 1200.0, _claim_data("M1")) == {}
+    assert claim_postings("M1", POLICY, "APPROVED", 0.0, _claim_data("M1")) == {}
+    assert claim_postings("Unknown_Guest", POLICY, "APPROVED", 100.0, _claim_data("Unknown_Guest")) == {}
+
+
+def test_merge_and_apply_postings(db):
+    first = claim_postings("M1", POLICY, "APPROVED", 1000.0, _claim_data("M1", "F1", 1000.0))
+    second = claim_postings("M2", POLICY, "PARTIAL", 500.0, _claim_data("M2", "F1", 500.0))
+    merged = merge_postings([first, second])
+    assert merged[("family", "F1", POLICY, 2024, TOTAL_CATEGORY)] == (1500.0, 2)
+
+    apply_postings(db, {}, merged)
+    # Same buckets again: the upsert adds to the existing rows
+    apply_postings(db, {}, first)
+    db.commit()
+    ledger = _ledger(db)
+    assert ledger[("member", "M1", POLICY, 2024, TOTAL_CATEGORY)] == (2000.0, 2)
+    assert ledger[("family", "F1", POLICY, 2024, TOTAL_CATEGORY)] == (2500.0, 3)
+
+    # An override moves the claim out of the ledger again
+    apply_postings(db, first, {})
+    db.commit()
+    assert _ledger(db)[("member", "M1", POLICY, 2024, TOTAL_CATEGORY)] == (1000.0, 1)
+
+
+def test_rebuild_matches_incremental_postings(db):
+    write_batch([_pending("M1", 1000.0, "F1"), _pending("M2", 2500.0, "F1"), _pending("M3", 800.0, status="REJECTED"),
+                 _pending("M1", 400.0, "F1", status="PARTIAL")])
+    incremental = _ledger(db)
+    assert incremental[("family", "F1", POLICY, 2024, TOTAL_CATEGORY)] == (3900.0, 3)
+
+    stats = rebuild_ledger(db)
+    assert stats["claims_scanned"] == 4 and stats["claims_posted"] == 3
+    assert _ledger(db) == incremental
+
+
+def test_attach_ledger_usage_reads_balance(db):
+    write_batch([_pending("M1", 3000.0, "F1"), _pending("M2", 2000.0, "F1")])
+    claim = _claim_data("M1", "F1", 100.0)
+    attach_ledger_usage(db, claim)
+    assert (claim["annual_used"], claim["family_used"]) == (3000.0, 5000.0)
+
+
+def test_group_commit_cannot_overspend_annual_limit(db):
+    # Every claim was adjudicated against an empty ledger; eleven 5000 approvals exceed the 50000 limit
+    records = write_batch([_pending("M1") for _ in range(11)] + [_pending("M2")])
+    statuses = [(r.status, r.approved_amount) for r in records]
+    assert statuses[:10] == [("APPROVED", 5000.0)] * 10
+    assert statuses[10] == ("REJECTED", 0.0)
+    assert "ANNUAL_LIMIT_EXCEEDED" in records[10].decision_reasons
+    assert statuses[11] == ("APPROVED", 5000.0)
+    assert _ledger(db)[("member", "M1", POLICY, 2024, TOTAL_CATEGORY)] == (50000.0, 10)
+
+
+def test_later_write_is_capped_to_remaining_balance(db):
+    write_batch([_pending("M1", 4800.0) for _ in range(10)])
+    record = write_batch([_pending("M1", 5000.0)])[0]
+    assert (record.status, record.approved_amount) == ("PARTIAL", 2000.0)
+    assert record.decision_reasons[-1] == "ANNUAL_LIMIT_EXCEEDED"
+    stored = db.get(ClaimRecord, record.id)
+    assert (stored.status, stored.approved_amount) == ("PARTIAL", 2000.0)
+    assert _ledger(db)[("member", "M1", POLICY, 2024, TOTAL_CATEGORY)] == (50000.0, 11)
+
+
+def test_family_floater_limit_spans_members(db):
+    # 150000 family floater: thirty 5000 approvals across members of one family use it up
+    write_batch([_pending(f"M{i}", 5000.0, "F1") for i in range(30)])
+    record = write_batch([_pending("M99", 5000.0, "F1")])[0]
+    assert (record.status, record.approved_amount) == ("REJECTED", 0.0)
+    assert record.decision_reasons[-1] == "FAMILY_LIMIT_EXCEEDED"
+
+
+def test_claims_not_posting_to_ledger_are_not_capped(db):
+    write_batch([_pending("M1") for _ in range(10)])
+    record = write_batch([_pending("M1", post_to_ledger=False, status="MANUAL_REVIEW")])[0]
+    assert record.status == "MANUAL_REVIEW"
+
+
+def test_policy_year_follows_treatment_date():
+    postings = claim_postings("M1", POLICY, "APPROVED", 100.0, _claim_data("M1", treatment_date="2025-02-01"),
+                              created_at=datetime(2024, 12, 31))
+    assert {key[3] for key in postings} == {2025}
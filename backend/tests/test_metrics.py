@@ -0,0 +1,67 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.utils.metrics import _Metric, record_decision, track_stage
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def _scrape():
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    return response.text
+
+
+def test_metric_needs_samples():
+    class Incomplete(_Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("plum_incomplete", "Never registered.")
+
+
+def test_metrics_endpoint_is_prometheus_text_format():
+    with track_stage("extraction"):
+        pass
+    record_decision({"decision": "REJECTED", "reasons": ["WAITING_PERIOD", 'odd "reason"\\'],
+                     "trace": [{"rule": "eligibility", "ms": 2.5}, {"rule": "coverage", "skipped": True, "ms": 0.0}]})
+    text = _scrape()
+    assert text.endswith("\n")
+
+    types, samples = {}, []
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            assert len(line.split(" ", 3)) == 4
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram")
+            assert name not in types
+            types[name] = kind
+        else:
+            match = SAMPLE.match(line)
+            assert match, line
+            name, labels, value = match.group(1), dict(LABEL.findall(match.group(2) or "")), match.group(3)
+            float(value)
+            family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in types else name
+            # Every sample belongs to a family declared before it
+            assert family in types, line
+            samples.append((name, labels, float(value)))
+
+    assert types["plum_claim_decisions_total"] == "counter"
+    assert ("plum_claim_decisions_total", {"decision": "REJECTED"}) in [(n, l) for n, l, _ in samples]
+    # Label values are escaped
+    assert ("plum_claim_reason_codes_total", {"reason": 'odd \\"reason\\"\\\\'}) in [(n, l) for n, l, _ in samples]
+
+    # Histogram buckets are cumulative and end in +Inf == _count
+    buckets = [(l["le"], v) for n, l, v in samples if n == "plum_adjudication_rule_seconds_bucket" and l["rule"] == "eligibility"]
+    assert buckets[-1][0] == "+Inf"
+    assert [v for _, v in buckets] == sorted(v for _, v in buckets)
+    count = next(v for n, l, v in samples if n == "plum_adjudication_rule_seconds_count" and l["rule"] == "eligibility")
+    assert buckets[-1][1] == count >= 1
+    # Skipped rules are not timed
+    assert not any(l.get("rule") == "coverage" for n, l, _ in samples if n.startswith("plum_adjudication_rule_seconds"))
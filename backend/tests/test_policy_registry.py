@@ -0,0 +1,93 @@
+import copy
+import io
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.api.v1 import routes_claims
+from backend.app.core.config import POLICY_FILE
+from backend.app.main import app
+from backend.app.services import bulk_submission, policy_engine
+from backend.app.services.policy_registry import PolicyRegistry, check_policy_id
+from backend.app.utils.exception_handlers import ServiceError
+
+with open(POLICY_FILE, encoding="utf-8") as f:
+    BASE_POLICY = json.load(f)
+
+
+def _write(path, policy, mtime_ns):
+    path.write_text(json.dumps(policy), encoding="utf-8")
+    # Explicit mtimes: rewrites within one filesystem tick must still be seen
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _policy(policy_id, annual_limit):
+    policy = copy.deepcopy(BASE_POLICY)
+    policy.pop("version", None)
+    policy["policy_id"] = policy_id
+    policy["coverage_details"]["annual_limit"] = annual_limit
+    return policy
+
+
+@pytest.fixture
+def policy_file(tmp_path):
+    path = tmp_path / "policy.json"
+    _write(path, _policy("TEST_POLICY", 50000), 1_000_000_000)
+    return path
+
+
+def test_rewritten_file_is_reloaded_and_cached_by_content(tmp_path, policy_file):
+    reg = PolicyRegistry(default_file=policy_file, policy_dir=tmp_path / "none", reload_seconds=0)
+    first = reg.get("TEST_POLICY")
+    assert reg.get() is first
+    assert policy_engine._COMPILED[("TEST_POLICY", first.version)] is first
+
+    # Touched but unchanged: same hash, same version, same compiled build
+    _write(policy_file, _policy("TEST_POLICY", 50000), 2_000_000_000)
+    assert reg.get("TEST_POLICY") is first
+
+    _write(policy_file, _policy("TEST_POLICY", 60000), 3_000_000_000)
+    second = reg.get("TEST_POLICY")
+    assert second.version != first.version
+    assert second.raw["coverage_details"]["annual_limit"] == 60000
+    assert policy_engine._COMPILED[("TEST_POLICY", second.version)] is second
+    assert reg.versions() == {"TEST_POLICY": second.version}
+
+
+def test_compiled_versions_are_evicted_least_recently_used(tmp_path, policy_file, monkeypatch):
+    monkeypatch.setattr(policy_engine, "POLICY_CACHE_SIZE", 2)
+    reg = PolicyRegistry(default_file=policy_file, policy_dir=tmp_path / "none", reload_seconds=0)
+    versions = []
+    for i, limit in enumerate((70000, 80000, 90000)):
+        _write(policy_file, _policy("TEST_POLICY", limit), 4_000_000_000 + i)
+        versions.append(reg.get("TEST_POLICY").version)
+    keys = [("TEST_POLICY", v) for v in versions]
+    assert keys[0] not in policy_engine._COMPILED
+    assert list(policy_engine._COMPILED)[-2:] == keys[1:]
+
+
+def test_unknown_policy_is_rejected_before_any_work(db, monkeypatch):
+    with pytest.raises(ServiceError) as error:
+        check_policy_id("NO_SUCH_POLICY")
+    assert error.value.status_code == 404
+    check_policy_id(None)
+
+    async def must_not_run(*args, **kwargs):
+        raise AssertionError("claim work started")
+
+    monkeypatch.setattr(routes_claims, "_ingest_files", must_not_run)
+    monkeypatch.setattr(bulk_submission, "process_claim", must_not_run)
+    client = TestClient(app)
+    files = [("files", ("bill.pdf", io.BytesIO(b"%PDF bill"), "application/pdf"))]
+    for params in ({}, {"async": "true"}):
+        response = client.post("/v1/claims/upload", params=params, files=files, data={"policy_id": "NO_SUCH_POLICY"})
+        assert response.status_code == 404
+
+    # A manifest entry naming an unknown policy refuses the whole batch once its files are read
+    monkeypatch.undo()
+    monkeypatch.setattr(bulk_submission, "process_claim", must_not_run)
+    manifest = json.dumps([{"ref": "a", "files": ["bill.pdf"], "policy_id": "NO_SUCH_POLICY"}])
+    response = client.post("/v1/claims/bulk", files=files, data={"manifest": manifest})
+    assert response.status_code == 404
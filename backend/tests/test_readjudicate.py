@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from backend.app.services.claim_writer import PendingClaim, write_batch
+from backend.app.tools import readjudicate
+
+
+def _pending(i):
+    data = {"member": {"member_id": f"M{i}", "family_id": f"F{i}"}, "policy_id": "PLUM_OPD_2024",
+            "treatment_date": "2024-06-01", "total_amount": 1000.0 + i,
+            "items": [{"name": "Consultation", "amount": 1000.0 + i, "category": "Consultation"}]}
+    fields = dict(member_id=f"M{i}", status="MANUAL_REVIEW", total_amount=1000.0 + i, approved_amount=0.0,
+                  confidence_score=0.9, extracted_data=data, decision_reasons=["Summary: review"],
+                  policy_id="PLUM_OPD_2024")
+    return PendingClaim(fields, [], [], False, None)
+
+
+def _run(tmp_path, name, **kwargs):
+    output = tmp_path / name
+    stats = readjudicate.run_backfill(str(output), chunk_size=2, workers=1, include_unchanged=True, **kwargs)
+    return stats, output.read_text(encoding="utf-8").splitlines()
+
+
+def test_resume_keeps_stats_and_drops_uncheckpointed_lines(db, tmp_path, monkeypatch):
+    write_batch([_pending(i) for i in range(6)])
+    full_stats, full_report = _run(tmp_path, "full.jsonl")
+    assert full_stats["processed"] == len(full_report) == 6
+
+    # Crash after the second chunk's lines are on disk but before its checkpoint
+    write_checkpoint = readjudicate.write_checkpoint
+    calls = []
+
+    def crash(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        write_checkpoint(*args)
+
+    monkeypatch.setattr(readjudicate, "write_checkpoint", crash)
+    with pytest.raises(KeyboardInterrupt):
+        _run(tmp_path, "resumed.jsonl")
+    monkeypatch.setattr(readjudicate, "write_checkpoint", write_checkpoint)
+    assert len((tmp_path / "resumed.jsonl").read_text(encoding="utf-8").splitlines()) == 4
+
+    stats, report = _run(tmp_path, "resumed.jsonl")
+    assert stats == full_stats
+    assert [json.loads(line)["claim_id"] for line in report] == [json.loads(line)["claim_id"] for line in full_report]
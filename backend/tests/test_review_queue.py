@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.models.sql_models import ClaimRecord
+from backend.app.services.review_queue import (
+    REVIEW_STATUS, changed_since, encode_cursor, list_pending, parse_since, sync_token,
+)
+
+BASE = datetime(2024, 5, 1, 9, 0)
+
+
+def _add_claims(db, count, created_at=None, status=REVIEW_STATUS):
+    records = []
+    for i in range(count):
+        record = ClaimRecord(status=status, member_id=f"M{i}", total_amount=100.0, approved_amount=0.0,
+                             created_at=created_at or BASE + timedelta(minutes=i))
+        record.decision_reasons = [f"Reason {i}"]
+        records.append(record)
+    db.add_all(records)
+    db.commit()
+    return records
+
+
+def test_keyset_pages_cover_queue_once(db):
+    # Several claims per created_at, so the id tie-break matters
+    for minute in range(7):
+        _add_claims(db, 3, created_at=BASE + timedelta(minutes=minute))
+    _add_claims(db, 4, status="APPROVED")
+
+    seen, after = [], None
+    while True:
+        items, after = list_pending(db, after, limit=4)
+        seen.extend(item["id"] for item in items)
+        if not after:
+            break
+    expected = [r.id for r in db.query(ClaimRecord).filter(ClaimRecord.status == REVIEW_STATUS)
+                .order_by(ClaimRecord.created_at.desc(), ClaimRecord.id.desc())]
+    assert seen == expected
+
+
+def test_since_resumes_inside_changes_sharing_a_timestamp(db):
+    records = _add_claims(db, 30)
+    token = sync_token(db)
+    # What a bulk override does: one updated_at for every claim it touches
+    now = datetime.utcnow()
+    db.query(ClaimRecord).update({ClaimRecord.status: "APPROVED", ClaimRecord.updated_at: now})
+    db.commit()
+
+    seen = []
+    for _ in range(10):
+        items = changed_since(db, parse_since(token), limit=10)
+        if not items:
+            break
+        seen.extend(item["id"] for item in items)
+        token = encode_cursor(items[-1]["updated_at"], items[-1]["id"])
+    assert seen == [r.id for r in records]
+
+
+def test_pending_route_delta_after_bulk_override(db):
+    records = _add_claims(db, 30)
+    client = TestClient(app)
+    first = client.get("/v1/claims/pending", params={"limit": 10})
+    token = first.headers["X-Sync-Token"]
+
+    overrides = [{"id": r.id, "status": "APPROVED", "approved_amount": 100.0, "decision_reasons": ["ok"], "version": 1}
+                 for r in records]
+    assert client.patch("/v1/claims", json=overrides).json()["counts"] == {"updated": 30}
+
+    seen = []
+    while True:
+        response = client.get("/v1/claims/pending", params={"limit": 10, "since": token})
+        if not response.json():
+            break
+        seen.extend(item["id"] for item in response.json())
+        token = response.headers["X-Sync-Token"]
+    assert sorted(seen) == [r.id for r in records]
+
+
+def test_etag_changes_when_a_claim_leaves_review(db):
+    records = _add_claims(db, 3)
+    client = TestClient(app)
+    etag = client.get("/v1/claims/pending").headers["ETag"]
+    assert client.get("/v1/claims/pending", headers={"If-None-Match": etag}).status_code == 304
+
+    client.put(f"/v1/claims/{records[0].id}",
+               json={"status": "APPROVED", "approved_amount": 100.0, "decision_reasons": ["ok"], "version": 1})
+    response = client.get("/v1/claims/pending", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [records[2].id, records[1].id]
+
+
+def test_cross_origin_client_can_read_paging_headers(db):
+    _add_claims(db, 3)
+    response = TestClient(app).get("/v1/claims/pending", params={"limit": 2},
+                                   headers={"Origin": "http://localhost:5173"})
+    exposed = {h.strip() for h in response.headers["Access-Control-Expose-Headers"].split(",")}
+    assert {"ETag", "X-Next-Cursor", "X-Sync-Token", "Link"} <= exposed
+    assert response.headers["X-Next-Cursor"]
@@ -0,0 +1,37 @@
+import logging
+
+from backend.app.services.member_ledger import attach_ledger_usage
+from backend.app.services.velocity import attach_velocity
+from backend.app.utils.logging_utils import setup_logging
+from backend.app.utils.security import REDACTED, PHIRedactionFilter
+
+MEMBER = "EMP-4711"
+
+
+def _record(msg, args):
+    return logging.LogRecord("plum", logging.INFO, __file__, 1, msg, args, None)
+
+
+def test_filter_redacts_mapping_and_nested_args():
+    record = _record("claim %s for %s", ({"member": {"member_id": MEMBER, "name": "Asha"}, "total_amount": 500}, 3))
+    assert PHIRedactionFilter().filter(record)
+    message = record.getMessage()
+    assert MEMBER not in message and "Asha" not in message
+    assert REDACTED in message and "500" in message
+
+    record = _record("Member '%(member_id)s' used %(used)s", ({"member_id": MEMBER, "used": 1200.0},))
+    PHIRedactionFilter().filter(record)
+    assert record.getMessage() == f"Member '{REDACTED}' used 1200.0"
+
+
+def test_member_checks_do_not_log_member_id(db, caplog):
+    setup_logging()
+    claim = {"member": {"member_id": MEMBER, "family_id": "FAM-1"}, "policy_id": "PLUM_OPD_2024",
+             "treatment_date": "2024-06-01", "total_amount": 500.0}
+    with caplog.at_level(logging.INFO, logger="plum"):
+        attach_velocity(db, claim, MEMBER)
+        attach_ledger_usage(db, claim)
+    messages = [r.getMessage() for r in caplog.records]
+    assert any(m.startswith("VELOCITY CHECK") for m in messages)
+    assert any(m.startswith("LEDGER") for m in messages)
+    assert not any(MEMBER in m for m in messages)
@@ -0,0 +1,50 @@
+import hashlib
+import io
+
+import pytest
+
+from backend.app.models.sql_models import ClaimFile, ClaimRecord, StorageUpload
+from backend.app.services import storage as storage_module
+from backend.app.services.storage import (
+    LocalStorage, StorageBackend, WriteBehindStorage, process_pending_uploads, queue_remote_uploads,
+)
+
+
+class FakeRemote(StorageBackend):
+    name = "fake"
+
+    def save(self, source, digest, filename=None):
+        source.read()
+        return f"https://cdn.example/{digest}"
+
+
+def test_backend_requires_save():
+    class Incomplete(StorageBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_write_behind_swaps_locator_on_claims_holding_the_digest(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, "storage", WriteBehindStorage(LocalStorage(str(tmp_path)), FakeRemote()))
+    content = b"%PDF-1.4 bill"
+    digest = hashlib.sha256(content).hexdigest()
+    key = storage_module.storage.save(io.BytesIO(content), digest, "bill.pdf")
+
+    holders = [ClaimRecord(status="APPROVED", file_name=f"{key}, other/page.png"), ClaimRecord(status="APPROVED", file_name=key)]
+    # Mentions the key in its locator list but holds a different document
+    bystander = ClaimRecord(status="APPROVED", file_name=f"x{key}")
+    db.add_all(holders + [bystander])
+    db.flush()
+    for record in holders:
+        db.add(ClaimFile(claim_id=record.id, digest=digest, file_name="bill.pdf"))
+    queue_remote_uploads(db, [(key, digest, "bill.pdf")])
+    db.commit()
+
+    assert process_pending_uploads(db) == 1
+    db.expire_all()
+    url = f"https://cdn.example/{digest}"
+    assert [db.get(ClaimRecord, r.id).file_name for r in holders] == [f"{url}, other/page.png", url]
+    assert db.get(ClaimRecord, bystander.id).file_name == f"x{key}"
+    assert db.query(StorageUpload).one().status == "DONE"
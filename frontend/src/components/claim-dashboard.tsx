@@ -85,6 +85,7 @@ interface ClaimResponse {
   file_name?: string
   created_at?: string
   decision_reasons?: string[]
+  version?: number
 }
 
 interface ClaimDashboardProps {
@@ -110,6 +111,7 @@ export default function ClaimDashboard({ user }: ClaimDashboardProps) {
   // Admin Queue State
   const [viewQueue, setViewQueue] = useState(false)
   const [queueItems, setQueueItems] = useState<any[]>([])
+  const [queueCursor, setQueueCursor] = useState<string | null>(null)
 
   // Helper to display server images
   const getFileUrl = (filenameOrUrl: string) => {
@@ -194,13 +196,18 @@ export default function ClaimDashboard({ user }: ClaimDashboardProps) {
   }
 
   // --- QUEUE LOGIC ---
-  const fetchQueue = async () => {
+  // The queue is paged; pass the previous page's X-Next-Cursor to append the next one
+  const fetchQueue = async (cursor: string | null = null) => {
     setIsLoading(true)
     try {
-        const res = await fetch(`${API_BASE}/v1/claims/pending`)
+        const url = cursor
+            ? `${API_BASE}/v1/claims/pending?after=${encodeURIComponent(cursor)}`
+            : `${API_BASE}/v1/claims/pending`
+        const res = await fetch(url)
         const data = await res.json()
         const items = Array.isArray(data) ? data : (data.cases || data.items || [])
-        setQueueItems(items)
+        setQueueItems(prev => cursor ? [...prev, ...items] : items)
+        setQueueCursor(res.headers.get("X-Next-Cursor"))
         setViewQueue(true)
     } catch (e) { 
         console.error(e)
@@ -219,7 +226,13 @@ export default function ClaimDashboard({ user }: ClaimDashboardProps) {
   }
 
   // 2. Full Review (Detailed View)
-  const handleReview = (item: any) => {
+  const handleReview = async (item: any) => {
+      // The queue only carries summaries; load the full record for the detail view
+      try {
+          const res = await fetch(`${API_BASE}/v1/claims/${item.id}`)
+          if (res.ok) item = { ...item, ...(await res.json()) }
+      } catch (e) { console.error(e) }
+
       const serverFiles = item.file_name ? item.file_name.split(",") : []
       const firstImage = serverFiles.length > 0 ? getFileUrl(serverFiles[0]) : null
 
@@ -227,6 +240,7 @@ export default function ClaimDashboard({ user }: ClaimDashboardProps) {
       const reconstructedResult: ClaimResponse = {
           status: "ok",
           claim_id: item.id,
+          version: item.version,
           files_processed: serverFiles,
           extracted_data: item.extracted_data || {},
           decision: {
@@ -277,10 +291,15 @@ export default function ClaimDashboard({ user }: ClaimDashboardProps) {
             body: JSON.stringify({
                 status: newDecision,
                 approved_amount: newAmount,
-                decision_reasons: newReasons
+                decision_reasons: newReasons,
+                version: result.version
             })
         });
         
+        if (response.status === 409) {
+            setError("This claim was changed by another reviewer. Reopen it from the queue to see the latest decision.");
+            return;
+        }
         if (!response.ok) {
             throw new Error("Failed to sync decision with server.");
         }
@@ -371,7 +390,7 @@ export default function ClaimDashboard({ user }: ClaimDashboardProps) {
                              <div className="flex items-center gap-4">
                                 <div className="text-right">
                                     <span className="block text-lg font-bold text-gray-900">₹{item.total_amount?.toLocaleString() || "0"}</span>
-                                    <span className="text-xs text-red-500 font-medium max-w-[150px] truncate block">{item.decision_reasons?.[0] || "Needs Review"}</span>
+                                    <span className="text-xs text-red-500 font-medium max-w-[150px] truncate block">{item.primary_reason ?? item.decision_reasons?.[0] ?? "Needs Review"}</span>
                                 </div>
                                 <button 
     onClick={() => handleReview(item)}
@@ -402,6 +421,17 @@ export default function ClaimDashboard({ user }: ClaimDashboardProps) {
                          </div>
                      </div>
                  ))}
+                 {queueCursor && (
+                     <div className="flex justify-center pt-2">
+                         <button
+                             onClick={() => fetchQueue(queueCursor)}
+                             disabled={isLoading}
+                             className="flex items-center gap-2 px-4 py-2 rounded-lg bg-white border border-gray-200 text-sm font-bold text-gray-700 hover:bg-gray-100 disabled:opacity-50 shadow-sm"
+                         >
+                             {isLoading ? <Loader2 className="w-4 h-4 animate-spin" /> : <RefreshCw className="w-4 h-4" />} Load more
+                         </button>
+                     </div>
+                 )}
              </div>
          </div>
       ) : (